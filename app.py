@@ -1,7 +1,9 @@
+from functools import lru_cache
 import streamlit as st
 import pandas as pd
-import numpy as np
-from cadv_new import EnhancedCollegePredictorML
+from cadv_new import artifact_path, load_or_train_predictor
+from tnea_display import show_predictions_table
+from tnea_scoring import ScoringEngine, load_or_build_answer_table
 import plotly.express as px
 import plotly.graph_objects as go
 from PIL import Image  # Import Pillow for image handling
@@ -124,8 +126,6 @@ def load_and_clean_data(vocational_path, maxcutoff_path):
 def load_model(combined_df):
     """Load and train the model"""
     try:
-        predictor = EnhancedCollegePredictorML()
-
         # Check for required columns before training
         required_columns = ['College Name', 'Branch Name', 'OC']
         for col in required_columns:
@@ -146,7 +146,12 @@ def load_model(combined_df):
             st.error(f"The DataFrame has too few rows ({len(combined_df)}) to train the model.  Need at least 2.")
             return None, None
 
-        metrics = predictor.train_model(combined_df)
+        # Reuse the saved artifact and serve from its precomputed college x branch table,
+        # so the booster is never loaded; only retrains when the data has changed.
+        # Evaluation metrics are computed in the background instead of delaying startup
+        predictor, metrics = load_or_train_predictor(
+            combined_df, artifact_path('enhanced_predictor_combined'), serving_mode='table', evaluation='background'
+        )
 
         return predictor, metrics
     except Exception as e:
@@ -168,37 +173,49 @@ def format_admission_chance(chance):
     else:
         return f'<div class="very-low-chance">Very Low – Unlikely, consider alternative options. ({chance:.1f}%)</div>'
 
-def predict_colleges(predictor, df, cutoff_mark, category=None):
-    """Predict cutoffs for all colleges"""
-    predictions = []
+@lru_cache(maxsize=4096)
+def prediction_html(rank, college, branch, predicted_cutoff, low, high, cutoff_mark, margin, chance):
+    """HTML box for one ranked prediction; identical rows reuse the cached markup"""
+    return f"""
+            <div class="prediction-box">
+                <div class="college-name">Rank: <span class="rank-number">{rank}</span></div>
+                <div class="college-name">College: {college}</div>
+                <div class="branch-name">Branch: {branch}</div>
+                <div class="metrics">
+                    Predicted Cutoff: <span class="predicted-value">{predicted_cutoff:.2f}</span><br>
+                    Likely Range (80%): {low:.2f} – {high:.2f}<br>
+                    Your Cutoff: <span class="cutoff-value">{cutoff_mark:.2f}</span><br>
+                    Margin: <span class="margin-value">{margin:.2f}</span>
+                </div>
+                {format_admission_chance(chance)}
+            </div>
+            """
 
-    for _, row in df.iterrows():
-        predicted_cutoff = predictor.predict_cutoff(
-            row['College Name'],
-            row['Branch Name']
-        )
+# The model is trained on combined_df, so the artifact fingerprint identifies both the
+# predictor and the data; only the fingerprint string is hashed on each call
+@st.cache_resource
+def load_scoring_engine(_predictor, _combined_df, fingerprint):
+    """Predict every distinct college/branch pair once per model artifact"""
+    return ScoringEngine(_predictor, _combined_df)
 
-        if predicted_cutoff is not None and not np.isnan(predicted_cutoff):  # Check for NaN here
-            margin = cutoff_mark - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            chance = predictor.adjust_chance_for_category(chance, category)
-            predictions.append({
-                'COLLEGE NAME': row['College Name'],
-                'BRANCH NAME': row['Branch Name'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': cutoff_mark,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
-
-    return pd.DataFrame(predictions)
-
-def calculate_admission_chance(margin):
-    """Calculate admission chance based on margin"""
-    if margin >= 0:
-        return min(100, max(0, (margin + 5) * 10))
-    else:
-        return max(0, min(100, (1 + margin / 20) * 100))
+@st.cache_resource
+def load_answer_table(_predictor, _combined_df, fingerprint):
+    """Answers for every reachable cutoff and category, saved next to the model artifact"""
+    return load_or_build_answer_table(_predictor, _combined_df, artifact_path('enhanced_predictor_combined'))
+
+def predict_colleges(predictor, df, cutoff_mark, category=None, college=None, branch=None, top=None):
+    """Predict cutoffs for all colleges, or for one college and/or branch.
+
+    Cutoff marks from the mark inputs are read from the precomputed answer table;
+    any other mark is scored from the cached predictions of every pair in df.
+    Rows come back ranked by admission chance, highest first.
+    """
+    answers = load_answer_table(predictor, df, predictor.fingerprint)
+    predictions = answers.score(cutoff_mark, category, college=college, branch=branch, top=top)
+    if predictions is None:
+        engine = load_scoring_engine(predictor, df, predictor.fingerprint)
+        predictions = engine.score(cutoff_mark, category, college=college, branch=branch, top=top)
+    return predictions
 
 def display_predictions(predictions, display_chart=True):
     """Displays predictions with consistent formatting and limits to top 10."""
@@ -211,8 +228,8 @@ def display_predictions(predictions, display_chart=True):
     predictions.loc[:, 'BRANCH NAME'] = predictions['BRANCH NAME'].astype(str)
     predictions = predictions.dropna(subset=['COLLEGE NAME', 'BRANCH NAME'])
 
-    # Sort and limit to top 10 *before* anything else
-    predictions_sorted = predictions.sort_values('Admission Chance', ascending=False).head(10)
+    # predict_colleges returns the rows ranked by admission chance, so the top 10 is a slice
+    predictions_sorted = predictions.head(10).reset_index(drop=True)
 
     if display_chart:
         fig = go.Figure()
@@ -294,21 +311,17 @@ def display_predictions(predictions, display_chart=True):
             </style>
         """, unsafe_allow_html=True)
 
-        # Display each prediction in the sorted order
-        for idx, row in predictions_sorted.iterrows():
-            container.markdown(f"""
-            <div class="prediction-box">
-                <div class="college-name">Rank: <span class="rank-number">{idx + 1}</span></div>
-                <div class="college-name">College: {row['COLLEGE NAME']}</div>
-                <div class="branch-name">Branch: {row['BRANCH NAME']}</div>
-                <div class="metrics">
-                    Predicted Cutoff: <span class="predicted-value">{row['Predicted Cutoff']:.2f}</span><br>
-                    Your Cutoff: <span class="cutoff-value">{row['Your Cutoff']:.2f}</span><br>
-                    Margin: <span class="margin-value">{row['Margin']:.2f}</span>
-                </div>
-                {format_admission_chance(row['Admission Chance'])}
-            </div>
-            """, unsafe_allow_html=True)
+        # All boxes go out as one cached HTML block instead of one element per row
+        container.markdown("".join(
+            prediction_html(rank, *row) for rank, row in enumerate(predictions_sorted[[
+                'COLLEGE NAME', 'BRANCH NAME', 'Predicted Cutoff', 'Cutoff Low', 'Cutoff High',
+                'Your Cutoff', 'Margin', 'Admission Chance'
+            ]].itertuples(index=False, name=None), start=1)
+        ), unsafe_allow_html=True)
+
+    # Longer lists (college-wise and branch-wise modes) are paged on request
+    if len(predictions) > len(predictions_sorted):
+        show_predictions_table(predictions, key='all_predictions', label="Show all predictions")
 
 def main():
     st.title("🎓 TNEA College Admission Predictor")
@@ -349,13 +362,20 @@ def main():
     # Display model metrics in expander
     if metrics:
         with st.expander("Model Performance Metrics"):
-            cols = st.columns(3)
-            with cols[0]:
-                st.metric("R² Score", f"{metrics['r2']:.4f}")
-            with cols[1]:
-                st.metric("RMSE", f"{metrics['rmse']:.4f}")
-            with cols[2]:
-                st.metric("MAE", f"{metrics['mae']:.4f}")
+            # Evaluation runs in the background after startup; show it once it has finished
+            metrics = predictor.get_metrics(wait=False)
+            if 'evaluation_error' in metrics:
+                st.warning(f"Model evaluation failed: {metrics['evaluation_error']}")
+            elif 'r2' not in metrics:
+                st.info("Model evaluation is not available yet. Reopen this section in a moment.")
+            else:
+                cols = st.columns(3)
+                with cols[0]:
+                    st.metric("R² Score", f"{metrics['r2']:.4f}")
+                with cols[1]:
+                    st.metric("RMSE", f"{metrics['rmse']:.4f}")
+                with cols[2]:
+                    st.metric("MAE", f"{metrics['mae']:.4f}")
 
     # Input marks
     st.subheader("Enter Your Marks")
@@ -396,16 +416,17 @@ def main():
         if filter_mode == "Top 10 Colleges":
             if st.button("Calculate Top 10", key="top10"):
                 with st.spinner("Calculating predictions..."):
-                    predictions = predict_colleges(predictor, combined_df, st.session_state['cutoff_mark'], st.session_state['category'])
+                    predictions = predict_colleges(predictor, combined_df, st.session_state['cutoff_mark'],
+                                                   st.session_state['category'], top=10)
                     display_predictions(predictions, display_chart=True)
 
         elif filter_mode == "College-wise Courses":
             selected_college = st.selectbox("Select College", sorted(combined_df['College Name'].unique()))
             if st.button("List Courses", key="college_courses"):
                 with st.spinner(f"Listing courses for {selected_college}..."):
-                    college_df = combined_df[combined_df['College Name'] == selected_college]
-                    if not college_df.empty:
-                        predictions = predict_colleges(predictor, college_df, st.session_state['cutoff_mark'], st.session_state['category'])
+                    predictions = predict_colleges(predictor, combined_df, st.session_state['cutoff_mark'],
+                                                   st.session_state['category'], college=selected_college)
+                    if not predictions.empty:
                         display_predictions(predictions, display_chart=False)
                     else:
                         st.warning(f"No courses found for {selected_college}.")
@@ -415,9 +436,9 @@ def main():
             if st.button("List Colleges", key="branch_colleges"):
                 with st.spinner(f"Listing colleges for {selected_branch}..."):
                     if not combined_df.empty:
-                        branch_df = combined_df[combined_df['Branch Name'] == selected_branch]
-                        if not branch_df.empty:
-                            predictions = predict_colleges(predictor, branch_df, st.session_state['cutoff_mark'], st.session_state['category'])
+                        predictions = predict_colleges(predictor, combined_df, st.session_state['cutoff_mark'],
+                                                       st.session_state['category'], branch=selected_branch)
+                        if not predictions.empty:
                             display_predictions(predictions, display_chart=False)
                         else:
                             st.warning(f"No colleges found for {selected_branch}.")
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from cadv_new import EnhancedCollegePredictorML
+from cadv_new import load_or_train_predictor
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -41,8 +41,8 @@ def load_model():
     """Load and train the model"""
     try:
         df = pd.read_csv("Unique_Colleges_Max_Cutoff.csv")
-        predictor = EnhancedCollegePredictorML()
-        metrics = predictor.train_model(df)
+        # Reuses the saved model artifact; only retrains when the data has changed
+        predictor, metrics = load_or_train_predictor(df, serving_mode='trees', evaluation='background', fallback=True)
         return predictor, df, metrics
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
@@ -223,13 +223,20 @@ def main():
 
     # Display model metrics in expander
     with st.expander("Model Performance Metrics"):
-        cols = st.columns(3)
-        with cols[0]:
-            st.metric("R² Score", f"{metrics['r2']:.4f}")
-        with cols[1]:
-            st.metric("RMSE", f"{metrics['rmse']:.4f}")
-        with cols[2]:
-            st.metric("MAE", f"{metrics['mae']:.4f}")
+        # Evaluation runs in the background after startup; show it once it has finished
+        metrics = predictor.get_metrics(wait=False)
+        if 'evaluation_error' in metrics:
+            st.warning(f"Model evaluation failed: {metrics['evaluation_error']}")
+        elif 'r2' not in metrics:
+            st.info("Model evaluation is not available yet. Reopen this section in a moment.")
+        else:
+            cols = st.columns(3)
+            with cols[0]:
+                st.metric("R² Score", f"{metrics['r2']:.4f}")
+            with cols[1]:
+                st.metric("RMSE", f"{metrics['rmse']:.4f}")
+            with cols[2]:
+                st.metric("MAE", f"{metrics['mae']:.4f}")
 
     # Input marks
     st.subheader("Enter Your Marks")
@@ -2,15 +2,24 @@ import pandas as pd
 import numpy as np
 import os
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score
+from functools import partial
+from tnea_effects import OneHotRidgeRegressor
+
+# Regressors CollegePredictorML can train; 'onehot_ridge' is the millisecond linear baseline
+MODELS = {
+    'random_forest': partial(RandomForestRegressor, n_estimators=100, random_state=42),
+    'onehot_ridge': OneHotRidgeRegressor,
+}
 
 class CollegePredictorML:
-    def __init__(self):
-        self.scaler = StandardScaler()
+    def __init__(self, model='random_forest'):
+        if model not in MODELS:
+            raise ValueError(f"model must be one of {list(MODELS)}, got '{model}'")
         self.label_encoders = {}
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+        self.model = MODELS[model]()
         self.is_trained = False
         self.feature_names = ['college_name_encoded', 'branch_name_encoded']  # Update feature names
 
@@ -38,17 +47,10 @@ class CollegePredictorML:
             X, y = self.prepare_historical_data(df)
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
             
-            X_train_scaled = pd.DataFrame(
-                self.scaler.fit_transform(X_train),
-                columns=self.feature_names
-            )
-            X_test_scaled = pd.DataFrame(
-                self.scaler.transform(X_test),
-                columns=self.feature_names
-            )
-            
-            self.model.fit(X_train_scaled, y_train)
-            y_pred = self.model.predict(X_test_scaled)
+            # Tree models split on thresholds, so scaling the codes cannot change them;
+            # the encoded columns are used as-is for training and prediction
+            self.model.fit(X_train, y_train)
+            y_pred = self.model.predict(X_test)
             mse = mean_squared_error(y_test, y_pred)
             r2 = r2_score(y_test, y_pred)
             
@@ -58,31 +60,35 @@ class CollegePredictorML:
             print(f"Error during model training: {str(e)}")
             return None, None
 
-    def predict_cutoff(self, college_name, branch_name):
+    def encode(self, college_names, branch_names):
+        """Encode whole name columns into the feature matrix; unseen names get code -1"""
+        return np.column_stack([
+            pd.Index(self.label_encoders[column].classes_).get_indexer(np.asarray(values))
+            for column, values in (('COLLEGE NAME', college_names), ('BRANCH NAME', branch_names))
+        ])
+
+    def predict_cutoffs(self, college_names, branch_names):
+        """Predict cutoffs for whole columns of college and branch names in one model call.
+
+        Returns a float array aligned with the inputs, NaN where a name was not seen in
+        training.
+        """
         if not self.is_trained:
             return None
-        
-        try:
-            college_encoded = self.label_encoders['COLLEGE NAME'].transform([college_name])[0]
-            branch_encoded = self.label_encoders['BRANCH NAME'].transform([branch_name])[0]
-            
-            X = pd.DataFrame(
-                [[college_encoded, branch_encoded]],
-                columns=self.feature_names  # Use feature names from training
-            )
-            
-            # Add assertion to check feature names
-            assert set(X.columns.tolist()) == set(self.model.feature_names_in_), "Feature names mismatch"
-            
-            X_scaled = pd.DataFrame(
-                self.scaler.transform(X),
-                columns=self.feature_names
-            )
-            
-            return self.model.predict(X_scaled)[0]
-        except Exception as e:
-            print(f"Error during prediction: {str(e)}")
+
+        X = self.encode(college_names, branch_names)
+        known = (X >= 0).all(axis=1)
+        predictions = np.full(len(X), np.nan)
+        if known.any():
+            predictions[known] = self.model.predict(pd.DataFrame(X[known], columns=self.feature_names))
+        return predictions
+
+    def predict_cutoff(self, college_name, branch_name):
+        """Make predictions for a given college and branch"""
+        predictions = self.predict_cutoffs([college_name], [branch_name])
+        if predictions is None or np.isnan(predictions[0]):
             return None
+        return predictions[0]
 
 def get_filter_mode():
     while True:
@@ -179,53 +185,23 @@ def get_college_choice(df):
                 print("Please enter a valid choice")
 
 def predict_all_colleges(predictor, df, cutoff_mark):
-    predictions = []
-    
-    for _, row in df.iterrows():
-        predicted_cutoff = predictor.predict_cutoff(
-            row['COLLEGE NAME'],
-            row['BRANCH NAME']
-        )
-        
-        if predicted_cutoff is not None:
-            margin = cutoff_mark - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            
-            predictions.append({
-                'COLLEGE NAME': row['COLLEGE NAME'],
-                'BRANCH NAME': row['BRANCH NAME'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': cutoff_mark,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
-    
-    return pd.DataFrame(predictions)
+    # Score every row in one model call; rows with names unseen in training come back as NaN
+    predicted_cutoffs = predictor.predict_cutoffs(df['COLLEGE NAME'], df['BRANCH NAME'])
+    margins = cutoff_mark - predicted_cutoffs
+
+    predictions = pd.DataFrame({
+        'COLLEGE NAME': df['COLLEGE NAME'].to_numpy(),
+        'BRANCH NAME': df['BRANCH NAME'].to_numpy(),
+        'Predicted Cutoff': predicted_cutoffs,
+        'Your Cutoff': cutoff_mark,
+        'Margin': margins,
+        'Admission Chance': calculate_admission_chance(margins)
+    })
+    return predictions.dropna(subset=['Predicted Cutoff']).reset_index(drop=True)
 
 def predict_branch_specific(predictor, df, cutoff_mark, branch_name):
     branch_df = df[df['BRANCH NAME'] == branch_name]
-    predictions = []
-    
-    for _, row in branch_df.iterrows():
-        predicted_cutoff = predictor.predict_cutoff(
-            row['COLLEGE NAME'],
-            row['BRANCH NAME']
-        )
-        
-        if predicted_cutoff is not None:
-            margin = cutoff_mark - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            
-            predictions.append({
-                'COLLEGE NAME': row['COLLEGE NAME'],
-                'BRANCH NAME': row['BRANCH NAME'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': cutoff_mark,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
-    
-    return pd.DataFrame(predictions)
+    return predict_all_colleges(predictor, branch_df, cutoff_mark)
 
 def show_college_branches(predictor, df, college_name, user_cutoff):
     college_df = df[df['COLLEGE NAME'] == college_name]
@@ -233,26 +209,7 @@ def show_college_branches(predictor, df, college_name, user_cutoff):
     print(f"\nBranches available at {college_name}")
     print("=" * 100)
     
-    predictions = []
-    for _, row in college_df.iterrows():
-        predicted_cutoff = predictor.predict_cutoff(
-            row['COLLEGE NAME'],
-            row['BRANCH NAME']
-        )
-        
-        if predicted_cutoff is not None:
-            margin = user_cutoff - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            
-            predictions.append({
-                'BRANCH NAME': row['BRANCH NAME'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': user_cutoff,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
-    
-    predictions_df = pd.DataFrame(predictions)
+    predictions_df = predict_all_colleges(predictor, college_df, user_cutoff)
     if not predictions_df.empty:
         predictions_df = predictions_df.sort_values('Predicted Cutoff', ascending=False)
         
@@ -266,10 +223,11 @@ def show_college_branches(predictor, df, college_name, user_cutoff):
             print("-" * 50)
 
 def calculate_admission_chance(margin):
-    if margin >= 0:
-        return min((margin + 5) / 10, 1) * 100
-    else:
-        return max(0, (1 + margin / 20) * 100)
+    margin = np.asarray(margin, dtype=float)
+    chance = np.where(margin >= 0,
+                      np.minimum((margin + 5) / 10, 1) * 100,
+                      np.maximum(0, (1 + margin / 20) * 100))
+    return chance if chance.ndim else float(chance)
 
 def print_admission_chance(chance):
     if chance >= 80:
@@ -314,6 +272,10 @@ def main():
     print("\nInitializing ML model...")
     predictor = CollegePredictorML()
     mse, r2 = predictor.train_model(df)
+    if mse is None:
+        print("Falling back to the one-hot ridge baseline...")
+        predictor = CollegePredictorML(model='onehot_ridge')
+        mse, r2 = predictor.train_model(df)
     
     if mse is not None and r2 is not None:
         print(f"Model trained successfully!")
@@ -2,17 +2,32 @@ import pandas as pd
 import numpy as np
 import xgboost as xgb
 import os
-from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+from functools import partial
+from tnea_evaluation import evaluate_models
+from tnea_tuning import tune_xgboost
 import warnings
 warnings.filterwarnings('ignore')
 
+# Hyperparameter search space of CollegePredictorML.hyperparameter_tuning
+PARAM_GRID = {
+    'n_estimators': [100, 200, 300, 400, 500],
+    'max_depth': [3, 4, 5, 6, 7, 8],
+    'learning_rate': [0.01, 0.05, 0.1, 0.15, 0.2],
+    'min_child_weight': [1, 3, 5, 7],
+    'subsample': [0.6, 0.7, 0.8, 0.9, 1.0],
+    'colsample_bytree': [0.6, 0.7, 0.8, 0.9, 1.0],
+    'gamma': [0, 0.1, 0.2, 0.3, 0.4]
+}
+
 class CollegePredictorML:
     def __init__(self):
-        self.scaler = StandardScaler()
         self.label_encoders = {}
         self.model = None
+        self.tuning_log = None
         self.is_trained = False
         self.feature_names = ['college_name_encoded', 'branch_name_encoded']
 
@@ -35,41 +50,42 @@ class CollegePredictorML:
 
         return encoded_features, df['MAX CUTOFF']
 
-    def hyperparameter_tuning(self, X_train, y_train):
-        """Perform hyperparameter tuning using GridSearchCV"""
-        param_grid = {
-            'n_estimators': [100, 200, 300, 400, 500],
-            'max_depth': [3, 4, 5, 6, 7, 8],
-            'learning_rate': [0.01, 0.05, 0.1, 0.15, 0.2],
-            'min_child_weight': [1, 3, 5, 7],
-            'subsample': [0.6, 0.7, 0.8, 0.9, 1.0],
-            'colsample_bytree': [0.6, 0.7, 0.8, 0.9, 1.0],
-            'gamma': [0, 0.1, 0.2, 0.3, 0.4]
-        }
+    def hyperparameter_tuning(self, X_train, y_train, search='halving', max_fits=2000, time_budget=300, n_jobs=None):
+        """Perform hyperparameter tuning within a fit-count and wall-clock budget.
+
+        search='halving' (default) or 'random' samples configurations from the grid
+        (see tnea_tuning.tune_xgboost). Trials run on n_jobs worker processes and are
+        saved to the tuning store, so an interrupted search resumes and a rerun on the
+        same data returns the stored result. search='grid' runs the exhaustive
+        GridSearchCV, which ignores the budget. Returns the best estimator and the trial log.
+        """
+        if search != 'grid':
+            return tune_xgboost(PARAM_GRID, X_train, y_train, search=search,
+                                max_fits=max_fits, time_budget=time_budget, n_jobs=n_jobs)
 
-        grid_search = GridSearchCV(xgb.XGBRegressor(objective='reg:squarederror', random_state=42), param_grid, cv=5, scoring='neg_mean_squared_error')
+        grid_search = GridSearchCV(xgb.XGBRegressor(objective='reg:squarederror', random_state=42), PARAM_GRID, cv=5, scoring='neg_mean_squared_error')
         grid_search.fit(X_train, y_train)
-        return grid_search.best_estimator_
-
-    def evaluate_model(self, X, y, model):
-        """Evaluate model using multiple metrics and cross-validation"""
-        cv_rmse = np.sqrt(-cross_val_score(model, X, y, 
-                                         scoring='neg_mean_squared_error', 
-                                         cv=5))
-        cv_mae = -cross_val_score(model, X, y, 
-                                scoring='neg_mean_absolute_error', 
-                                cv=5)
-        cv_r2 = cross_val_score(model, X, y, 
-                               scoring='r2', 
-                               cv=5)
+        return grid_search.best_estimator_, pd.DataFrame(grid_search.cv_results_)
+
+    def evaluate_model(self, X, y, model, n_jobs=None):
+        """Evaluate model using multiple metrics and cross-validation.
+
+        Every metric comes from one fit per fold on the shared folds of
+        tnea_evaluation.evaluate_models, run on n_jobs worker processes
+        (default: one per CPU).
+        """
+        n_jobs = n_jobs or os.cpu_count() or 1
+        # Each worker fits with a single thread so the folds do not oversubscribe the CPUs
+        worker_model = clone(model).set_params(n_jobs=1) if n_jobs > 1 else model
+        folds = evaluate_models(X, y, {'xgboost': partial(clone, worker_model)}, cv=5, n_jobs=n_jobs).attrs['folds']
 
         return {
-            'cv_rmse_mean': cv_rmse.mean(),
-            'cv_rmse_std': cv_rmse.std(),
-            'cv_mae_mean': cv_mae.mean(),
-            'cv_mae_std': cv_mae.std(),
-            'cv_r2_mean': cv_r2.mean(),
-            'cv_r2_std': cv_r2.std()
+            'cv_rmse_mean': folds['rmse'].mean(),
+            'cv_rmse_std': folds['rmse'].std(ddof=0),
+            'cv_mae_mean': folds['mae'].mean(),
+            'cv_mae_std': folds['mae'].std(ddof=0),
+            'cv_r2_mean': folds['r2'].mean(),
+            'cv_r2_std': folds['r2'].std(ddof=0)
         }
 
     def train_model(self, df):
@@ -77,22 +93,19 @@ class CollegePredictorML:
             X, y = self.prepare_historical_data(df)
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-            X_train_scaled = pd.DataFrame(
-                self.scaler.fit_transform(X_train),
-                columns=self.feature_names
-            )
-            X_test_scaled = pd.DataFrame(
-                self.scaler.transform(X_test),
-                columns=self.feature_names
-            )
-
-            self.model = self.hyperparameter_tuning(X_train_scaled, y_train)
-            self.model.fit(X_train_scaled, y_train)
+            # Tree models split on thresholds, so scaling the codes cannot change them;
+            # the encoded columns are used as-is for training and prediction
+            self.model, self.tuning_log = self.hyperparameter_tuning(X_train, y_train)
+            search_time = self.tuning_log.attrs.get('search_time', 0)
+            if self.tuning_log.attrs.get('cached'):
+                print(f"\nReused {len(self.tuning_log)} tuning trials from the tuning store ({search_time:.1f}s)")
+            else:
+                print(f"\nTuning scored {len(self.tuning_log)} trials in {search_time:.1f}s")
 
             print("\nEvaluating model performance...")
-            evaluation_metrics = self.evaluate_model(X_train_scaled, y_train, self.model)
+            evaluation_metrics = self.evaluate_model(X_train, y_train, self.model)
 
-            y_pred = self.model.predict(X_test_scaled)
+            y_pred = self.model.predict(X_test)
             test_rmse = np.sqrt(mean_squared_error(y_test, y_pred))
             test_mae = mean_absolute_error(y_test, y_pred)
             test_r2 = r2_score(y_test, y_pred)
@@ -100,6 +113,7 @@ class CollegePredictorML:
             self.is_trained = True
 
             return {
+                'tuning_log': self.tuning_log,
                 'cross_validation_metrics': evaluation_metrics,
                 'test_metrics': {
                     'test_rmse': test_rmse,
@@ -112,47 +126,53 @@ class CollegePredictorML:
             print(f"Error during model training: {str(e)}")
             return None
 
-    def predict_cutoff(self, college_name, branch_name):
-        """Make predictions for a given college and branch"""
-        if not self.is_trained:
-            return None
+    def encode(self, college_names, branch_names):
+        """Encode whole name columns into the feature matrix; unseen names get code -1"""
+        return np.column_stack([
+            pd.Index(self.label_encoders[column].classes_).get_indexer(np.asarray(values))
+            for column, values in (('COLLEGE NAME', college_names), ('BRANCH NAME', branch_names))
+        ])
 
-        try:
-            college_encoded = self.label_encoders['COLLEGE NAME'].transform([college_name])[0]
-            branch_encoded = self.label_encoders['BRANCH NAME'].transform([branch_name])[0]
+    def predict_cutoffs(self, college_names, branch_names):
+        """Predict cutoffs for whole columns of college and branch names in one model call.
 
-            X = pd.DataFrame(
-                [[college_encoded, branch_encoded]],
-                columns=self.feature_names
-            )
+        Returns a float array aligned with the inputs, NaN where a name was not seen in
+        training.
+        """
+        if not self.is_trained:
+            return None
 
-            X_scaled = pd.DataFrame(
-                self.scaler.transform(X),
-                columns=self.feature_names
-            )
+        X = self.encode(college_names, branch_names)
+        known = (X >= 0).all(axis=1)
+        predictions = np.full(len(X), np.nan)
+        if known.any():
+            predictions[known] = self.model.predict(pd.DataFrame(X[known], columns=self.feature_names))
+        return predictions
 
-            return self.model.predict(X_scaled)[0]
-        except Exception as e:
-            print(f"Error during prediction: {str(e)}")
+    def predict_cutoff(self, college_name, branch_name):
+        """Make predictions for a given college and branch"""
+        predictions = self.predict_cutoffs([college_name], [branch_name])
+        if predictions is None or np.isnan(predictions[0]):
             return None
+        return predictions[0]
 
-# Additional functions remain unchanged...
+def get_filter_mode():
+    while True:
+        print("\nChoose filtering mode:")
+        print("1. Show top 10 colleges across all branches")
+        print("2. Show top 10 colleges for specific branch")
+        print("3. Show all branches for specific college")
+        print("4. Exit program")
 
-def main():
-    print("Welcome to the Enhanced College Predictor Program (XGBoost Edition)!")
+        try:
+            choice = int(input("\nEnter your choice (1-4): "))
+            if 1 <= choice <= 4:
+                return choice
+            print("Please enter a number between 1-4")
+        except ValueError:
+            print("Please enter a valid number")
 
-    # Load the dataset
-    try:
-        file_path = "Unique_Colleges_Max_Cutoff.csv"
-        if not os.path.exists(file_path):
-            print(f"Error: Dataset file '{file_path}' not found!")
-            return
-        
-        df = pd.read_csv(file_path)
-        print(f"\nSuccessfully loaded dataset with {len(df)} records.")
-    except Exception as e:
-        print(f"Error loading dataset: {str(e)}")
-        return
+def get_branch_choice(df):
     unique_branches = sorted(df['BRANCH NAME'].unique())
     branches_per_page = 20
     total_pages = (len(unique_branches) + branches_per_page - 1) // branches_per_page
@@ -232,10 +252,11 @@ def get_college_choice(df):
 
 def calculate_admission_chance(margin):
     """Calculate admission chance based on margin"""
-    if margin >= 0:
-        return min((margin + 5) / 10, 1) * 100
-    else:
-        return max(0, (1 + margin / 20) * 100)
+    margin = np.asarray(margin, dtype=float)
+    chance = np.where(margin >= 0,
+                      np.minimum((margin + 5) / 10, 1) * 100,
+                      np.maximum(0, (1 + margin / 20) * 100))
+    return chance if chance.ndim else float(chance)
 
 def print_admission_chance(chance):
     if chance >= 80:
@@ -249,53 +270,23 @@ def print_admission_chance(chance):
     print(f"Admission Chance: {chance_str}")
 
 def predict_all_colleges(predictor, df, cutoff_mark):
-    predictions = []
-    
-    for _, row in df.iterrows():
-        predicted_cutoff = predictor.predict_cutoff(
-            row['COLLEGE NAME'],
-            row['BRANCH NAME']
-        )
-        
-        if predicted_cutoff is not None:
-            margin = cutoff_mark - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            
-            predictions.append({
-                'COLLEGE NAME': row['COLLEGE NAME'],
-                'BRANCH NAME': row['BRANCH NAME'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': cutoff_mark,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
-    
-    return pd.DataFrame(predictions)
+    # Score every row in one model call; rows with names unseen in training come back as NaN
+    predicted_cutoffs = predictor.predict_cutoffs(df['COLLEGE NAME'], df['BRANCH NAME'])
+    margins = cutoff_mark - predicted_cutoffs
+
+    predictions = pd.DataFrame({
+        'COLLEGE NAME': df['COLLEGE NAME'].to_numpy(),
+        'BRANCH NAME': df['BRANCH NAME'].to_numpy(),
+        'Predicted Cutoff': predicted_cutoffs,
+        'Your Cutoff': cutoff_mark,
+        'Margin': margins,
+        'Admission Chance': calculate_admission_chance(margins)
+    })
+    return predictions.dropna(subset=['Predicted Cutoff']).reset_index(drop=True)
 
 def predict_branch_specific(predictor, df, cutoff_mark, branch_name):
     branch_df = df[df['BRANCH NAME'] == branch_name]
-    predictions = []
-    
-    for _, row in branch_df.iterrows():
-        predicted_cutoff = predictor.predict_cutoff(
-            row['COLLEGE NAME'],
-            row['BRANCH NAME']
-        )
-        
-        if predicted_cutoff is not None:
-            margin = cutoff_mark - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            
-            predictions.append({
-                'COLLEGE NAME': row['COLLEGE NAME'],
-                'BRANCH NAME': row['BRANCH NAME'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': cutoff_mark,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
-    
-    return pd.DataFrame(predictions)
+    return predict_all_colleges(predictor, branch_df, cutoff_mark)
 
 def show_college_branches(predictor, df, college_name, user_cutoff):
     college_df = df[df['COLLEGE NAME'] == college_name]
@@ -303,26 +294,7 @@ def show_college_branches(predictor, df, college_name, user_cutoff):
     print(f"\nBranches available at {college_name}")
     print("=" * 100)
     
-    predictions = []
-    for _, row in college_df.iterrows():
-        predicted_cutoff = predictor.predict_cutoff(
-            row['COLLEGE NAME'],
-            row['BRANCH NAME']
-        )
-        
-        if predicted_cutoff is not None:
-            margin = user_cutoff - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            
-            predictions.append({
-                'BRANCH NAME': row['BRANCH NAME'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': user_cutoff,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
-    
-    predictions_df = pd.DataFrame(predictions)
+    predictions_df = predict_all_colleges(predictor, college_df, user_cutoff)
     if not predictions_df.empty:
         predictions_df = predictions_df.sort_values('Predicted Cutoff', ascending=False)
         
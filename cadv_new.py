@@ -1,18 +1,90 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
-import xgboost as xgb
+# xgboost and scikit-learn are imported inside the training and evaluation code, so a
+# process that only serves a saved artifact ('trees' or 'table' mode) never loads them
+from tnea_vocab import CategoryVocabulary
+from tnea_pipeline import COMMUNITIES, build_long_table, is_long_table
+from tnea_trees import TreeEnsemble
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Bump whenever the artifact layout changes so stale artifacts are retrained
+ARTIFACT_VERSION = 8
+ARTIFACT_ROOT = 'models'
+
+# Evaluation modes for train_model: 'eager' evaluates before returning, 'lazy' on the
+# first get_metrics() call, 'background' on a worker thread while the model serves
+EVALUATION_MODES = ('eager', 'lazy', 'background')
+# Training modes: 'encoded' splits on the vocabulary codes as numbers, 'categorical'
+# uses XGBoost's native categorical splits on the same codes with the hist tree method
+TRAINING_MODES = ('encoded', 'categorical')
+EVALUATION_KEYS = ('r2', 'rmse', 'mae', 'cv_scores', 'cv_mean', 'pred_time', 'feature_importance',
+                   'quantile_coverage', 'evaluation_error')
+# Cutoff quantiles predicted by the quantile model; admission chances interpolate between them
+QUANTILES = (0.1, 0.5, 0.9)
+# Quantile-based admission chances (percent) never claim a certain miss or admission
+CHANCE_BOUNDS = (1.0, 99.0)
+# Split-conformal calibration groups: 'band' pools hold-out residuals by band of the
+# predicted cutoff, 'branch' by branch code. Groups with fewer than MIN_CONFORMAL_GROUP
+# residuals use the pooled residuals instead.
+CONFORMAL_GROUPINGS = ('band', 'branch')
+CONFORMAL_BANDS = 8
+MIN_CONFORMAL_GROUP = 30
+# Valid TNEA cutoffs (maths + physics / 2 + chemistry / 2); predictions are clipped to it
+CUTOFF_RANGE = (0.0, 200.0)
+# Learning rate of the trees update() appends, well below training's so one new year
+# nudges the model instead of overriding it
+UPDATE_LEARNING_RATE = 0.02
+# Tree cap when early stopping or a time budget decides the booster size
+MAX_ESTIMATORS = 1000
+FEATURE_LABELS = {'COLLEGE_CODE': 'College', 'BRANCH_CODE': 'Branch', 'YEAR': 'Year', 'COMMUNITY_CODE': 'Community'}
+_evaluation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-evaluation')
 
 class EnhancedCollegePredictorML:
-    def __init__(self):
+    # 'model' predicts with the xgboost booster, 'trees' with its NumPy export
+    # (tnea_trees.TreeEnsemble) and 'table' from the precomputed cutoff table only
+    SERVING_MODES = ('model', 'trees', 'table')
+
+    def __init__(self, serving_mode='model', training_mode='encoded', n_jobs=None, quantiles=QUANTILES,
+                 conformal_by='band', early_stopping_rounds=None, time_budget=None):
+        if serving_mode not in self.SERVING_MODES:
+            raise ValueError(f"serving_mode must be one of {self.SERVING_MODES}, got '{serving_mode}'")
+        if training_mode not in TRAINING_MODES:
+            raise ValueError(f"training_mode must be one of {TRAINING_MODES}, got '{training_mode}'")
+        if conformal_by not in CONFORMAL_GROUPINGS:
+            raise ValueError(f"conformal_by must be one of {CONFORMAL_GROUPINGS}, got '{conformal_by}'")
+        self.serving_mode = serving_mode
+        self.training_mode = training_mode
+        self.n_jobs = n_jobs  # XGBoost threads; None uses every core
+        self.quantiles = tuple(quantiles) if quantiles else None  # None skips the quantile model
+        self.conformal_by = conformal_by
+        # Either one grows the booster up to MAX_ESTIMATORS trees against a validation split
+        self.early_stopping_rounds = early_stopping_rounds
+        self.time_budget = time_budget  # Wall-clock seconds for boosting
         self.model = None
-        self.college_encoder = LabelEncoder()
-        self.branch_encoder = LabelEncoder()
+        self.trees = None  # NumPy export of the booster for 'trees' serving
+        self.cutoff_table = None  # Dense college x branch x community predictions, built after training
+        self.quantile_model = None  # One booster predicting every cutoff quantile
+        self.quantile_table = None  # cutoff_table with a trailing quantile axis
+        self.target_stats = None  # Per-code target sums and counts behind the unseen-name fallbacks
+        self.conformal = None  # Sorted hold-out residuals per calibration group, set by calibrate_conformal
+        self.fingerprint = None  # Training data fingerprint of the saved artifact, set by load_or_train_predictor
+        self.college_encoder = CategoryVocabulary()
+        self.branch_encoder = CategoryVocabulary()
         self.feature_importance = None
         self.metrics = {}
+        self._pending_evaluation = None
+        self._evaluation_future = None
+        self._evaluation_callbacks = []
+        self._evaluation_lock = threading.Lock()  # Guards the pending evaluation and callbacks; held briefly
+        self._evaluation_run_lock = threading.Lock()  # Held while an evaluation runs, so runs never overlap
         self.seat_matrix = {
             'OC': 1031,
             'BC': 882,
@@ -26,132 +98,1209 @@ class EnhancedCollegePredictorML:
         self.trained_colleges = []  # Store trained college names
         self.trained_branches = []  # Store trained branch names
 
+        # Long-format training (tnea_pipeline.build_long_table) adds year and community
+        # features; colleges and branches are then identified by their TNEA codes
+        self.long_format = False
+        self.feature_columns = ['COLLEGE_CODE', 'BRANCH_CODE']
+        self.serving_year = None
+
+    @property
+    def communities(self):
+        """Communities along the last axis of the cutoff table"""
+        return COMMUNITIES if self.long_format else [None]
+
+    def _set_long_format(self, long_format):
+        self.long_format = long_format
+        self.feature_columns = ['COLLEGE_CODE', 'BRANCH_CODE']
+        if long_format:
+            self.feature_columns += ['YEAR', 'COMMUNITY_CODE']
+
+    def _key_columns(self):
+        """Columns holding the college and branch keys of the training data"""
+        if self.long_format:
+            return 'college_code', 'branch_code'
+        return 'College Name', 'Branch Name'
+
     def preprocess_data(self, df):
         """Preprocess the data for training"""
-        processed_df = df.copy()
+        self._set_long_format(is_long_table(df))
+        processed_df = _standardize_columns(df)
+        college_column, branch_column = self._key_columns()
 
-        # Fill NaN values in 'College Name' and 'Branch Name' with a string BEFORE encoding
-        processed_df['College Name'] = processed_df['College Name'].fillna('Unknown College')
-        processed_df['Branch Name'] = processed_df['Branch Name'].fillna('Unknown Branch')
+        # Fit the vocabularies; rows without a college or branch name cannot be served, so drop them
+        self.college_encoder = CategoryVocabulary.fit(processed_df[college_column])
+        self.branch_encoder = CategoryVocabulary.fit(processed_df[branch_column])
 
-        #Explicitly cast to str for avoiding errors
-        processed_df['College Name'] = processed_df['College Name'].astype(str)
-        processed_df['Branch Name'] = processed_df['Branch Name'].astype(str)
+        return self._encode_rows(processed_df)
 
-        # Fit the encoders only on non-null values:
-        self.college_encoder.fit(processed_df['College Name'])
-        self.branch_encoder.fit(processed_df['Branch Name'])
-
-        # Store the trained college and branch names
-        self.trained_colleges = list(self.college_encoder.classes_)
-        self.trained_branches = list(self.branch_encoder.classes_)
+    def _encode_rows(self, processed_df):
+        """Encode standardized rows with the current vocabularies and attach the target"""
+        # Store the trained (normalized) college and branch names
+        self.trained_colleges = self.college_encoder.names
+        self.trained_branches = self.branch_encoder.names
 
         # Encode categorical variables
-        processed_df['COLLEGE_CODE'] = self.college_encoder.transform(processed_df['College Name'])
-        processed_df['BRANCH_CODE'] = self.branch_encoder.transform(processed_df['Branch Name'])
+        college_column, branch_column = self._key_columns()
+        processed_df['COLLEGE_CODE'] = self.college_encoder.encode(processed_df[college_column])
+        processed_df['BRANCH_CODE'] = self.branch_encoder.encode(processed_df[branch_column])
+        processed_df = processed_df[
+            (processed_df['COLLEGE_CODE'] != CategoryVocabulary.OOV_CODE) &
+            (processed_df['BRANCH_CODE'] != CategoryVocabulary.OOV_CODE)
+        ].copy()
+
+        if self.long_format:
+            processed_df['YEAR'] = processed_df['year'].astype(np.int16)
+            processed_df['COMMUNITY_CODE'] = pd.Categorical(
+                processed_df['community'], categories=COMMUNITIES
+            ).codes
+            processed_df = processed_df[processed_df['COMMUNITY_CODE'] >= 0].copy()
+            processed_df['MAX CUTOFF'] = processed_df['cutoff'].astype(np.float64)
+            processed_df['WEIGHT'] = processed_df['weight'].astype(np.float64)
+            return processed_df
 
-        # Use 'OC' column as the target variable and fill NaN with 0
-        processed_df['MAX CUTOFF'] = processed_df['OC'].fillna(0)
+        # Use the cutoff column as the target variable and fill NaN with 0
+        target_column = 'OC' if 'OC' in processed_df.columns else 'MAX CUTOFF'
+        processed_df['MAX CUTOFF'] = pd.to_numeric(processed_df[target_column], errors='coerce').fillna(0)
+        processed_df['COMMUNITY_CODE'] = 0
+        processed_df['WEIGHT'] = 1.0
 
         return processed_df
 
-    def train_model(self, df):
-        """Train the XGBoost model and calculate metrics"""
+    def train_model(self, df, evaluation='eager'):
+        """Train the XGBoost model and calculate metrics.
+
+        With evaluation='lazy' or 'background' the model is usable as soon as it is
+        fitted and the returned metrics only hold the training time and parameters;
+        call get_metrics() for the evaluation results.
+
+        With early_stopping_rounds or time_budget set, the booster size is chosen by
+        fit_with_validation instead of n_estimators, and the metrics also hold its
+        learning curve. model_params then records the tree count actually kept.
+        """
+        if evaluation not in EVALUATION_MODES:
+            raise ValueError(f"evaluation must be one of {EVALUATION_MODES}, got '{evaluation}'")
         start_time = time.time()
 
         # Preprocess data
         processed_df = self.preprocess_data(df)
 
-        # Prepare features and target
-        X = processed_df[['COLLEGE_CODE', 'BRANCH_CODE']]
+        # Prepare features, target and the sample weights of deduplicated rows
+        X = processed_df[self.feature_columns]
         y = processed_df['MAX CUTOFF']
+        weights = processed_df['WEIGHT']
+        if self.long_format:
+            # Serve predictions for the most recent year in the training data
+            self.serving_year = int(processed_df['YEAR'].max())
+
+        from sklearn.model_selection import train_test_split
+        import xgboost as xgb
 
         # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
+        X_train, X_test, y_train, y_test, weights_train, weights_test = train_test_split(
+            X, y, weights, test_size=0.2, random_state=42
         )
 
         # Define model parameters
+        model_params = self.model_params()
+
+        # Train model
+        learning_curve = None
+        if self.early_stopping_rounds or self.time_budget:
+            self.model, learning_curve = self.fit_with_validation(model_params, X_train, y_train, weights_train)
+            model_params = dict(model_params, n_estimators=len(self.model.get_booster().get_dump()))
+        else:
+            self.model = xgb.XGBRegressor(**model_params)
+            self.model.fit(X_train, y_train, sample_weight=weights_train)
+
+        # A single multi-output booster predicts every quantile in one call
+        quantile_params = None
+        if self.quantiles:
+            quantile_params = dict(model_params, objective='reg:quantileerror', quantile_alpha=list(self.quantiles))
+            self.quantile_model = xgb.XGBRegressor(**quantile_params)
+            self.quantile_model.fit(X_train, y_train, sample_weight=weights_train)
+
+        # Calculate training time
+        train_time = time.time() - start_time
+
+        # Store metrics; the evaluation results are added by _evaluate_model
+        self.metrics = {
+            'train_time': train_time,
+            'model_params': model_params,
+            'quantile_params': quantile_params
+        }
+        if learning_curve is not None:
+            self.metrics['learning_curve'] = learning_curve
+
+        # Calibrate first: the quantile table is built from the calibrated quantiles.
+        # Materialize every college/branch/community prediction so serving is an array lookup
+        self.calibrate_conformal(X_test, y_test, weights_test)
+        self.build_cutoff_table(processed_df)
+
+        # Hand the fitted booster to the evaluation so it survives table serving
+        self.schedule_evaluation(partial(
+            _evaluate_model, self.model, model_params, X, y, X_test, y_test, self.quantile_model, weights,
+            self.quantiles
+        ), evaluation)
+        if self.serving_mode == 'trees':
+            self.use_tree_serving()
+        elif self.serving_mode == 'table':
+            self.use_table_serving()
+
+        return self.metrics
+
+    def fit_with_validation(self, model_params, X_train, y_train, weights_train):
+        """Boost up to MAX_ESTIMATORS trees, monitoring RMSE on a validation split.
+
+        A fifth of the training rows is held out for validation. Boosting stops
+        after early_stopping_rounds trees without a validation improvement, or once
+        time_budget seconds have passed, whichever comes first. The booster is cut
+        back to its best iteration when early stopping is on. Returns the fitted
+        model and the learning curve, a DataFrame of train and validation RMSE per
+        tree.
+        """
+        from sklearn.model_selection import train_test_split
+        import xgboost as xgb
+
+        class TimeBudget(xgb.callback.TrainingCallback):
+            def __init__(self, seconds):
+                super().__init__()
+                self.deadline = time.time() + seconds
+
+            def after_iteration(self, model, epoch, evals_log):
+                return time.time() > self.deadline  # True stops boosting
+
+        X_fit, X_val, y_fit, y_val, weights_fit, weights_val = train_test_split(
+            X_train, y_train, weights_train, test_size=0.2, random_state=42
+        )
+        params = dict(model_params, n_estimators=MAX_ESTIMATORS, eval_metric='rmse',
+                      early_stopping_rounds=self.early_stopping_rounds)
+        model = xgb.XGBRegressor(**params, callbacks=[TimeBudget(self.time_budget)] if self.time_budget else None)
+        model.fit(X_fit, y_fit, sample_weight=weights_fit, eval_set=[(X_fit, y_fit), (X_val, y_val)],
+                  sample_weight_eval_set=[weights_fit, weights_val], verbose=False)
+
+        history = model.evals_result()
+        learning_curve = pd.DataFrame({
+            'train_rmse': history['validation_0']['rmse'],
+            'validation_rmse': history['validation_1']['rmse'],
+        })
+        n_trees = model.best_iteration + 1 if self.early_stopping_rounds else len(learning_curve)
+
+        # Reload the kept trees into a plain model so the tree export, artifacts and
+        # update() see exactly the booster that predicts
+        final_model = xgb.XGBRegressor()
+        final_model.load_model(bytearray(model.get_booster()[:n_trees].save_raw('json')))
+        return final_model, learning_curve
+
+    def model_params(self):
+        """XGBoost parameters for the training mode and the current feature columns"""
         model_params = {
             'n_estimators': 100,
             'max_depth': 6,
             'learning_rate': 0.1,
             'objective': 'reg:squarederror',
-            'random_state': 42
+            'random_state': 42,
+            'n_jobs': self.n_jobs
         }
+        if self.training_mode == 'categorical':
+            model_params.update({
+                'tree_method': 'hist',
+                'enable_categorical': True,
+                # YEAR is ordered; every other feature is a vocabulary or community code
+                'feature_types': ['q' if column == 'YEAR' else 'c' for column in self.feature_columns]
+            })
+        return model_params
 
-        # Train model
-        self.model = xgb.XGBRegressor(**model_params)
-        self.model.fit(X_train, y_train)
+    def build_cutoff_table(self, processed_df=None, accumulate=False):
+        """Precompute the predicted cutoff for every (college code, branch code, community) cell.
 
-        # Calculate training time
-        train_time = time.time() - start_time
+        The community axis has a single entry unless the model was trained on the long
+        table, in which case cells are predicted for serving_year. Row and column 0
+        belong to the out-of-vocabulary code. They hold fallbacks for unseen names: the
+        mean training cutoff of the branch (unseen college) or of the college (unseen
+        branch), per community. The cell with both names unseen stays NaN; an overall
+        mean says nothing about a pair the model knows neither half of. The means come
+        from processed_df, added to the existing target_stats when accumulate is True.
+        """
+        n_colleges = len(self.college_encoder)
+        n_branches = len(self.branch_encoder)
+        n_communities = len(self.communities)
 
-        # Make predictions
-        pred_start_time = time.time()
-        y_pred = self.model.predict(X_test)
-        pred_time = (time.time() - pred_start_time) * 1000  # Convert to milliseconds
+        grid = np.meshgrid(
+            np.arange(n_colleges), np.arange(n_branches), np.arange(n_communities), indexing='ij'
+        )
+        self.cutoff_table = self._predict_codes(*(axis.ravel() for axis in grid)).astype(np.float32).reshape(
+            n_colleges, n_branches, n_communities
+        )
 
-        # Calculate metrics
-        r2 = r2_score(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        mae = mean_absolute_error(y_test, y_pred)
+        if processed_df is not None:
+            stats = _target_stats(processed_df, n_colleges, n_branches, n_communities)
+            if accumulate and self.target_stats is not None:
+                stats = {key: _pad_to(values, len(stats[key])) + stats[key]
+                         for key, values in self.target_stats.items()}
+            self.target_stats = stats
 
-        # Calculate cross-validation scores
-        cv_scores = cross_val_score(self.model, X, y, cv=5)
+        oov = CategoryVocabulary.OOV_CODE
+        self.cutoff_table[oov, :, :] = np.nan
+        self.cutoff_table[:, oov, :] = np.nan
+        if self.target_stats is not None:
+            stats = self.target_stats
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.cutoff_table[1:, oov, :] = stats['college_sums'][1:] / stats['college_counts'][1:]
+                self.cutoff_table[oov, 1:, :] = stats['branch_sums'][1:] / stats['branch_counts'][1:]
 
-        # Get feature importance
-        feature_importance = pd.DataFrame({
-            'feature': ['College', 'Branch'],
-            'importance': self.model.feature_importances_
-        })
+        if self.quantile_model is not None:
+            self.build_quantile_table(grid)
+        return self.cutoff_table
 
-        # Store metrics
-        self.metrics = {
-            'r2': r2,
-            'rmse': rmse,
-            'mae': mae,
-            'cv_scores': cv_scores,
-            'cv_mean': cv_scores.mean(),
-            'train_time': train_time,
-            'pred_time': pred_time,
-            'model_params': model_params,
-            'feature_importance': feature_importance
+    def build_quantile_table(self, grid):
+        """Predict every quantile for the cutoff-table grid in one quantile model call.
+
+        Quantiles are calibrated and sorted per cell so they never cross. Cells with an
+        unseen college or branch take the cutoff-table fallback shifted by the
+        community's average quantile offsets from the point prediction.
+        """
+        n_colleges, n_branches, n_communities = self.cutoff_table.shape
+        predictions = self._predict_codes(*(axis.ravel() for axis in grid), model=self.quantile_model)
+        self.quantile_table = self._calibrate_quantiles(predictions).astype(np.float32).reshape(
+            n_colleges, n_branches, n_communities, -1
+        )
+
+        offsets = np.nanmean(
+            self.quantile_table[1:, 1:] - self.cutoff_table[1:, 1:, :, None], axis=(0, 1)
+        )
+        oov = CategoryVocabulary.OOV_CODE
+        self.quantile_table[oov, :] = self.cutoff_table[oov, :, :, None] + offsets
+        self.quantile_table[:, oov] = self.cutoff_table[:, oov, :, None] + offsets
+        return self.quantile_table
+
+    def calibrate_conformal(self, X_test, y_test, weights_test=None):
+        """Keep the hold-out residuals behind predict_intervals and conformal_chances.
+
+        Residuals (cutoff - prediction) are grouped by predicted cutoff band or by
+        branch code, depending on conformal_by, and sorted within each group. Group 0
+        pools every residual and stands in for groups with fewer than
+        MIN_CONFORMAL_GROUP rows and for unseen branches. Integer sample weights
+        repeat the residual of a deduplicated row.
+
+        With a quantile model, each quantile also gets the shift that makes it cover
+        its level on the hold-out rows: the conformal quantile of (cutoff - predicted
+        quantile) at that level. The quantile booster fits its training rows too closely, so
+        unshifted q10-q90 ranges cover far less than 80% of unseen cutoffs.
+        """
+        predictions = np.asarray(self.model.predict(X_test), dtype=np.float64)
+        residuals = np.asarray(y_test, dtype=np.float64) - predictions
+        if weights_test is not None:
+            repeats = np.asarray(weights_test).astype(np.int64)
+            predictions, residuals = np.repeat(predictions, repeats), np.repeat(residuals, repeats)
+            branch_codes = np.repeat(X_test['BRANCH_CODE'].to_numpy(dtype=np.int64), repeats)
+        else:
+            branch_codes = X_test['BRANCH_CODE'].to_numpy(dtype=np.int64)
+
+        if self.conformal_by == 'band':
+            # Equal-count bands of the predicted cutoff, as many as the residuals can fill;
+            # band b is group b + 1
+            n_bands = max(1, min(CONFORMAL_BANDS, len(residuals) // MIN_CONFORMAL_GROUP))
+            edges = np.quantile(predictions, np.linspace(0, 1, n_bands + 1)[1:-1])
+            groups = np.searchsorted(edges, predictions, side='right') + 1
+            n_groups = n_bands + 1
+        else:
+            edges = np.empty(0)
+            groups = branch_codes
+            n_groups = len(self.branch_encoder)
+
+        counts = np.bincount(groups, minlength=n_groups)
+        group_rows = np.where(counts >= MIN_CONFORMAL_GROUP, np.arange(n_groups), 0)
+        group_rows[0] = 0
+
+        # Every residual appears once in the pooled group 0 and once in its own group
+        rows = np.concatenate([np.zeros(len(residuals), dtype=np.int64), group_rows[groups]])
+        values = np.concatenate([residuals, residuals])
+        by_value = np.lexsort((values, rows))
+        by_magnitude = np.lexsort((np.abs(values), rows))
+        self.conformal = {
+            'edges': edges,
+            'group_rows': group_rows,
+            'offsets': np.searchsorted(rows[by_value], np.arange(n_groups + 1)),
+            'residuals': values[by_value],
+            'abs_residuals': np.abs(values[by_magnitude]),
         }
+        if self.quantile_model is not None:
+            quantiles = np.sort(np.asarray(self.quantile_model.predict(X_test), dtype=np.float64), axis=-1)
+            quantile_residuals = np.asarray(y_test, dtype=np.float64)[:, None] - quantiles
+            self.conformal['quantile_offsets'] = _quantile_offsets(quantile_residuals, self.quantiles, weights_test)
+        return self.conformal
 
-        return self.metrics
+    def _calibrate_quantiles(self, quantiles):
+        """Shift raw quantile-model predictions by the hold-out calibration and re-sort them"""
+        if self.conformal is not None and 'quantile_offsets' in self.conformal:
+            quantiles = quantiles + self.conformal['quantile_offsets']
+        return np.sort(quantiles, axis=-1)
 
-    def predict_cutoff(self, college_name, branch_name):
-        """Predict cutoff for a given college and branch"""
+    def _conformal_rows(self, predictions, branch_codes):
+        """Calibration group of each prediction"""
+        if self.conformal_by == 'band':
+            groups = np.searchsorted(self.conformal['edges'], predictions, side='right') + 1
+        else:
+            groups = np.asarray(branch_codes, dtype=np.int64)
+        group_rows = self.conformal['group_rows']
+        # Branches added by update() have no residuals yet
+        return np.where(groups < len(group_rows), group_rows[np.minimum(groups, len(group_rows) - 1)], 0)
+
+    def _predict_codes(self, college_codes, branch_codes, community_codes, model=None):
+        """Run the booster (or the given model) on encoded rows, clipped to CUTOFF_RANGE"""
+        columns = [college_codes, branch_codes]
+        if self.long_format:
+            columns += [np.full(len(college_codes), self.serving_year), community_codes]
+        if model is None:
+            model = self.model if self.model is not None else self.trees
+        return np.clip(model.predict(np.column_stack(columns)), *CUTOFF_RANGE)
+
+    def _community_codes(self, community, n_rows):
+        """Cutoff-table community indices for a scalar or array of communities"""
+        if not self.long_format:
+            return np.zeros(n_rows, dtype=np.int64)
+        community = 'OC' if community is None else community
+        communities = np.broadcast_to(np.asarray(community, dtype=object), (n_rows,))
+        codes = pd.Categorical(communities, categories=COMMUNITIES).codes.astype(np.int64)
+        if (codes < 0).any():
+            raise ValueError(f"community must be one of {COMMUNITIES}")
+        return codes
+
+    def update(self, new_df, n_estimators=25, learning_rate=UPDATE_LEARNING_RATE, previous_df=None,
+               validation_size=0.2):
+        """Continue boosting the trained model on new rows, e.g. a new year or counselling round.
+
+        Unseen colleges and branches are appended to the vocabularies, so existing codes
+        (and the rows encoded with them) stay valid. The n_estimators added trees use
+        learning_rate and are fitted on the new rows plus previous_df, the earlier
+        training data, when given. Without it the trees only see the new rows: a new
+        year then cannot be told apart from the earlier ones and every prediction moves.
+
+        validation_size of those rows is held out. When the updated model's weighted
+        RMSE on them is worse than the current model's, the update is rejected and
+        the predictor is left unchanged. Returns a report of the hold-out errors,
+        whether the update was accepted and how far the predictions for previously
+        known pairs moved.
+        """
         if self.model is None:
-            return None
+            raise ValueError("update needs the booster; load the predictor with serving_mode='model'")
+        frames = [new_df] if previous_df is None else [new_df, previous_df]
+        if any(is_long_table(frame) != self.long_format for frame in frames):
+            raise ValueError("update data must use the same layout (long or wide) as the training data")
+        from sklearn.model_selection import train_test_split
+        import xgboost as xgb
+
+        start_time = time.time()
+        previous_state = (CategoryVocabulary(self.college_encoder.names), CategoryVocabulary(self.branch_encoder.names),
+                          self.serving_year)
+        previous_table = self.cutoff_table
+        processed_df = _standardize_columns(new_df)
+        college_column, branch_column = self._key_columns()
+        new_colleges = self.college_encoder.extend(processed_df[college_column])
+        new_branches = self.branch_encoder.extend(processed_df[branch_column])
+        processed_df = self._encode_rows(processed_df)
+        if self.long_format:
+            self.serving_year = max(self.serving_year, int(processed_df['YEAR'].max()))
+
+        rows = processed_df
+        if previous_df is not None:
+            rows = pd.concat([processed_df, self._encode_rows(_standardize_columns(previous_df))], ignore_index=True)
+        holdout = None
+        if validation_size and len(rows) >= 10:
+            rows, holdout = train_test_split(rows, test_size=validation_size, random_state=42)
+
+        # Append n_estimators trees to the existing boosters
+        def boost(model, params):
+            updated = xgb.XGBRegressor(**dict(params, n_estimators=n_estimators, learning_rate=learning_rate))
+            updated.fit(rows[self.feature_columns], rows['MAX CUTOFF'], sample_weight=rows['WEIGHT'],
+                        xgb_model=model.get_booster())
+            return updated
+
+        def holdout_rmse(model):
+            predictions = np.clip(model.predict(holdout[self.feature_columns]), *CUTOFF_RANGE)
+            return float(np.sqrt(np.average((predictions - holdout['MAX CUTOFF']) ** 2, weights=holdout['WEIGHT'])))
+
+        model = boost(self.model, self.metrics['model_params'])
+        rmse_before = rmse_after = None
+        if holdout is not None:
+            rmse_before, rmse_after = holdout_rmse(self.model), holdout_rmse(model)
+        report = {
+            'rows': len(processed_df),
+            'new_colleges': len(new_colleges),
+            'new_branches': len(new_branches),
+            'added_trees': n_estimators,
+            'learning_rate': learning_rate,
+            'holdout_rmse_before': rmse_before,
+            'holdout_rmse_after': rmse_after,
+            'accepted': rmse_before is None or rmse_after <= rmse_before,
+        }
+        if not report['accepted']:
+            print(f"Update rejected: hold-out RMSE would rise from {rmse_before:.3f} to {rmse_after:.3f}")
+            self.college_encoder, self.branch_encoder, self.serving_year = previous_state
+            self.trained_colleges = self.college_encoder.names
+            self.trained_branches = self.branch_encoder.names
+            report.update(update_time=time.time() - start_time, mean_shift=0.0, max_shift=0.0, shifted_over_1_mark=0.0)
+            return report
+
+        self.model = model
+        if self.quantile_model is not None:
+            self.quantile_model = boost(self.quantile_model, self.metrics['quantile_params'])
+        report['update_time'] = time.time() - start_time
+
+        self.build_cutoff_table(processed_df, accumulate=True)
+
+        # Compare predictions for the pairs that existed before the update
+        n_colleges, n_branches, _ = previous_table.shape
+        shift = np.abs(self.cutoff_table[1:n_colleges, 1:n_branches] - previous_table[1:, 1:])
+        shift = shift[~np.isnan(shift)]
+        report.update({
+            'mean_shift': float(shift.mean()) if shift.size else 0.0,
+            'max_shift': float(shift.max()) if shift.size else 0.0,
+            'shifted_over_1_mark': float((shift > 1).mean()) if shift.size else 0.0,
+        })
+
+        # Hold-out metrics describe the model before the update, so drop them. The conformal
+        # residuals are kept: they still bound the update's typical error until recalibrated
+        for key in EVALUATION_KEYS:
+            self.metrics.pop(key, None)
+        self.metrics.setdefault('updates', []).append(report)
+        return report
+
+    def schedule_evaluation(self, evaluate, evaluation='background'):
+        """Run evaluate() now, on first use, or on the background worker, depending on evaluation"""
+        with self._evaluation_lock:
+            self._pending_evaluation = evaluate
+            self._evaluation_future = None
+        if evaluation == 'eager':
+            self._run_pending_evaluation()
+        elif evaluation == 'background':
+            self._evaluation_future = _evaluation_executor.submit(self._run_pending_evaluation)
+
+    def _run_pending_evaluation(self):
+        # A caller arriving during a background run waits on the run lock, then finds
+        # nothing pending. The state lock is never held while evaluate() runs, so
+        # on_evaluation_complete and schedule_evaluation never wait for an evaluation
+        with self._evaluation_run_lock:
+            with self._evaluation_lock:
+                evaluate = self._pending_evaluation
+            if evaluate is None:
+                return
+            try:
+                evaluation = evaluate()
+            except Exception as e:
+                # A failed evaluation still completes: the error takes the place of the results
+                print(f"Model evaluation failed. Error: {e}")
+                evaluation = {'evaluation_error': str(e)}
+
+            with self._evaluation_lock:
+                if self._pending_evaluation is not evaluate:
+                    return  # Rescheduled while running; the new evaluation supersedes this one
+                self._pending_evaluation = None
+                callbacks, self._evaluation_callbacks = self._evaluation_callbacks, []
+                self.metrics.pop('evaluation_error', None)
+                self.metrics.update(evaluation)
+
+        for callback in callbacks:
+            callback(evaluation)
+
+    @property
+    def metrics_ready(self):
+        """True once the evaluation metrics have been computed"""
+        return self._pending_evaluation is None
+
+    def get_metrics(self, wait=True):
+        """Return the metrics, computing a deferred evaluation first.
+
+        With wait=False a running background evaluation is not waited for, so the
+        result may only hold the training time and parameters. If the evaluation
+        failed, 'evaluation_error' holds the error message instead of the results.
+        """
+        if not self.metrics_ready:
+            if self._evaluation_future is not None and not wait:
+                return self.metrics
+            self._run_pending_evaluation()
+        return self.metrics
+
+    def on_evaluation_complete(self, callback):
+        """Call callback(evaluation) once the evaluation metrics are available.
+
+        If the evaluation failed, evaluation only holds 'evaluation_error'.
+        """
+        with self._evaluation_lock:
+            if self._pending_evaluation is not None:
+                self._evaluation_callbacks.append(callback)
+                return
+        callback({key: self.metrics[key] for key in EVALUATION_KEYS if key in self.metrics})
+
+    def save_evaluation(self, artifact_dir, evaluation):
+        """Cache evaluation results next to the model artifact; a failed evaluation is not
+        cached, so the next load of the artifact evaluates again"""
+        if 'evaluation_error' in evaluation:
+            return
+        with open(os.path.join(artifact_dir, 'evaluation.json'), 'w', encoding='utf-8') as f:
+            json.dump(_metrics_to_json(evaluation), f, indent=2)
+
+    def use_table_serving(self):
+        """Serve from the cutoff table only; the table answers every query, so release the booster"""
+        if self.cutoff_table is None:
+            self.build_cutoff_table()
+        self.serving_mode = 'table'
+        self.model = None
+        self.trees = None
+        self.quantile_model = None
+
+    def use_tree_serving(self):
+        """Serve from the NumPy export of the booster and release the booster itself"""
+        if self.trees is None:
+            self.trees = TreeEnsemble.from_booster(self.model.get_booster())
+        self.serving_mode = 'trees'
+        self.model = None
+        self.quantile_model = None
+
+    def save_artifact(self, artifact_dir, fingerprint=None):
+        """Write the booster, vocabularies, metrics and cutoff table to artifact_dir.
+
+        Each save writes its own version directory next to artifact_dir and then
+        publishes it with _publish_artifact, so a concurrent reader never sees a
+        half-written or missing artifact.
+        """
+        # A background evaluation may be adding to the metrics; save a snapshot without
+        # any evaluation error, so loading the artifact retries a failed evaluation
+        with self._evaluation_lock:
+            metrics = {key: value for key, value in self.metrics.items() if key != 'evaluation_error'}
+
+        artifact_dir = os.path.abspath(artifact_dir)
+        parent_dir = os.path.dirname(artifact_dir)
+        os.makedirs(parent_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(dir=parent_dir, prefix=f'.{os.path.basename(artifact_dir)}.')
 
         try:
-            # Handle unseen labels:
-            if college_name not in self.trained_colleges:
-                college_code = self.college_encoder.transform(['Unknown College'])[0]
-            else:
-                college_code = self.college_encoder.transform([str(college_name)])[0]  # Convert to string
+            if self.model is not None:
+                self.model.save_model(os.path.join(staging_dir, 'booster.json'))
+            if self.quantile_model is not None:
+                self.quantile_model.save_model(os.path.join(staging_dir, 'quantile_booster.json'))
+            trees = self.trees
+            if trees is None and self.model is not None and self.training_mode == 'encoded':
+                trees = TreeEnsemble.from_booster(self.model.get_booster())
+            if trees is not None:
+                trees.save(os.path.join(staging_dir, 'trees.npz'))
+            if self.cutoff_table is not None:
+                np.save(os.path.join(staging_dir, 'cutoff_table.npy'), self.cutoff_table)
+            if self.quantile_table is not None:
+                np.save(os.path.join(staging_dir, 'quantile_table.npy'), self.quantile_table)
+            if self.target_stats is not None:
+                np.savez(os.path.join(staging_dir, 'target_stats.npz'), **self.target_stats)
+            if self.conformal is not None:
+                np.savez(os.path.join(staging_dir, 'conformal.npz'), **self.conformal)
+
+            metadata = {
+                'version': ARTIFACT_VERSION,
+                'fingerprint': fingerprint,
+                'has_booster': self.model is not None,
+                'has_trees': trees is not None,
+                'has_quantile_booster': self.quantile_model is not None,
+                'quantiles': self.quantiles,
+                'conformal_by': self.conformal_by,
+                # Vocabularies in code order; code 0 stays reserved for unseen names
+                'trained_colleges': self.college_encoder.names,
+                'trained_branches': self.branch_encoder.names,
+                'long_format': self.long_format,
+                'serving_year': self.serving_year,
+                'training_mode': self.training_mode,
+                'metrics': _metrics_to_json(metrics),
+            }
+            with open(os.path.join(staging_dir, 'metadata.json'), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2)
 
-            if branch_name not in self.trained_branches:
-                branch_code = self.branch_encoder.transform(['Unknown Branch'])[0]
-            else:
-                branch_code = self.branch_encoder.transform([str(branch_name)])[0]    # Convert to string
+            _publish_artifact(staging_dir, artifact_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
 
+    @classmethod
+    def read_artifact_metadata(cls, artifact_dir):
+        """Return the artifact metadata, or None if artifact_dir holds no usable artifact"""
+        metadata_path = os.path.join(artifact_dir, 'metadata.json')
+        if not os.path.exists(metadata_path):
+            return None
+        with open(metadata_path, encoding='utf-8') as f:
+            metadata = json.load(f)
+        if metadata.get('version') != ARTIFACT_VERSION:
+            return None
+        return metadata
 
+    @classmethod
+    def load_artifact(cls, artifact_dir, serving_mode='model'):
+        """Load a predictor saved with save_artifact.
 
-            prediction = self.model.predict([[college_code, branch_code]])[0]
-            return float(prediction)
-        except Exception as e:
-            print(f"Prediction failed for College: {college_name}, Branch: {branch_name}.  Error: {e}")
+        Only 'model' serving mode reads the booster file and imports xgboost.
+        """
+        metadata = cls.read_artifact_metadata(artifact_dir)
+        if metadata is None:
+            raise FileNotFoundError(f"No version {ARTIFACT_VERSION} artifact found in '{artifact_dir}'")
+
+        predictor = cls(serving_mode=serving_mode, training_mode=metadata['training_mode'],
+                        quantiles=metadata['quantiles'], conformal_by=metadata['conformal_by'])
+        predictor.college_encoder = CategoryVocabulary(metadata['trained_colleges'])
+        predictor.branch_encoder = CategoryVocabulary(metadata['trained_branches'])
+        predictor.trained_colleges = predictor.college_encoder.names
+        predictor.trained_branches = predictor.branch_encoder.names
+        predictor._set_long_format(metadata['long_format'])
+        predictor.serving_year = metadata['serving_year']
+        predictor.fingerprint = metadata.get('fingerprint')
+        predictor.metrics = _metrics_from_json(metadata['metrics'])
+        evaluation_path = os.path.join(artifact_dir, 'evaluation.json')
+        if os.path.exists(evaluation_path):
+            with open(evaluation_path, encoding='utf-8') as f:
+                predictor.metrics.update(_metrics_from_json(json.load(f)))
+
+        table_path = os.path.join(artifact_dir, 'cutoff_table.npy')
+        if os.path.exists(table_path):
+            predictor.cutoff_table = np.load(table_path)
+        quantile_table_path = os.path.join(artifact_dir, 'quantile_table.npy')
+        if os.path.exists(quantile_table_path):
+            predictor.quantile_table = np.load(quantile_table_path)
+        stats_path = os.path.join(artifact_dir, 'target_stats.npz')
+        if os.path.exists(stats_path):
+            with np.load(stats_path) as stats:
+                predictor.target_stats = {key: stats[key] for key in stats.files}
+        conformal_path = os.path.join(artifact_dir, 'conformal.npz')
+        if os.path.exists(conformal_path):
+            with np.load(conformal_path) as conformal:
+                predictor.conformal = {key: conformal[key] for key in conformal.files}
+
+        if serving_mode == 'model':
+            if not metadata['has_booster']:
+                raise FileNotFoundError(f"Artifact in '{artifact_dir}' was saved without a booster")
+            import xgboost as xgb
+            predictor.model = xgb.XGBRegressor()
+            predictor.model.load_model(os.path.join(artifact_dir, 'booster.json'))
+            if metadata['has_quantile_booster']:
+                predictor.quantile_model = xgb.XGBRegressor()
+                predictor.quantile_model.load_model(os.path.join(artifact_dir, 'quantile_booster.json'))
+        elif serving_mode == 'trees':
+            if not metadata['has_trees']:
+                raise FileNotFoundError(f"Artifact in '{artifact_dir}' was saved without a tree export")
+            predictor.trees = TreeEnsemble.load(os.path.join(artifact_dir, 'trees.npz'))
+        elif predictor.cutoff_table is None:
+            raise FileNotFoundError(f"Artifact in '{artifact_dir}' has no cutoff table for table serving")
+
+        return predictor
+
+    def predict_cutoffs(self, colleges, branches, community=None, fallback=True):
+        """Predict cutoffs for arrays of colleges and branches in a single lookup or model call.
+
+        Returns a float array aligned with the inputs. Pairs with either the college
+        or the branch unseen during training get the cutoff table's fallback estimate
+        (the mean cutoff of the name that is known), or NaN when fallback is False or
+        no cutoff table is available. Pairs with both names unseen are always NaN.
+        Uses the precomputed cutoff table when available, so no booster call is made.
+
+        community (a name or an array of names) selects the community cutoff of a
+        long-format model and defaults to 'OC'; wide-format models ignore it.
+        """
+        if self.model is None and self.trees is None and self.cutoff_table is None:
+            return None
+
+        college_codes = self.college_encoder.encode(colleges)
+        branch_codes = self.branch_encoder.encode(branches)
+        community_codes = self._community_codes(community, len(college_codes))
+        known = (college_codes != CategoryVocabulary.OOV_CODE) & (branch_codes != CategoryVocabulary.OOV_CODE)
+
+        if self.cutoff_table is not None:
+            predictions = self.cutoff_table[college_codes, branch_codes, community_codes].astype(np.float64)
+            if not fallback:
+                predictions[~known] = np.nan
+            return predictions
+
+        predictions = np.full(len(known), np.nan)
+        if known.any():
+            predictions[known] = self._predict_codes(
+                college_codes[known], branch_codes[known], community_codes[known]
+            )
+        return predictions
+
+    def predict_cutoff(self, college_name, branch_name, community=None):
+        """Predict cutoff for a given college and branch; None when there is no estimate"""
+        predictions = self.predict_cutoffs([college_name], [branch_name], community)
+        if predictions is None or np.isnan(predictions[0]):
+            print(f"Prediction failed for College: {college_name}, Branch: {branch_name}.  No estimate available.")
+            return None
+        return float(predictions[0])
+
+    def predict_quantiles(self, colleges, branches, community=None):
+        """Predict every cutoff quantile for arrays of colleges and branches.
+
+        Returns an (n, len(quantiles)) array with one row per input pair, read from the
+        quantile table when available, otherwise from a single quantile model call.
+        Unseen pairs get the table's fallback rows, or NaN without a table. Returns
+        None if the predictor has no quantile model.
+        """
+        if self.quantile_table is None and self.quantile_model is None:
+            return None
+
+        college_codes = self.college_encoder.encode(colleges)
+        branch_codes = self.branch_encoder.encode(branches)
+        community_codes = self._community_codes(community, len(college_codes))
+
+        if self.quantile_table is not None:
+            return self.quantile_table[college_codes, branch_codes, community_codes].astype(np.float64)
+
+        known = (college_codes != CategoryVocabulary.OOV_CODE) & (branch_codes != CategoryVocabulary.OOV_CODE)
+        predictions = np.full((len(known), len(self.quantiles)), np.nan)
+        if known.any():
+            predictions[known] = self._calibrate_quantiles(self._predict_codes(
+                college_codes[known], branch_codes[known], community_codes[known], model=self.quantile_model
+            ))
+        return predictions
+
+    def admission_chances(self, cutoff_marks, colleges, branches, community=None):
+        """Chance (0-100) that each college/branch closes at or below the student's cutoff mark.
+
+        The predicted quantiles are read as points on the cutoff's distribution
+        function, e.g. (q10, 10%), (q50, 50%), (q90, 90%), and the chance interpolates
+        linearly between them. Beyond the outer quantiles the first and last segments
+        are extended, but the chance stays within CHANCE_BOUNDS: the quantiles say
+        nothing certain about the tails. Pairs without a prediction get NaN.
+        """
+        quantiles = self.predict_quantiles(colleges, branches, community)
+        if quantiles is None:
+            return None
+        cutoff_marks = np.broadcast_to(np.asarray(cutoff_marks, dtype=np.float64), (len(quantiles),))
+        return 100 * _quantile_cdf(cutoff_marks, quantiles, np.asarray(self.quantiles))
+
+    def predict_intervals(self, colleges, branches, community=None, coverage=0.9):
+        """Split-conformal cutoff ranges for arrays of colleges and branches.
+
+        Returns (predictions, lower, upper) arrays aligned with the inputs. Each range
+        is the prediction plus or minus the coverage-level quantile of the absolute
+        hold-out residuals in its calibration group, so about coverage of actual
+        cutoffs fall inside it. Groups with too few residuals for the requested
+        coverage get an infinite range. Returns None without a calibration.
+        """
+        if self.conformal is None:
+            return None
+        predictions = self.predict_cutoffs(colleges, branches, community)
+        if predictions is None:
+            return None
+        rows = self._conformal_rows(predictions, self.branch_encoder.encode(branches))
+
+        offsets = self.conformal['offsets']
+        start, n_residuals = offsets[rows], offsets[rows + 1] - offsets[rows]
+        rank = np.ceil((n_residuals + 1) * coverage).astype(np.int64) - 1
+        width = np.where(rank < n_residuals,
+                         self.conformal['abs_residuals'][start + np.clip(rank, 0, n_residuals - 1)], np.inf)
+        return predictions, predictions - width, predictions + width
+
+    def conformal_chances(self, cutoff_marks, colleges, branches, community=None):
+        """Risk-aware chance (0-100) that each college/branch closes at or below the cutoff mark.
+
+        The chance is the share of hold-out residuals in the prediction's calibration
+        group that would have kept the actual cutoff at or below the mark, counted
+        over n + 1. As with admission_chances, the result is clipped to CHANCE_BOUNDS,
+        so the two scales agree outside the range the residuals cover. Pairs without
+        a prediction get NaN. Returns None without a calibration.
+        """
+        if self.conformal is None:
+            return None
+        predictions = self.predict_cutoffs(colleges, branches, community)
+        if predictions is None:
             return None
+        rows = self._conformal_rows(predictions, self.branch_encoder.encode(branches))
+        margins = np.broadcast_to(np.asarray(cutoff_marks, dtype=np.float64), predictions.shape) - predictions
+
+        # Residuals are sorted within each group, so offsetting every group by a span
+        # wider than the residual range makes one searchsorted count all rows at once
+        offsets = self.conformal['offsets']
+        residuals = self.conformal['residuals']
+        bound = np.abs(residuals).max() + 1
+        span = 4 * bound
+        keys = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)) * span + residuals
+        targets = rows * span + np.clip(np.nan_to_num(margins), -bound, bound)
+        counts = np.searchsorted(keys, targets, side='right') - offsets[rows]
+
+        chances = np.clip(100 * counts / (offsets[rows + 1] - offsets[rows] + 1), *CHANCE_BOUNDS)
+        chances[np.isnan(margins)] = np.nan
+        return chances
 
     def adjust_chance_for_category(self, chance, category):
-        """Adjust the admission chance based on seat availability for the category."""
+        """Adjust the admission chance based on seat availability for the category.
+
+        chance may be a single value or an array of chances. The adjusted chance never
+        exceeds the upper CHANCE_BOUNDS.
+        """
         if category and category in self.seat_matrix:
             category_seats = self.seat_matrix[category]
             # Adjust the chance based on the proportion of seats available in that category.
             # You can modify the adjustment factor based on your domain knowledge.
             adjustment_factor = category_seats / self.total_seats
-            chance = min(100, chance * (1 + adjustment_factor * 0.5))  # Increase chance slightly
-        return chance
\ No newline at end of file
+            chance = np.minimum(CHANCE_BOUNDS[1], chance * (1 + adjustment_factor * 0.5))  # Increase chance slightly
+        return chance
+
+
+def _publish_artifact(version_dir, artifact_dir):
+    """Make artifact_dir serve the complete artifact in version_dir.
+
+    artifact_dir is a symlink to the current version directory. A new symlink is
+    renamed over it, which is atomic, so readers find either the old or the new
+    artifact, never none. Concurrent saves each publish a complete version and the
+    last rename wins. The version that was replaced is removed afterwards. A plain
+    directory left by an older save is renamed aside first. Where symlinks cannot
+    be created (e.g. Windows without developer mode) the directories themselves are
+    renamed, and artifact_dir is briefly missing between the two renames.
+    """
+    parent_dir = os.path.dirname(artifact_dir)
+    previous = os.path.realpath(artifact_dir) if os.path.islink(artifact_dir) else None
+    link = f'{version_dir}.link'
+    try:
+        os.symlink(os.path.basename(version_dir), link, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        link = None
+
+    if os.path.isdir(artifact_dir) and not os.path.islink(artifact_dir):
+        previous = f'{version_dir}.replaced'
+        try:
+            os.rename(artifact_dir, previous)
+        except FileNotFoundError:
+            previous = None  # A concurrent save moved it first
+
+    try:
+        os.replace(link or version_dir, artifact_dir)
+    except OSError:
+        if link is not None:
+            os.unlink(link)
+        raise
+    # Only remove a version directory of this artifact, never whatever else a link points to
+    if previous is not None and os.path.dirname(os.path.realpath(previous)) == os.path.realpath(parent_dir):
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def artifact_path(name='enhanced_predictor'):
+    """Versioned artifact directory for a named training dataset"""
+    return os.path.join(ARTIFACT_ROOT, f'{name}_v{ARTIFACT_VERSION}')
+
+
+def fingerprint_training_data(df):
+    """Stable hash of a training DataFrame's columns and contents"""
+    digest = hashlib.sha256()
+    digest.update('\x1f'.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _standardize_columns(df):
+    """Copy df with the column names the predictor trains on.
+
+    Accepts both the vocational layout ('College Name', 'OC') and the
+    max-cutoff layout ('COLLEGE NAME', 'MAX CUTOFF').
+    """
+    aliases = {'COLLEGE NAME': 'College Name', 'BRANCH NAME': 'Branch Name'}
+    return df.rename(columns={
+        alias: column for alias, column in aliases.items() if column not in df.columns
+    })
+
+
+def _target_stats(processed_df, n_colleges, n_branches, n_communities=1):
+    """Per-code, per-community weighted sums and counts of the training target"""
+    weights = processed_df['WEIGHT'].to_numpy(dtype=np.float64)
+    y = processed_df['MAX CUTOFF'].to_numpy(dtype=np.float64) * weights
+    community_codes = processed_df['COMMUNITY_CODE'].to_numpy(dtype=np.int64)
+
+    def bincount(codes, values, n_codes):
+        cells = codes.to_numpy(dtype=np.int64) * n_communities + community_codes
+        return np.bincount(cells, weights=values, minlength=n_codes * n_communities).reshape(n_codes, n_communities)
+
+    return {
+        'college_sums': bincount(processed_df['COLLEGE_CODE'], y, n_colleges),
+        'college_counts': bincount(processed_df['COLLEGE_CODE'], weights, n_colleges),
+        'branch_sums': bincount(processed_df['BRANCH_CODE'], y, n_branches),
+        'branch_counts': bincount(processed_df['BRANCH_CODE'], weights, n_branches),
+    }
+
+
+def _quantile_cdf(values, quantiles, levels):
+    """Piecewise-linear distribution function through the (quantile, level) knots of each row,
+    clipped to CHANCE_BOUNDS"""
+    rows = np.arange(len(quantiles))
+    # Extend the outer segments until they reach levels 0 and 1
+    lower = quantiles[:, 0] - (quantiles[:, 1] - quantiles[:, 0]) * levels[0] / (levels[1] - levels[0])
+    upper = quantiles[:, -1] + (quantiles[:, -1] - quantiles[:, -2]) * (1 - levels[-1]) / (levels[-1] - levels[-2])
+    knots = np.column_stack([lower, quantiles, upper])
+    knot_levels = np.concatenate([[0.0], levels, [1.0]])
+
+    # Segment of each value: between the last knot at or below it and the next one
+    segment = np.clip((knots <= values[:, None]).sum(axis=1), 1, knots.shape[1] - 1)
+    x0, x1 = knots[rows, segment - 1], knots[rows, segment]
+    width = x1 - x0
+    position = np.divide(values - x0, width, out=(values >= x1).astype(np.float64), where=width > 0)
+    cdf = knot_levels[segment - 1] + np.clip(position, 0, 1) * (knot_levels[segment] - knot_levels[segment - 1])
+    cdf = np.clip(cdf, CHANCE_BOUNDS[0] / 100, CHANCE_BOUNDS[1] / 100)
+    cdf[np.isnan(quantiles).any(axis=1) | np.isnan(values)] = np.nan
+    return cdf
+
+
+def _pad_to(values, length):
+    """Zero-pad an array to length along its first axis"""
+    return np.pad(values, [(0, length - len(values))] + [(0, 0)] * (values.ndim - 1))
+
+
+def load_or_train_predictor(df, artifact_dir=None, serving_mode='model', evaluation='eager',
+                            training_mode='encoded', n_jobs=None, fallback=False):
+    """Reuse the saved artifact when it was trained on the same data and training mode,
+    otherwise train and save.
+
+    Evaluation results are cached in the artifact directory once computed; see
+    train_model for the evaluation modes. With fallback=True, a failure to load or
+    train the XGBoost predictor (e.g. xgboost is not installed) returns the one-hot
+    ridge baseline of tnea_effects instead; it only offers predict_cutoff(s) and
+    get_metrics. Returns (predictor, metrics).
+    """
+    if fallback:
+        try:
+            return load_or_train_predictor(df, artifact_dir, serving_mode, evaluation, training_mode, n_jobs)
+        except Exception as e:
+            from tnea_effects import baseline_predictor
+            print(f"XGBoost predictor unavailable, serving the one-hot ridge baseline. Error: {e}")
+            predictor = baseline_predictor(df)
+            return predictor, predictor.metrics
+
+    artifact_dir = artifact_dir or artifact_path()
+    fingerprint = fingerprint_training_data(df)
+
+    metadata = EnhancedCollegePredictorML.read_artifact_metadata(artifact_dir)
+    if (metadata is not None and metadata.get('fingerprint') == fingerprint
+            and metadata.get('training_mode') == training_mode):
+        try:
+            predictor = EnhancedCollegePredictorML.load_artifact(artifact_dir, serving_mode=serving_mode)
+            if 'r2' not in predictor.metrics:
+                # The evaluation never finished for this artifact; redo it from the saved booster
+                predictor.schedule_evaluation(partial(_evaluate_artifact, artifact_dir, df, predictor.metrics['model_params']), evaluation)
+                predictor.on_evaluation_complete(partial(predictor.save_evaluation, artifact_dir))
+            return predictor, predictor.metrics
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load model artifact from {artifact_dir}, retraining. Error: {e}")
+
+    # Train with the booster attached so the saved artifact can serve any mode
+    predictor = EnhancedCollegePredictorML(training_mode=training_mode, n_jobs=n_jobs)
+    metrics = predictor.train_model(df, evaluation=evaluation)
+    predictor.fingerprint = fingerprint
+    try:
+        predictor.save_artifact(artifact_dir, fingerprint=fingerprint)
+        predictor.on_evaluation_complete(partial(predictor.save_evaluation, artifact_dir))
+    except OSError as e:
+        print(f"Could not save model artifact to {artifact_dir}. Error: {e}")
+
+    if serving_mode == 'trees':
+        predictor.use_tree_serving()
+    elif serving_mode == 'table':
+        predictor.use_table_serving()
+    return predictor, metrics
+
+
+def _evaluate_model(model, model_params, X, y, X_test, y_test, quantile_model=None, weights=None,
+                    quantile_levels=QUANTILES):
+    """Hold-out metrics, cross-validation scores and feature importance for a fitted booster.
+
+    weights are the sample weights of X, as in training; the cross-validation folds
+    fit and score with them. With a quantile model, quantile_coverage is the
+    calibrated coverage of its outer quantiles (see _calibrated_coverage).
+    """
+    from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+    import xgboost as xgb
+    from tnea_evaluation import evaluate_models
+
+    # Make predictions
+    pred_start_time = time.time()
+    y_pred = model.predict(X_test)
+    pred_time = (time.time() - pred_start_time) * 1000  # Convert to milliseconds
+
+    # Cross-validate fresh models built from the training parameters; folds run in-process
+    # because this usually executes on the background evaluation thread of a web worker
+    folds = evaluate_models(X, y, {'xgboost': partial(xgb.XGBRegressor, **model_params)}, sample_weight=weights,
+                            cv=5, n_jobs=1)
+    cv_scores = folds.attrs['folds']['r2'].to_numpy()
+
+    evaluation = {
+        'r2': r2_score(y_test, y_pred),
+        'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
+        'mae': mean_absolute_error(y_test, y_pred),
+        'cv_scores': cv_scores,
+        'cv_mean': cv_scores.mean(),
+        'pred_time': pred_time,
+        'feature_importance': pd.DataFrame({
+            'feature': [FEATURE_LABELS[column] for column in X.columns],
+            'importance': model.feature_importances_
+        })
+    }
+    if quantile_model is not None:
+        weights_test = None if weights is None else weights.loc[X_test.index]
+        evaluation['quantile_coverage'] = _calibrated_coverage(quantile_model, X_test, y_test, weights_test,
+                                                               quantile_levels)
+    return evaluation
+
+
+def _quantile_offsets(quantile_residuals, levels, weights=None):
+    """Split-conformal shift of each quantile from its hold-out residuals (cutoff - quantile).
+
+    Integer weights repeat the residuals of a deduplicated row. The conformal ranks
+    are rounded away from the median so the outer ranges keep their coverage on a
+    small hold-out.
+    """
+    if weights is not None:
+        quantile_residuals = np.repeat(quantile_residuals, np.asarray(weights).astype(np.int64), axis=0)
+    n, levels = len(quantile_residuals), np.asarray(levels)
+    ranks = np.where(levels < 0.5, np.floor((n + 1) * levels), np.ceil((n + 1) * levels)).astype(np.int64)
+    return np.sort(quantile_residuals, axis=0)[np.clip(ranks, 1, n) - 1, np.arange(len(levels))]
+
+
+def _calibrated_coverage(quantile_model, X, y, weights, levels):
+    """Weighted share of cutoffs between the calibrated lowest and highest quantile.
+
+    Serving calibrates on the whole hold-out, so its own rows cannot measure the
+    result. Each random half of the rows is instead calibrated on the other half and
+    scored, so no row is covered by offsets fitted on it.
+    """
+    quantiles = np.sort(np.asarray(quantile_model.predict(X), dtype=np.float64), axis=-1)
+    y = np.asarray(y, dtype=np.float64)
+    weights = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)
+    residuals = y[:, None] - quantiles
+    first_half = np.random.default_rng(42).permutation(len(y)) % 2 == 0
+    covered = np.zeros(len(y), dtype=bool)
+    for half in (first_half, ~first_half):
+        calibrated = np.sort(quantiles[half] + _quantile_offsets(residuals[~half], levels, weights[~half]), axis=-1)
+        covered[half] = (calibrated[:, 0] <= y[half]) & (y[half] <= calibrated[:, -1])
+    return float(np.average(covered, weights=weights))
+
+
+def _evaluate_artifact(artifact_dir, df, model_params):
+    """Evaluate a saved booster against the hold-out split of the data it was trained on"""
+    from sklearn.model_selection import train_test_split
+    import xgboost as xgb
+
+    model = xgb.XGBRegressor()
+    model.load_model(os.path.join(artifact_dir, 'booster.json'))
+    quantile_model = None
+    quantile_path = os.path.join(artifact_dir, 'quantile_booster.json')
+    if os.path.exists(quantile_path):
+        quantile_model = xgb.XGBRegressor()
+        quantile_model.load_model(quantile_path)
+
+    # Same data and split as train_model, so the hold-out rows match
+    predictor = EnhancedCollegePredictorML()
+    processed_df = predictor.preprocess_data(df)
+    X = processed_df[predictor.feature_columns]
+    y = processed_df['MAX CUTOFF']
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    metadata = EnhancedCollegePredictorML.read_artifact_metadata(artifact_dir) or {}
+    return _evaluate_model(model, model_params, X, y, X_test, y_test, quantile_model, processed_df['WEIGHT'],
+                           metadata.get('quantiles') or QUANTILES)
+
+
+def _metrics_to_json(metrics):
+    """Convert the metrics dict into JSON-serializable values"""
+    serializable = {}
+    for key, value in metrics.items():
+        if isinstance(value, pd.DataFrame):
+            value = value.to_dict(orient='list')
+        elif isinstance(value, np.ndarray):
+            value = value.tolist()
+        elif isinstance(value, np.generic):
+            value = value.item()
+        serializable[key] = value
+    return serializable
+
+
+def _metrics_from_json(metrics):
+    """Restore the array and DataFrame entries of a metrics dict read from JSON"""
+    restored = dict(metrics)
+    if 'cv_scores' in restored:
+        restored['cv_scores'] = np.asarray(restored['cv_scores'])
+    for key in ('feature_importance', 'learning_curve'):
+        if key in restored:
+            restored[key] = pd.DataFrame(restored[key])
+    return restored
+
+
+def compare_training_modes(df, n_jobs=None, repeats=50):
+    """Train every training mode on df and report model size, speed and hold-out accuracy.
+
+    single_row_ms is the median booster latency for one (college, branch) row and
+    batch_ms the latency for the full cutoff-table grid, both over repeats calls.
+    Returns a DataFrame indexed by training mode.
+    """
+    rows = []
+    for training_mode in TRAINING_MODES:
+        predictor = EnhancedCollegePredictorML(training_mode=training_mode, n_jobs=n_jobs, quantiles=None)
+        metrics = predictor.train_model(df, evaluation='lazy')
+        booster = predictor.model.get_booster()
+
+        grid = np.meshgrid(
+            np.arange(1, len(predictor.college_encoder)), np.arange(1, len(predictor.branch_encoder)), [0],
+            indexing='ij'
+        )
+        codes = [axis.ravel() for axis in grid]
+        single_row = [code[:1] for code in codes]
+
+        def latency_ms(batch):
+            timings = []
+            for _ in range(repeats):
+                start_time = time.perf_counter()
+                predictor._predict_codes(*batch)
+                timings.append((time.perf_counter() - start_time) * 1000)
+            return float(np.median(timings))
+
+        evaluation = predictor.get_metrics()
+        rows.append({
+            'training_mode': training_mode,
+            'train_time': metrics['train_time'],
+            'model_size_kb': len(booster.save_raw('ubj')) / 1024,
+            'n_nodes': len(booster.trees_to_dataframe()),
+            'single_row_ms': latency_ms(single_row),
+            'batch_rows': len(codes[0]),
+            'batch_ms': latency_ms(codes),
+            'r2': evaluation['r2'],
+            'rmse': evaluation['rmse'],
+        })
+    return pd.DataFrame(rows).set_index('training_mode')
+
+
+def compare_early_stopping(df, early_stopping_rounds=20, time_budget=None):
+    """Train with a fixed tree count and with early stopping on df; report size, speed and accuracy.
+
+    Returns a DataFrame indexed by run, including the best validation RMSE of the
+    early-stopping learning curve.
+    """
+    rows = []
+    for run, options in [('fixed', {}),
+                         ('early_stopping', {'early_stopping_rounds': early_stopping_rounds,
+                                             'time_budget': time_budget})]:
+        predictor = EnhancedCollegePredictorML(quantiles=None, **options)
+        metrics = predictor.train_model(df, evaluation='lazy')
+        evaluation = predictor.get_metrics()
+        learning_curve = metrics.get('learning_curve')
+        rows.append({
+            'run': run,
+            'n_trees': metrics['model_params']['n_estimators'],
+            'train_time': metrics['train_time'],
+            'pred_time': evaluation['pred_time'],
+            'r2': evaluation['r2'],
+            'rmse': evaluation['rmse'],
+            'best_validation_rmse': None if learning_curve is None else learning_curve['validation_rmse'].min(),
+        })
+    return pd.DataFrame(rows).set_index('run')
+
+
+def main():
+    print("\nXGBoost Training Mode Comparison")
+    print("=" * 50)
+
+    for label, df in [('Max cutoff data', pd.read_csv('cleaned_maxcutoff_data.csv')),
+                      ('Long-format cutoffs, all years', build_long_table(os.getcwd()))]:
+        print(f"\n{label} ({len(df)} rows):")
+        print(compare_training_modes(df).round(3).to_string())
+        print("\nFixed tree count vs early stopping:")
+        print(compare_early_stopping(df).round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
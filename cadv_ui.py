@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from cadv_new import EnhancedCollegePredictorML
+from cadv_new import load_or_train_predictor
+from tnea_display import show_predictions_table
 
 # Set page configuration with dark theme
 st.set_page_config(
@@ -188,8 +189,8 @@ def load_model():
     try:
         category_df = pd.read_csv("college_data.csv")
         max_cutoff_df = pd.read_csv("Unique_Colleges_Max_Cutoff.csv")
-        predictor = EnhancedCollegePredictorML()
-        metrics = predictor.train_model(max_cutoff_df)
+        # Reuses the saved model artifact; only retrains when the data has changed
+        predictor, metrics = load_or_train_predictor(max_cutoff_df, serving_mode='trees', evaluation='background')
         return predictor, category_df, max_cutoff_df, metrics
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
@@ -218,15 +219,6 @@ def calculate_admission_chance(cutoff_diff):
         else:
             return 10.0, "Very Low"
 
-def format_chance(chance, label):
-    """Format the admission chance with styling"""
-    if chance >= 80:
-        return f'<div class="high-chance">{label} ({chance:.1f}%)</div>'
-    elif chance >= 50:
-        return f'<div class="medium-chance">{label} ({chance:.1f}%)</div>'
-    else:
-        return f'<div class="low-chance">{label} ({chance:.1f}%)</div>'
-
 def display_predictions(predictions, cutoff_mark):
     """Display predictions with interactive visualizations"""
     if predictions.empty:
@@ -307,25 +299,8 @@ def display_predictions(predictions, cutoff_mark):
 
     # Detailed predictions
     st.markdown("### 📋 Detailed College Recommendations")
-    for _, row in predictions_sorted.iterrows():
-        with st.expander(f"{row['COLLEGE NAME']} - {row['BRANCH NAME']}"):
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Maximum Cutoff", f"{row['Max Cutoff']:.2f}")
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Cutoff Difference", f"{row['Cutoff Diff']:.2f}")
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(
-                    format_chance(row['Chance'], row['Label']),
-                    unsafe_allow_html=True
-                )
+    # One paged table, rendered on request, instead of an expander per college
+    show_predictions_table(predictions_sorted, key='detailed_predictions', label="Show detailed recommendations")
 
 def main():
     st.markdown('<div class="main-header"><h1>🎓 College Admission Predictor</h1></div>', unsafe_allow_html=True)
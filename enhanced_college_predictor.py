@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from tnea_completion import CutoffCompletion
+from tnea_pipeline import build_long_table
 
 def create_college_data():
     """Create initial CSV file from the college data"""
@@ -94,6 +96,27 @@ def create_college_data():
     df.to_csv('college_data.csv', index=False)
     return df
 
+def fill_missing_cutoffs(df, base_path='.'):
+    """Fill empty community cutoffs from the completed cutoff matrix of the Vocational files.
+
+    Returns a copy of df and a boolean frame marking the filled cells. Cells of pairs
+    missing from the Vocational files stay empty, and without those files df is
+    returned unchanged.
+    """
+    communities = ['OC', 'BC', 'BCM', 'MBC', 'SC', 'SCA', 'ST']
+    estimated = pd.DataFrame(False, index=df.index, columns=communities)
+    try:
+        completion = CutoffCompletion().fit(build_long_table(base_path))
+    except FileNotFoundError:
+        return df, estimated
+
+    df = df.copy()
+    for community in communities:
+        cutoffs, _, _ = completion.lookup(df['COLLEGE CODE'], df['BRANCH CODE'], community)
+        estimated[community] = df[community].isna() & ~np.isnan(cutoffs)
+        df[community] = df[community].astype(float).fillna(pd.Series(cutoffs, index=df.index))
+    return df, estimated
+
 def calculate_cutoff(maths, physics, chemistry):
     """Calculate cutoff mark based on TN Engineering formula"""
     return maths + (physics/2) + (chemistry/2)
@@ -163,8 +186,12 @@ def get_college_choice(df):
         except ValueError:
             print("Please enter a valid number")
 
-def predict_all_colleges(df, cutoff_mark):
-    """Mode 1: Predict top 10 colleges across all branches"""
+def predict_all_colleges(df, cutoff_mark, estimated=None):
+    """Mode 1: Predict top 10 colleges across all branches
+
+    estimated (from fill_missing_cutoffs) marks community cutoffs that were filled in
+    rather than published; they are flagged in the 'Estimated' column.
+    """
     communities = ['OC', 'BC', 'BCM', 'MBC', 'SC', 'SCA', 'ST']
     all_predictions = []
     
@@ -173,8 +200,9 @@ def predict_all_colleges(df, cutoff_mark):
         if not eligible.empty:
             eligible['Community'] = community
             eligible['Cutoff'] = eligible[community]
+            eligible['Estimated'] = False if estimated is None else estimated.loc[eligible.index, community]
             all_predictions.append(
-                eligible[['COLLEGE NAME', 'BRANCH NAME', 'BRANCH CODE', 'Community', 'Cutoff']]
+                eligible[['COLLEGE NAME', 'BRANCH NAME', 'BRANCH CODE', 'Community', 'Cutoff', 'Estimated']]
             )
     
     if all_predictions:
@@ -182,7 +210,7 @@ def predict_all_colleges(df, cutoff_mark):
         return combined_predictions.nlargest(10, 'Cutoff')
     return pd.DataFrame()
 
-def predict_branch_specific(df, cutoff_mark, branch_name):
+def predict_branch_specific(df, cutoff_mark, branch_name, estimated=None):
     """Mode 2: Predict top 10 colleges for specific branch"""
     communities = ['OC', 'BC', 'BCM', 'MBC', 'SC', 'SCA', 'ST']
     all_predictions = []
@@ -193,8 +221,9 @@ def predict_branch_specific(df, cutoff_mark, branch_name):
         if not eligible.empty:
             eligible['Community'] = community
             eligible['Cutoff'] = eligible[community]
+            eligible['Estimated'] = False if estimated is None else estimated.loc[eligible.index, community]
             all_predictions.append(
-                eligible[['COLLEGE NAME', 'BRANCH NAME', 'BRANCH CODE', 'Community', 'Cutoff']]
+                eligible[['COLLEGE NAME', 'BRANCH NAME', 'BRANCH CODE', 'Community', 'Cutoff', 'Estimated']]
             )
     
     if all_predictions:
@@ -202,7 +231,7 @@ def predict_branch_specific(df, cutoff_mark, branch_name):
         return combined_predictions.nlargest(10, 'Cutoff')
     return pd.DataFrame()
 
-def show_college_branches(df, college_name):
+def show_college_branches(df, college_name, estimated=None):
     """Mode 3: Show all branches for specific college"""
     college_df = df[df['COLLEGE NAME'] == college_name]
     communities = ['OC', 'BC', 'BCM', 'MBC', 'SC', 'SCA', 'ST']
@@ -210,18 +239,21 @@ def show_college_branches(df, college_name):
     print(f"\nBranches available at {college_name}:")
     print("=" * 100)
     
-    for _, row in college_df.iterrows():
+    for idx, row in college_df.iterrows():
         print(f"\nBranch: {row['BRANCH NAME']} ({row['BRANCH CODE']})")
         print("Cutoff marks by community:")
         for community in communities:
             if pd.notna(row[community]):
-                print(f"- {community}: {row[community]:.2f}")
+                marker = " (estimated)" if estimated is not None and estimated.loc[idx, community] else ""
+                print(f"- {community}: {row[community]:.2f}{marker}")
         print("-" * 50)
 
 def main():
     try:
         print("Preparing college data...")
         df = create_college_data()
+        # Community cutoffs missing from the table are filled in from the yearly Vocational files
+        df, estimated = fill_missing_cutoffs(df)
         
         # Get filter mode
         mode = get_filter_mode()
@@ -236,12 +268,12 @@ def main():
             if mode == 1:
                 # Mode 1: All colleges
                 print("\nFinding top 10 eligible colleges across all branches...")
-                predictions = predict_all_colleges(df, cutoff_mark)
+                predictions = predict_all_colleges(df, cutoff_mark, estimated)
             else:
                 # Mode 2: Branch specific
                 branch_name = get_branch_choice(df)
                 print(f"\nFinding top 10 eligible colleges for {branch_name}...")
-                predictions = predict_branch_specific(df, cutoff_mark, branch_name)
+                predictions = predict_branch_specific(df, cutoff_mark, branch_name, estimated)
             
             if not predictions.empty:
                 print("\nTop 10 Predicted Colleges:")
@@ -251,7 +283,7 @@ def main():
                     print(f"College: {row['COLLEGE NAME']}")
                     print(f"Branch: {row['BRANCH NAME']} ({row['BRANCH CODE']})")
                     print(f"Community: {row['Community']}")
-                    print(f"Cutoff Mark: {row['Cutoff']:.2f}")
+                    print(f"Cutoff Mark: {row['Cutoff']:.2f}" + (" (estimated)" if row.get('Estimated') else ""))
                     print("-" * 50)
             else:
                 print("\nNo colleges found matching your criteria.")
@@ -259,7 +291,7 @@ def main():
         else:
             # Mode 3: College specific
             college_name = get_college_choice(df)
-            show_college_branches(df, college_name)
+            show_college_branches(df, college_name, estimated)
             
     except Exception as e:
         print(f"An error occurred: {str(e)}")
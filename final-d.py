@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from cadv_new import EnhancedCollegePredictorML
+from cadv_new import load_or_train_predictor
+from tnea_display import show_predictions_table
 
 # Set page configuration with dark theme
 st.set_page_config(
@@ -138,40 +139,27 @@ def load_model():
     try:
         category_df = pd.read_csv("college_data.csv")
         max_cutoff_df = pd.read_csv("Unique_Colleges_Max_Cutoff.csv")
-        predictor = EnhancedCollegePredictorML()
-        metrics = predictor.train_model(max_cutoff_df)
+        # Reuses the saved model artifact; only retrains when the data has changed
+        predictor, metrics = load_or_train_predictor(max_cutoff_df, serving_mode='trees', evaluation='background')
         return predictor, category_df, max_cutoff_df, metrics
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         return None, None, None, None
 
-def calculate_admission_chance(cutoff_diff):
-    """Calculate admission chance based on cutoff difference"""
-    if cutoff_diff >= 0:
-        if cutoff_diff > 10:
-            return 99.0, "Guaranteed"
-        elif cutoff_diff > 5:
-            return 95.0, "Almost Certain"
-        else:
-            return 90.0, "Excellent"
-    else:
-        if cutoff_diff >= -5:
-            return 70.0, "Good"
-        elif cutoff_diff >= -10:
-            return 50.0, "Moderate"
-        elif cutoff_diff >= -15:
-            return 30.0, "Low"
-        else:
-            return 10.0, "Very Low"
-
-def format_chance(chance, label):
-    """Format the admission chance with styling"""
-    if chance >= 80:
-        return f'<div class="high-chance">{label} ({chance:.1f}%)</div>'
+def chance_label(chance):
+    """Label for an admission chance computed from the predicted cutoff quantiles"""
+    if chance >= 95:
+        return "Almost Certain"
+    elif chance >= 90:
+        return "Excellent"
+    elif chance >= 70:
+        return "Good"
     elif chance >= 50:
-        return f'<div class="medium-chance">{label} ({chance:.1f}%)</div>'
+        return "Moderate"
+    elif chance >= 30:
+        return "Low"
     else:
-        return f'<div class="low-chance">{label} ({chance:.1f}%)</div>'
+        return "Very Low"
 
 def display_predictions(predictions, cutoff_mark):
     """Display predictions with interactive visualizations"""
@@ -255,29 +243,17 @@ def display_predictions(predictions, cutoff_mark):
 
     # Detailed predictions
     st.markdown("### 📋 Detailed College Recommendations")
-    for _, row in predictions_sorted.iterrows():
-        with st.expander(f"{row['COLLEGE NAME']} - {row['BRANCH NAME']}"):
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric("Maximum Cutoff", f"{row['Max Cutoff']:.2f}")
-            
-            with col2:
-                st.metric("Cutoff Difference", f"{row['Cutoff Diff']:.2f}")
-            
-            with col3:
-                st.markdown(
-                    format_chance(row['Chance'], row['Label']),
-                    unsafe_allow_html=True
-                )
+    # One paged table, rendered on request, instead of an expander per college
+    show_predictions_table(predictions_sorted, key='detailed_predictions', label="Show detailed recommendations")
 
-def calculate_predictions(filtered_df, cutoff_mark):
+def calculate_predictions(predictor, filtered_df, cutoff_mark):
     """Calculate predictions for the filtered colleges"""
     predictions = []
-    for _, row in filtered_df.iterrows():
+    # Chances for every row in one call, from the predicted cutoff quantiles
+    chances = predictor.admission_chances(cutoff_mark, filtered_df['COLLEGE NAME'], filtered_df['BRANCH NAME'])
+    for (_, row), chance in zip(filtered_df.iterrows(), chances):
         max_cutoff = row['MAX CUTOFF']
         cutoff_diff = cutoff_mark - max_cutoff
-        chance, label = calculate_admission_chance(cutoff_diff)
         
         predictions.append({
             'COLLEGE NAME': row['COLLEGE NAME'],
@@ -285,7 +261,7 @@ def calculate_predictions(filtered_df, cutoff_mark):
             'Max Cutoff': max_cutoff,
             'Cutoff Diff': cutoff_diff,
             'Chance': chance,
-            'Label': label
+            'Label': chance_label(chance)
         })
     
     return pd.DataFrame(predictions)
@@ -390,6 +366,7 @@ def main():
             if st.button("GET PREDICTIONS 🎯", type="primary", key="predict_button"):
                 with st.spinner("Analyzing your chances... Please wait"):
                     st.session_state.predictions_df = calculate_predictions(
+                        predictor,
                         filtered_df, 
                         st.session_state.cutoff_mark
                     )
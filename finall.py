@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from cadv_new import EnhancedCollegePredictorML
+from cadv_new import load_or_train_predictor
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -41,8 +41,8 @@ def load_model():
     """Load and train the model"""
     try:
         df = pd.read_csv("Unique_Colleges_Max_Cutoff.csv")
-        predictor = EnhancedCollegePredictorML()
-        metrics = predictor.train_model(df)
+        # Reuses the saved model artifact; only retrains when the data has changed
+        predictor, metrics = load_or_train_predictor(df, serving_mode='trees', evaluation='background')
         return predictor, df, metrics
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
@@ -72,13 +72,20 @@ def main():
 
     # Display model metrics in expander
     with st.expander("Model Performance Metrics"):
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("R² Score", f"{metrics['r2']:.4f}")
-        with col2:
-            st.metric("RMSE", f"{metrics['rmse']:.4f}")
-        with col3:
-            st.metric("MAE", f"{metrics['mae']:.4f}")
+        # Evaluation runs in the background after startup; show it once it has finished
+        metrics = predictor.get_metrics(wait=False)
+        if 'evaluation_error' in metrics:
+            st.warning(f"Model evaluation failed: {metrics['evaluation_error']}")
+        elif 'r2' not in metrics:
+            st.info("Model evaluation is not available yet. Reopen this section in a moment.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("R² Score", f"{metrics['r2']:.4f}")
+            with col2:
+                st.metric("RMSE", f"{metrics['rmse']:.4f}")
+            with col3:
+                st.metric("MAE", f"{metrics['mae']:.4f}")
 
     # Input marks
     st.subheader("Enter Your Marks")
@@ -127,31 +134,22 @@ def main():
 
 def predict_all_colleges(predictor, df, cutoff_mark):
     """Predict cutoffs for all colleges"""
-    predictions = []
-    progress_bar = st.progress(0)
+    # Score every row in one model call instead of one call per row
+    predicted_cutoffs = predictor.predict_cutoffs(df['COLLEGE NAME'], df['BRANCH NAME'])
     
-    for idx, row in df.iterrows():
-        progress_bar.progress((idx + 1) / len(df))
-        predicted_cutoff = predictor.predict_cutoff(
-            row['COLLEGE NAME'],
-            row['BRANCH NAME']
-        )
-        
-        if predicted_cutoff is not None:
-            margin = cutoff_mark - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            
-            predictions.append({
-                'COLLEGE NAME': row['COLLEGE NAME'],
-                'BRANCH NAME': row['BRANCH NAME'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': cutoff_mark,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
+    # Margins and chances for all rows at once; rows without a prediction are dropped
+    known = ~np.isnan(predicted_cutoffs)
+    margins = cutoff_mark - predicted_cutoffs[known]
+    predictions = pd.DataFrame({
+        'COLLEGE NAME': df['COLLEGE NAME'].to_numpy()[known],
+        'BRANCH NAME': df['BRANCH NAME'].to_numpy()[known],
+        'Predicted Cutoff': predicted_cutoffs[known],
+        'Your Cutoff': cutoff_mark,
+        'Margin': margins,
+        'Admission Chance': calculate_admission_chance(margins)
+    })
     
-    progress_bar.empty()
-    return pd.DataFrame(predictions)
+    return predictions
 
 def predict_branch_specific(predictor, df, cutoff_mark, branch_name):
     """Predict cutoffs for specific branch"""
@@ -159,11 +157,8 @@ def predict_branch_specific(predictor, df, cutoff_mark, branch_name):
     return predict_all_colleges(predictor, branch_df, cutoff_mark)
 
 def calculate_admission_chance(margin):
-    """Calculate admission chance based on margin"""
-    if margin >= 0:
-        return min((margin + 5) / 10, 1) * 100
-    else:
-        return max(0, (1 + margin / 20) * 100)
+    """Calculate admission chance based on margin; margin may be an array"""
+    return np.where(margin >= 0, np.minimum((margin + 5) / 10, 1) * 100, np.maximum(0, (1 + margin / 20) * 100))
 
 def show_college_branches(predictor, df, college_name, user_cutoff):
     """Show predictions for all branches in a college"""
@@ -0,0 +1,19 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from tnea_pipeline import build_long_table  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def max_cutoff_df():
+    return pd.read_csv(os.path.join(REPO_ROOT, 'Unique_Colleges_Max_Cutoff.csv'))
+
+
+@pytest.fixture(scope='session')
+def long_df():
+    return build_long_table(REPO_ROOT)
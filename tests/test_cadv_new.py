@@ -0,0 +1,155 @@
+import os
+import threading
+import numpy as np
+from sklearn.model_selection import train_test_split
+import cadv_new
+from cadv_new import CHANCE_BOUNDS, CUTOFF_RANGE, EnhancedCollegePredictorML, load_or_train_predictor
+
+
+def test_background_evaluation_does_not_block_training(monkeypatch, tmp_path, max_cutoff_df):
+    release = threading.Event()
+
+    def slow_evaluation(*args, **kwargs):
+        release.wait(60)
+        return {'r2': 1.0}
+
+    monkeypatch.setattr(cadv_new, '_evaluate_model', slow_evaluation)
+    try:
+        predictor, metrics = load_or_train_predictor(max_cutoff_df, str(tmp_path), evaluation='background')
+        assert 'r2' not in metrics
+        assert not predictor.metrics_ready
+
+        completed = []
+        predictor.on_evaluation_complete(completed.append)  # Registers without waiting
+        assert completed == []
+    finally:
+        release.set()
+
+    assert predictor.get_metrics()['r2'] == 1.0
+    assert completed == [{'r2': 1.0}]
+
+
+def test_quantile_ranges_cover_held_out_cutoffs(max_cutoff_df):
+    # Nominal coverage of the q10-q90 range, averaged over a few hold-out splits
+    coverages = []
+    for seed in range(3):
+        train, test = train_test_split(max_cutoff_df, test_size=0.25, random_state=seed)
+        predictor = EnhancedCollegePredictorML(n_jobs=1)
+        predictor.train_model(train, evaluation='lazy')
+        quantiles = predictor.predict_quantiles(test['COLLEGE NAME'], test['BRANCH NAME'])
+        known = ~np.isnan(quantiles).any(axis=1)  # Pairs with both names unseen have no estimate
+        cutoffs = test['MAX CUTOFF'].to_numpy()[known]
+        coverages.append(np.mean((cutoffs >= quantiles[known, 0]) & (cutoffs <= quantiles[known, -1])))
+    assert abs(np.mean(coverages) - 0.8) < 0.05
+
+    chances = predictor.admission_chances(150.3, test['COLLEGE NAME'], test['BRANCH NAME'])
+    assert np.nanmin(chances) >= CHANCE_BOUNDS[0] and np.nanmax(chances) <= CHANCE_BOUNDS[1]
+    adjusted = predictor.adjust_chance_for_category(chances, 'OC')
+    assert np.nanmax(adjusted) <= CHANCE_BOUNDS[1]
+
+
+def test_unseen_pairs_fall_back_only_on_a_known_name(tmp_path, max_cutoff_df):
+    predictor, _ = load_or_train_predictor(max_cutoff_df, str(tmp_path), evaluation='lazy')
+    college, branch = max_cutoff_df.iloc[0][['COLLEGE NAME', 'BRANCH NAME']]
+
+    assert predictor.predict_cutoff('nope', 'nope') is None
+    assert predictor.predict_cutoff(college, 'nope') is not None
+    assert predictor.predict_cutoff('nope', branch) is not None
+
+    cutoffs = predictor.predict_cutoffs([college, 'nope'], ['nope', 'nope'], fallback=False)
+    assert np.isnan(cutoffs).all()
+    assert np.isnan(predictor.admission_chances(150.0, ['nope'], ['nope'])).all()
+
+
+def test_failed_evaluation_completes_with_its_error(monkeypatch, tmp_path, max_cutoff_df):
+    def failing_evaluation(*args, **kwargs):
+        raise ValueError('no folds')
+
+    monkeypatch.setattr(cadv_new, '_evaluate_model', failing_evaluation)
+    predictor, _ = load_or_train_predictor(max_cutoff_df, str(tmp_path), evaluation='background')
+    assert predictor.get_metrics()['evaluation_error'] == 'no folds'
+    assert predictor.metrics_ready
+
+    completed = []
+    predictor.on_evaluation_complete(completed.append)
+    assert completed == [{'evaluation_error': 'no folds'}]
+
+    # The error is not cached with the artifact, so the next load evaluates again
+    monkeypatch.setattr(cadv_new, '_evaluate_artifact', lambda *args, **kwargs: {'r2': 1.0})
+    reloaded, _ = load_or_train_predictor(max_cutoff_df, str(tmp_path), evaluation='eager')
+    assert reloaded.get_metrics()['r2'] == 1.0
+    assert 'evaluation_error' not in reloaded.get_metrics()
+
+
+def _weighted_rmse(predictor, df):
+    rows = predictor._encode_rows(cadv_new._standardize_columns(df))
+    predictions = predictor._predict_codes(rows['COLLEGE_CODE'].to_numpy(), rows['BRANCH_CODE'].to_numpy(),
+                                           rows['COMMUNITY_CODE'].to_numpy())
+    return np.sqrt(np.average((predictions - rows['MAX CUTOFF']) ** 2, weights=rows['WEIGHT']))
+
+
+def test_update_stays_in_range_and_does_not_worsen_errors(long_df):
+    previous, new = long_df[long_df['year'] < 2023], long_df[long_df['year'] == 2023]
+    predictor = EnhancedCollegePredictorML(n_jobs=1)
+    predictor.train_model(previous, evaluation='lazy')
+    previous_rmse, new_rmse = _weighted_rmse(predictor, previous), _weighted_rmse(predictor, new)
+
+    report = predictor.update(new, previous_df=previous)
+    assert report['accepted']
+    assert report['holdout_rmse_after'] <= report['holdout_rmse_before']
+    low, high = CUTOFF_RANGE
+    assert low <= np.nanmin(predictor.cutoff_table) and np.nanmax(predictor.cutoff_table) <= high
+    assert _weighted_rmse(predictor, previous) <= previous_rmse
+    assert _weighted_rmse(predictor, new) < new_rmse
+
+
+def test_update_that_worsens_holdout_error_is_rejected(long_df):
+    previous, new = long_df[long_df['year'] < 2023], long_df[long_df['year'] == 2023]
+    predictor = EnhancedCollegePredictorML(n_jobs=1)
+    predictor.train_model(previous, evaluation='lazy')
+    table, n_colleges = predictor.cutoff_table.copy(), len(predictor.college_encoder)
+
+    # Shuffled cutoffs boosted at a high learning rate only add noise
+    noise = new.assign(cutoff=np.random.default_rng(0).permutation(new['cutoff'].to_numpy()))
+    report = predictor.update(noise, learning_rate=1.0, previous_df=previous)
+    assert not report['accepted']
+    assert len(predictor.college_encoder) == n_colleges
+    np.testing.assert_array_equal(predictor.cutoff_table, table)
+
+
+def test_saving_swaps_the_artifact_atomically(tmp_path, max_cutoff_df):
+    artifact_dir = str(tmp_path / 'artifact')
+    predictor, _ = load_or_train_predictor(max_cutoff_df, artifact_dir, evaluation='lazy')
+    first_version = os.path.realpath(artifact_dir)
+
+    # Concurrent saves each publish a complete version; the last one wins
+    threads = [threading.Thread(target=predictor.save_artifact, args=(artifact_dir, 'fingerprint'))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert os.path.islink(artifact_dir)
+    assert not os.path.exists(first_version)
+    assert EnhancedCollegePredictorML.read_artifact_metadata(artifact_dir)['fingerprint'] == 'fingerprint'
+    loaded = EnhancedCollegePredictorML.load_artifact(artifact_dir, serving_mode='table')
+    college, branch = max_cutoff_df.iloc[0][['COLLEGE NAME', 'BRANCH NAME']]
+    assert loaded.predict_cutoff(college, branch) == predictor.predict_cutoff(college, branch)
+
+
+def test_reported_quantile_coverage_is_calibrated(max_cutoff_df):
+    predictor = EnhancedCollegePredictorML(n_jobs=1)
+    predictor.train_model(max_cutoff_df, evaluation='eager')
+    assert abs(predictor.metrics['quantile_coverage'] - 0.8) < 0.1
+
+
+def test_conformal_and_quantile_chances_share_bounds(max_cutoff_df):
+    predictor = EnhancedCollegePredictorML(n_jobs=1)
+    predictor.train_model(max_cutoff_df, evaluation='lazy')
+    colleges, branches = max_cutoff_df['COLLEGE NAME'], max_cutoff_df['BRANCH NAME']
+    for mark in (0.0, 200.0):
+        for chances in (predictor.conformal_chances(mark, colleges, branches),
+                        predictor.admission_chances(mark, colleges, branches)):
+            assert np.nanmin(chances) >= CHANCE_BOUNDS[0] and np.nanmax(chances) <= CHANCE_BOUNDS[1]
+    assert np.nanmax(predictor.conformal_chances(0.0, colleges, branches)) == CHANCE_BOUNDS[0]
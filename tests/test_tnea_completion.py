@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from tnea_completion import CutoffCompletion
+from tnea_pipeline import COMMUNITIES
+
+YEARS = np.arange(2019, 2024)
+
+
+def _lookup(model, df):
+    return model.lookup(df['college_code'].to_numpy(), df['branch_code'].to_numpy(),
+                        df['community'].to_numpy(), df['year'].to_numpy())
+
+
+def test_completion_recovers_masked_low_rank_cells():
+    rng = np.random.default_rng(0)
+    n_rows, n_columns = 80, len(COMMUNITIES) * len(YEARS)
+    cutoffs = 150 + rng.normal(scale=3, size=(n_rows, 2)) @ rng.normal(scale=3, size=(2, n_columns))
+    rows, columns = np.meshgrid(np.arange(n_rows), np.arange(n_columns), indexing='ij')
+    long_df = pd.DataFrame({
+        'year': YEARS[columns.ravel() % len(YEARS)],
+        'college_code': rows.ravel() // 4,
+        'branch_code': (rows.ravel() % 4).astype(str),
+        'community': np.asarray(COMMUNITIES)[columns.ravel() // len(YEARS)],
+        'cutoff': cutoffs.ravel(),
+        'weight': 1.0,
+    })
+    masked = rng.random(len(long_df)) < 0.3
+    train, held_out = long_df[~masked], long_df[masked]
+
+    model = CutoffCompletion(rank=2, alpha=0.01, offset_alpha=0.01).fit(train)
+    # Row offsets alone, with the factors penalized away
+    baseline = CutoffCompletion(rank=2, alpha=1e9, offset_alpha=0.01).fit(train)
+
+    filled, confidence, _ = _lookup(model, held_out)
+    rmse = np.sqrt(np.mean((filled - held_out['cutoff']) ** 2))
+    baseline_rmse = np.sqrt(np.mean((_lookup(baseline, held_out)[0] - held_out['cutoff']) ** 2))
+    assert rmse < 0.25 * held_out['cutoff'].std()
+    assert rmse < 0.25 * baseline_rmse
+    assert (confidence < 1).all()
+
+    # Observed cells are kept as they are
+    kept, confidence, _ = _lookup(model, train)
+    np.testing.assert_allclose(kept, train['cutoff'], atol=1e-3)
+    assert (confidence == 1).all()
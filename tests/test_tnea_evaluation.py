@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from tnea_evaluation import evaluate_models
+
+
+def test_evaluate_models_fits_and_scores_with_sample_weights():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'YEAR': rng.uniform(0, 10, 200)})
+    y = 2 * X['YEAR'].to_numpy()
+    # Outliers with zero weight must not move the fits or the scores
+    weights = np.ones(len(y))
+    weights[::10] = 0
+    y[::10] += 100
+
+    comparison = evaluate_models(X, y, {'linear': LinearRegression}, sample_weight=weights, n_jobs=1)
+    assert np.allclose(comparison.attrs['folds']['rmse'], 0)
+    assert np.isclose(comparison.loc['linear', 'r2'], 1)
+
+    unweighted = evaluate_models(X, y, {'linear': LinearRegression}, n_jobs=1)
+    assert unweighted.loc['linear', 'rmse'] > 1
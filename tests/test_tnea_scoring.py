@@ -0,0 +1,43 @@
+import re
+import numpy as np
+import pandas as pd
+from cadv_new import load_or_train_predictor
+from tnea_scoring import CATEGORIES, AnswerTable, ScoringEngine
+from tnea_vocab import PIN_CODE_PATTERN
+
+
+def test_scoring_engine_dedupes_normalized_pairs(tmp_path, max_cutoff_df):
+    predictor, _ = load_or_train_predictor(max_cutoff_df, str(tmp_path), evaluation='lazy')
+    college, branch = max_cutoff_df.iloc[0][['COLLEGE NAME', 'BRANCH NAME']]
+    # The same college lower-cased and without its PIN code
+    spelling = re.sub(PIN_CODE_PATTERN, '', college).lower()
+    respelled = max_cutoff_df.iloc[[0]].assign(**{'COLLEGE NAME': spelling})
+    df = pd.concat([max_cutoff_df, respelled], ignore_index=True)
+
+    engine = ScoringEngine(predictor, df, college_column='COLLEGE NAME', branch_column='BRANCH NAME')
+    assert len(engine) == len(max_cutoff_df.drop_duplicates(['COLLEGE NAME', 'BRANCH NAME']))
+    # Either spelling selects the same pairs
+    assert list(engine.select(college=spelling)) == list(engine.select(college=college))
+    assert engine.score(150.0, college=college, branch=branch)['COLLEGE NAME'].tolist() == [college]
+
+
+def test_answer_table_matches_scoring_engine(tmp_path, max_cutoff_df):
+    predictor, _ = load_or_train_predictor(max_cutoff_df, str(tmp_path), evaluation='lazy')
+    engine = ScoringEngine(predictor, max_cutoff_df, college_column='COLLEGE NAME', branch_column='BRANCH NAME')
+    answers = AnswerTable.build(engine, step=5.0)
+    college = engine.colleges[0]
+
+    for cutoff in (100.0, 150.0, 190.0):
+        for category in CATEGORIES:
+            expected = engine.score(cutoff, category, top=10)
+            actual = answers.score(cutoff, category, top=10)
+            # The top list is ranked on unquantized chances, so the pairs come in the same order
+            assert actual[['COLLEGE NAME', 'BRANCH NAME']].equals(expected[['COLLEGE NAME', 'BRANCH NAME']])
+            np.testing.assert_allclose(actual['Admission Chance'], expected['Admission Chance'], atol=0.05)
+
+            # Filtered queries rank the quantized chances, so ties may swap; the chances still agree
+            expected = engine.score(cutoff, category, college=college, top=5)
+            actual = answers.score(cutoff, category, college=college, top=5)
+            np.testing.assert_allclose(actual['Admission Chance'], expected['Admission Chance'], atol=0.05)
+
+    assert answers.score(101.0, 'BC', top=10) is None
@@ -0,0 +1,18 @@
+import numpy as np
+import xgboost as xgb
+from tnea_trees import TreeEnsemble
+
+
+def test_tree_ensemble_matches_xgboost(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 200, size=(500, 4)).astype(np.float32)
+    y = X[:, 0] - 0.5 * X[:, 1] + 10 * np.sin(X[:, 2] / 20) + rng.normal(0, 1, len(X))
+    # Missing values exercise the default branches
+    X[rng.random(X.shape) < 0.05] = np.nan
+    model = xgb.XGBRegressor(n_estimators=50, max_depth=4, n_jobs=1, random_state=42).fit(X, y)
+
+    ensemble = TreeEnsemble.from_booster(model.get_booster())
+    np.testing.assert_allclose(ensemble.predict(X), model.predict(X), atol=1e-3)
+
+    ensemble.save(tmp_path / 'trees.npz')
+    np.testing.assert_array_equal(TreeEnsemble.load(tmp_path / 'trees.npz').predict(X), ensemble.predict(X))
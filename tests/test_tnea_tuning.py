@@ -0,0 +1,42 @@
+import json
+import numpy as np
+import tnea_tuning
+from tnea_tuning import TuningStore, tune_xgboost
+
+PARAM_GRID = {'max_depth': [2, 3, 4], 'learning_rate': [0.1, 0.3], 'n_estimators': [20]}
+
+
+def test_resumed_search_skips_finished_trials(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 200, size=(200, 3))
+    y = X[:, 0] - 0.5 * X[:, 1] + rng.normal(0, 1, len(X))
+
+    scored = []
+    score_trial = tnea_tuning._score_trial
+
+    def counting_score_trial(base_params, params, X, y, cv):
+        scored.append(json.dumps(params, sort_keys=True))
+        return score_trial(base_params, params, X, y, cv)
+
+    monkeypatch.setattr(tnea_tuning, '_score_trial', counting_score_trial)
+    settings = dict(search='halving', n_candidates=6, cv=3, n_jobs=1, store_dir=str(tmp_path))
+
+    # Room for two trials only, so the search stops part-way through the first rung
+    tune_xgboost(PARAM_GRID, X, y, max_fits=6, **settings)
+    first_run = list(scored)
+    assert len(first_run) == 2
+    [store_path] = tmp_path.iterdir()
+    assert len(TuningStore(str(store_path)).trials) == 2
+    assert not TuningStore(str(store_path)).searches
+
+    scored.clear()
+    _, trial_log = tune_xgboost(PARAM_GRID, X, y, **settings)
+    assert not set(first_run) & set(scored)
+    assert trial_log[trial_log['rung'] == 0]['cached'].sum() == 2
+    assert len(TuningStore(str(store_path)).searches) == 1
+
+    # The finished search is now answered from the store without scoring anything
+    scored.clear()
+    _, cached_log = tune_xgboost(PARAM_GRID, X, y, **settings)
+    assert scored == []
+    assert cached_log.attrs['cached']
@@ -0,0 +1,215 @@
+import contextlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from cadv_new import ARTIFACT_ROOT, EnhancedCollegePredictorML
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak memory is then not reported
+    resource = None
+
+# Models the benchmark trains; cadv_rm and cadv_xg are the CollegePredictorML scripts
+BENCHMARK_MODELS = ('enhanced_xgboost', 'cadv_rm_random_forest', 'cadv_xg')
+DATA_PATH = 'Unique_Colleges_Max_Cutoff.csv'
+REPORT_PATH = os.path.join(ARTIFACT_ROOT, 'benchmark', 'scalability.json')
+
+
+def synthesize_training_data(df, scale, random_state=42):
+    """Grow a max-cutoff table to scale times its rows with synthetic colleges.
+
+    In the style of tnea_setup.TNEASetup: every copy of the table renames its
+    colleges and draws their cutoffs around the real ones, with a college offset
+    ~ N(0, 10) plus per-branch noise ~ N(0, 2), clipped to the real cutoff range
+    and 200. Branches are shared with the real data, so only the college
+    vocabulary grows.
+    """
+    if scale <= 1:
+        return df.copy()
+    rng = np.random.default_rng(random_state)
+    n_copies = int(scale) - 1
+    copies = np.repeat(np.arange(1, n_copies + 1), len(df))
+    synthetic = df.iloc[np.tile(np.arange(len(df)), n_copies)].reset_index(drop=True)
+
+    college_codes = np.tile(pd.factorize(df['COLLEGE NAME'])[0], n_copies)
+    offsets = rng.normal(0, 10, (n_copies, college_codes.max() + 1))[copies - 1, college_codes]
+    cutoffs = synthetic['MAX CUTOFF'].to_numpy() + offsets + rng.normal(0, 2, len(synthetic))
+    synthetic['COLLEGE NAME'] = synthetic['COLLEGE NAME'] + ' - Synthetic ' + copies.astype(str)
+    synthetic['MAX CUTOFF'] = np.clip(cutoffs, df['MAX CUTOFF'].min(), 200).round(2)
+    return pd.concat([df, synthetic], ignore_index=True)
+
+
+def run_benchmark(scales=(1, 10, 100), threads=None, models=BENCHMARK_MODELS, repeats=3,
+                  report_path=REPORT_PATH):
+    """Train every model at every data scale and thread count and write a JSON report.
+
+    threads defaults to 1, 2, 4 and the CPU count. Each case runs in a fresh process
+    so its peak memory and thread settings are its own. A case records fit time,
+    peak resident memory and the best of repeats batch predictions over the
+    training rows. The report is written to report_path and returned as a dict.
+    """
+    n_cpus = os.cpu_count() or 1
+    threads = sorted(set(threads or (1, 2, 4, n_cpus)))
+    cases = [(model, scale, n_threads) for scale in scales for model in models for n_threads in threads]
+
+    results = []
+    for model, scale, n_threads in cases:
+        # One process per case; spawn so no memory is inherited from this process
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            try:
+                result = executor.submit(_run_case, model, scale, n_threads, repeats).result()
+            except Exception as e:
+                result = {'model': model, 'scale': scale, 'threads': n_threads, 'error': str(e)}
+        print(_format_result(result))
+        results.append(result)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'cpu_count': n_cpus, 'platform': platform.platform(), 'python': platform.python_version()},
+        'data': DATA_PATH,
+        'repeats': repeats,
+        'results': results,
+    }
+    if report_path:
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def _run_case(model, scale, n_threads, repeats):
+    """Train and time one model; runs in its own process"""
+    df = synthesize_training_data(pd.read_csv(DATA_PATH).dropna(subset=['MAX CUTOFF']), scale)
+    baseline_rss = _peak_rss_mb()
+    fit, predict = _BUILDERS[model](n_threads)
+
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # The CLI predictors print while training
+        fitted = fit(df)
+    fit_time = time.perf_counter() - start_time
+
+    predict_times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        predict(fitted, df)
+        predict_times.append(time.perf_counter() - start_time)
+
+    return {
+        'model': model,
+        'scale': scale,
+        'threads': n_threads,
+        'rows': len(df),
+        'colleges': int(df['COLLEGE NAME'].nunique()),
+        'fit_time': fit_time,
+        'peak_rss_mb': _peak_rss_mb(),
+        'baseline_rss_mb': baseline_rss,
+        'predict_rows_per_second': len(df) / min(predict_times),
+    }
+
+
+def _enhanced_xgboost(n_threads):
+    """EnhancedCollegePredictorML, predicting with its booster.
+
+    predict_cutoffs would read the cutoff table built after training, which times
+    an array gather rather than XGBoost. The benchmark encodes the names and runs
+    the booster on the codes instead, as serving_mode='model' without a table would.
+    """
+    def fit(df):
+        predictor = EnhancedCollegePredictorML(n_jobs=n_threads)
+        predictor.train_model(df, evaluation='lazy')
+        return predictor
+
+    def predict(predictor, df):
+        college_codes = predictor.college_encoder.encode(df['COLLEGE NAME'])
+        branch_codes = predictor.branch_encoder.encode(df['BRANCH NAME'])
+        predictor._predict_codes(college_codes, branch_codes, predictor._community_codes(None, len(college_codes)))
+    return fit, predict
+
+
+def _cadv_rm_random_forest(n_threads):
+    module = _load_script('cadv-rm.py')
+
+    def fit(df):
+        predictor = module.CollegePredictorML()
+        predictor.model.set_params(n_jobs=n_threads)
+        predictor.train_model(df)
+        return predictor
+
+    def predict(predictor, df):
+        predictor.predict_cutoffs(df['COLLEGE NAME'], df['BRANCH NAME'])
+    return fit, predict
+
+
+def _cadv_xg(n_threads):
+    """The largest configuration cadv-xg.py's tuning can select, fitted without the search.
+
+    The search itself is bounded by its own fit and time budgets, so the benchmark
+    times the final model a tuning run can produce at worst.
+    """
+    module = _load_script('cadv-xg.py')
+    import xgboost as xgb
+
+    def fit(df):
+        predictor = module.CollegePredictorML()
+        X, y = predictor.prepare_historical_data(df)
+        predictor.model = xgb.XGBRegressor(
+            objective='reg:squarederror', random_state=42, n_jobs=n_threads,
+            n_estimators=max(module.PARAM_GRID['n_estimators']), max_depth=max(module.PARAM_GRID['max_depth'])
+        )
+        predictor.model.fit(X, y)
+        predictor.is_trained = True
+        return predictor
+
+    def predict(predictor, df):
+        predictor.predict_cutoffs(df['COLLEGE NAME'], df['BRANCH NAME'])
+    return fit, predict
+
+
+_BUILDERS = {
+    'enhanced_xgboost': _enhanced_xgboost,
+    'cadv_rm_random_forest': _cadv_rm_random_forest,
+    'cadv_xg': _cadv_xg,
+}
+
+
+def _load_script(file_name):
+    """Import a script whose file name is not a valid module name, e.g. cadv-rm.py"""
+    spec = importlib.util.spec_from_file_location(file_name[:-3].replace('-', '_'), file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _format_result(result):
+    if 'error' in result:
+        return f"{result['model']:<24} x{result['scale']:<4} {result['threads']:>2} threads  failed: {result['error']}"
+    return (f"{result['model']:<24} x{result['scale']:<4} {result['threads']:>2} threads  "
+            f"{result['rows']:>7} rows  fit {result['fit_time']:7.2f}s  "
+            f"peak {result['peak_rss_mb'] or float('nan'):7.1f} MB  predict {result['predict_rows_per_second']:>12,.0f} rows/s")
+
+
+def main():
+    print("\nTNEA Training Scalability Benchmark")
+    print("=" * 50)
+    print()
+
+    report = run_benchmark()
+    print(f"\nReport written to {REPORT_PATH} ({len(report['results'])} runs)")
+
+
+if __name__ == "__main__":
+    main()
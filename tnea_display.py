@@ -0,0 +1,68 @@
+import pandas as pd
+import streamlit as st
+
+# Rows sent to the browser per page of a prediction table
+PAGE_SIZE = 25
+
+# Column settings for the prediction columns the Streamlit pages produce
+_TEXT_COLUMNS = {'COLLEGE NAME': ('College', 'large'), 'BRANCH NAME': ('Branch', 'medium'), 'Label': ('Outlook', 'small')}
+_CHANCE_COLUMNS = ('Admission Chance', 'Chance')
+
+
+def collect_streamed_predictions(stream, show_top=True):
+    """Consume tnea_scoring.stream_predictions on screen and return every prediction.
+
+    The progress bar advances once per scored chunk. With show_top, the running top
+    list is redrawn in place after each chunk, so the first results appear after
+    the first chunk. Both are removed when the stream ends.
+    """
+    progress_bar = st.progress(0.0)
+    live_top = st.empty() if show_top else None
+    chunks = []
+    for rows_done, total_rows, predictions, top in stream:
+        chunks.append(predictions)
+        progress_bar.progress(rows_done / total_rows, text=f"Scored {rows_done} of {total_rows} rows")
+        if live_top is not None:
+            live_top.dataframe(top, column_config=_column_config(top), hide_index=True, use_container_width=True)
+    progress_bar.empty()
+    if live_top is not None:
+        live_top.empty()
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+@st.fragment
+def show_predictions_table(predictions, key, label="Show detailed predictions", page_size=PAGE_SIZE):
+    """Ranked predictions as one paginated st.dataframe, rendered only on request.
+
+    Nothing but a toggle is rendered until it is switched on. After that a rerun
+    sends a single table of at most page_size rows, however many predictions there
+    are. It runs as a fragment, so the toggle and the page number rerun only this
+    table, keeping the predictions it was last called with. key must be unique on
+    the page.
+    """
+    if predictions.empty or not st.toggle(f"{label} ({len(predictions)})", key=f"{key}_show"):
+        return
+
+    n_pages = -(-len(predictions) // page_size)
+    page = 1
+    if n_pages > 1:
+        # The widget is keyed by the page count so a shorter result starts on page 1
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1,
+                               key=f"{key}_page_{n_pages}")
+    start = (page - 1) * page_size
+    rows = predictions.iloc[start:start + page_size]
+    rows = pd.concat([pd.Series(range(start + 1, start + len(rows) + 1), index=rows.index, name='#'), rows], axis=1)
+    st.dataframe(rows, column_config=_column_config(rows), hide_index=True, use_container_width=True)
+
+
+def _column_config(rows):
+    config = {}
+    for column in rows.columns:
+        if column in _TEXT_COLUMNS:
+            title, width = _TEXT_COLUMNS[column]
+            config[column] = st.column_config.TextColumn(title, width=width)
+        elif column in _CHANCE_COLUMNS:
+            config[column] = st.column_config.ProgressColumn(column, min_value=0, max_value=100, format="%.1f%%")
+        elif column != '#' and pd.api.types.is_float_dtype(rows[column]):
+            config[column] = st.column_config.NumberColumn(column, format="%.2f")
+    return config
@@ -0,0 +1,247 @@
+import os
+import time
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+from cadv_new import EnhancedCollegePredictorML
+from tnea_pipeline import build_long_table
+from tnea_vocab import CategoryVocabulary
+
+
+class EffectsRegressor:
+    """Additive college, branch and college x community effects with a year trend per community.
+
+    cutoff = intercept[k] + slope[k] * (year - mean year)
+             + college[c] + branch[b] + cell[c, k]
+
+    for college code c, branch code b and community code k. The effects are ridge
+    penalized (alpha_college, alpha_branch, alpha_cell), which shrinks rarely seen
+    colleges and cells towards the community trend as a random-effects model would.
+    The whole system is solved in one sparse linear solve. Prediction sums a few
+    array lookups, so pairs never seen together still get college + branch effects,
+    and codes unseen in training contribute no effect. Missing COMMUNITY_CODE or
+    YEAR columns are treated as a single community and a flat trend.
+    """
+
+    def __init__(self, alpha_college=3.0, alpha_branch=10.0, alpha_cell=20.0, year_column='YEAR'):
+        self.alpha_college = alpha_college
+        self.alpha_branch = alpha_branch
+        self.alpha_cell = alpha_cell
+        self.year_column = year_column
+
+    def fit(self, X, y, sample_weight=None):
+        college_codes, branch_codes, community_codes, years = self._columns(X)
+        y = np.asarray(y, dtype=np.float64)
+        weights = np.ones(len(y)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+
+        n_colleges = int(college_codes.max()) + 1
+        n_branches = int(branch_codes.max()) + 1
+        n_communities = int(community_codes.max()) + 1
+        self.mean_year_ = float(np.average(years, weights=weights))
+        x = years - self.mean_year_
+
+        # Parameter blocks in order: intercepts, slopes, colleges, branches, cells
+        sizes = [n_communities, n_communities, n_colleges, n_branches, n_colleges * n_communities]
+        starts = np.cumsum([0] + sizes)
+        columns = np.column_stack([
+            starts[0] + community_codes,
+            starts[1] + community_codes,
+            starts[2] + college_codes,
+            starts[3] + branch_codes,
+            starts[4] + college_codes * n_communities + community_codes,
+        ])
+        values = np.column_stack([np.ones(len(y)), x, np.ones(len(y)), np.ones(len(y)), np.ones(len(y))])
+        design = sp.csr_matrix((values.ravel(), columns.ravel(), np.arange(0, columns.size + 1, 5)),
+                               shape=(len(y), starts[-1]))
+
+        # Trend terms get a token penalty so communities without data stay solvable
+        penalty = np.repeat([1e-6, 1e-6, self.alpha_college, self.alpha_branch, self.alpha_cell], sizes)
+        weighted = design.multiply(weights[:, None]).tocsr()
+        normal = (design.T @ weighted + sp.diags(penalty)).tocsc()
+        solution = spsolve(normal, weighted.T @ y)
+
+        self.intercept_, self.slope_, self.college_effects_, self.branch_effects_, cells = np.split(
+            solution, starts[1:-1]
+        )
+        self.cell_effects_ = cells.reshape(n_colleges, n_communities)
+        return self
+
+    def predict(self, X):
+        return self.predict_codes(*self._columns(X))
+
+    def predict_codes(self, college_codes, branch_codes, community_codes=0, years=None):
+        """Sum the effects for arrays of codes; years default to the mean training year"""
+        college_codes = np.asarray(college_codes, dtype=np.int64)
+        branch_codes = np.asarray(branch_codes, dtype=np.int64)
+        community_codes = np.broadcast_to(np.asarray(community_codes, dtype=np.int64), college_codes.shape)
+        x = 0.0 if years is None else np.asarray(years, dtype=np.float64) - self.mean_year_
+
+        # Codes beyond the fitted vocabularies have no effect, like code 0
+        n_colleges, n_communities = self.cell_effects_.shape
+        college_codes = np.where(college_codes < n_colleges, college_codes, 0)
+        branch_codes = np.where(branch_codes < len(self.branch_effects_), branch_codes, 0)
+        community_codes = np.minimum(community_codes, n_communities - 1)
+
+        return (self.intercept_[community_codes] + self.slope_[community_codes] * x
+                + self.college_effects_[college_codes] + self.branch_effects_[branch_codes]
+                + self.cell_effects_[college_codes, community_codes])
+
+    def _columns(self, X):
+        n_rows = len(X)
+        college_codes = X['COLLEGE_CODE'].to_numpy(dtype=np.int64)
+        branch_codes = X['BRANCH_CODE'].to_numpy(dtype=np.int64)
+        community_codes = (X['COMMUNITY_CODE'].to_numpy(dtype=np.int64) if 'COMMUNITY_CODE' in X
+                           else np.zeros(n_rows, dtype=np.int64))
+        years = (X[self.year_column].to_numpy(dtype=np.float64) if self.year_column in X
+                 else np.zeros(n_rows))
+        return college_codes, branch_codes, community_codes, years
+
+
+class OneHotRidgeRegressor:
+    """Ridge regression on one-hot encoded integer code columns.
+
+    Deliberately minimal: one indicator per code of every column in columns that X
+    has (by default all of them, e.g. college, branch and community codes), with no
+    interactions and no trend. Fitting is one sparse solve and prediction one sparse dot product, so it
+    serves as the latency and accuracy floor of the evaluation harness and as a
+    fallback predictor. Codes that were not seen in training get no indicator.
+    """
+
+    def __init__(self, alpha=1.0, columns=None):
+        self.alpha = alpha
+        self.columns = columns
+
+    def fit(self, X, y, sample_weight=None):
+        if hasattr(X, 'columns'):
+            self.columns_ = [column for column in (self.columns or X.columns) if column in X]
+        codes = self._codes(X)
+        y = np.asarray(y, dtype=np.float64)
+        weights = np.ones(len(y)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        self.n_codes_ = codes.max(axis=0) + 1
+        self.offsets_ = np.concatenate([[0], np.cumsum(self.n_codes_)[:-1]])
+
+        # Fit on centered targets so the unpenalized intercept is the weighted mean
+        self.intercept_ = float(np.average(y, weights=weights))
+        design = self._one_hot(codes)
+        weighted = design.multiply(weights[:, None]).tocsr()
+        normal = (design.T @ weighted + self.alpha * sp.eye(design.shape[1])).tocsc()
+        self.coef_ = spsolve(normal, weighted.T @ (y - self.intercept_))
+        return self
+
+    def predict(self, X):
+        return self._one_hot(self._codes(X)) @ self.coef_ + self.intercept_
+
+    def predict_codes(self, college_codes, branch_codes, community_codes=0, years=None):
+        """Predict arrays of codes given in the order of the fitted columns; years are ignored"""
+        codes = [college_codes, branch_codes, community_codes][:len(self.n_codes_)]
+        n_rows = len(college_codes)
+        return self._one_hot(np.column_stack([np.broadcast_to(np.asarray(column, dtype=np.int64), (n_rows,))
+                                              for column in codes])) @ self.coef_ + self.intercept_
+
+    def _codes(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.columns_]
+        return np.asarray(X, dtype=np.int64)
+
+    def _one_hot(self, codes):
+        # Codes outside the fitted range get an empty row entry instead of an indicator
+        valid = (codes >= 0) & (codes < self.n_codes_)
+        rows = np.broadcast_to(np.arange(len(codes))[:, None], codes.shape)
+        return sp.csr_matrix(
+            (np.ones(valid.sum()), (rows[valid], (codes + self.offsets_)[valid])),
+            shape=(len(codes), int(self.n_codes_.sum()))
+        )
+
+
+class EffectsCollegePredictor:
+    """A linear model behind the name-based interface of EnhancedCollegePredictorML.
+
+    Preprocessing and vocabularies are shared with EnhancedCollegePredictorML, so
+    both predictors accept the same training data and query names. model is an
+    EffectsRegressor (the default, built from params) or a OneHotRidgeRegressor.
+    """
+
+    def __init__(self, model=None, **params):
+        # Only used for preprocessing and encoding; it never trains a booster
+        self.encoder = EnhancedCollegePredictorML(quantiles=None)
+        self.model = model if model is not None else EffectsRegressor(**params)
+        self.serving_year = None
+        self.metrics = {}
+
+    def train_model(self, df):
+        start_time = time.time()
+        processed_df = self.encoder.preprocess_data(df)
+        # The one-hot baseline has no year trend, so it is fitted on the codes alone
+        columns = [column for column in self.encoder.feature_columns
+                   if column != 'YEAR' or isinstance(self.model, EffectsRegressor)]
+        X = processed_df[columns]
+        self.model.fit(X, processed_df['MAX CUTOFF'], sample_weight=processed_df['WEIGHT'])
+        if self.encoder.long_format:
+            self.serving_year = int(processed_df['YEAR'].max())
+        self.metrics = {'train_time': time.time() - start_time}
+        return self.metrics
+
+    def predict_cutoffs(self, colleges, branches, community=None):
+        """Predict cutoffs for arrays of college and branch names.
+
+        community selects the community cutoff of a long-format model ('OC' by
+        default) and predictions are for the latest training year. As with the
+        XGBoost predictor, pairs with both names unseen get NaN.
+        """
+        college_codes = self.encoder.college_encoder.encode(colleges)
+        branch_codes = self.encoder.branch_encoder.encode(branches)
+        community_codes = self.encoder._community_codes(community, len(college_codes))
+        predictions = np.asarray(self.model.predict_codes(
+            college_codes, branch_codes, community_codes, self.serving_year
+        ), dtype=np.float64)
+        oov = CategoryVocabulary.OOV_CODE
+        predictions[(college_codes == oov) & (branch_codes == oov)] = np.nan
+        return predictions
+
+    def predict_cutoff(self, college_name, branch_name, community=None):
+        """Predict cutoff for a given college and branch; None when there is no estimate"""
+        prediction = float(self.predict_cutoffs([college_name], [branch_name], community)[0])
+        return None if np.isnan(prediction) else prediction
+
+    def get_metrics(self, wait=True):
+        """Training metrics; there is no deferred evaluation"""
+        return self.metrics
+
+
+def baseline_predictor(df, alpha=1.0):
+    """Train the one-hot ridge baseline on df; used when the XGBoost predictor is unavailable"""
+    predictor = EffectsCollegePredictor(model=OneHotRidgeRegressor(alpha=alpha))
+    predictor.train_model(df)
+    return predictor
+
+
+def main():
+    print("\nTNEA Effects Model")
+    print("=" * 50)
+
+    long_df = build_long_table(os.getcwd())
+    predictor = EffectsCollegePredictor()
+    metrics = predictor.train_model(long_df)
+    print(f"\nFitted {len(long_df)} rows in {metrics['train_time'] * 1000:.1f} ms "
+          f"({len(predictor.encoder.trained_colleges)} colleges, {len(predictor.encoder.trained_branches)} branches)")
+
+    n_queries = 1_000_000
+    rng = np.random.default_rng(42)
+    college_codes = rng.integers(1, len(predictor.encoder.college_encoder), n_queries)
+    branch_codes = rng.integers(1, len(predictor.encoder.branch_encoder), n_queries)
+    community_codes = rng.integers(0, 7, n_queries)
+    start_time = time.perf_counter()
+    predictor.model.predict_codes(college_codes, branch_codes, community_codes, predictor.serving_year)
+    elapsed = time.perf_counter() - start_time
+    print(f"Scored {n_queries} encoded queries in {elapsed * 1000:.1f} ms ({n_queries / elapsed:,.0f} per second)")
+
+    sample = long_df.sample(5, random_state=42)
+    predictions = predictor.predict_cutoffs(sample['college_code'], sample['branch_code'],
+                                            sample['community'].astype(object))
+    print("\nSample predictions for the latest year:")
+    print(sample.assign(predicted=predictions.round(2))[['year', 'college_code', 'branch_code', 'community',
+                                                         'cutoff', 'predicted']].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+from sklearn.model_selection import KFold
+from cadv_new import EnhancedCollegePredictorML, FEATURE_LABELS
+from tnea_effects import EffectsRegressor, OneHotRidgeRegressor
+from tnea_pipeline import build_long_table
+
+
+class TrendRegressor:
+    """Linear year trend per group, as in tnea.TNEAMultiYearAnalyzer.predict_cutoffs.
+
+    Fits cutoff = intercept + slope * year for every combination of group_columns in
+    one vectorized pass. Groups seen in a single year get a flat trend, groups
+    unseen in training use the trend fitted on all rows, and without a year column
+    every group predicts its mean cutoff. Group columns missing from X are ignored,
+    so the same model runs on the wide (single-year) layout.
+    """
+
+    def __init__(self, group_columns=('BRANCH_CODE', 'COMMUNITY_CODE'), year_column='YEAR'):
+        self.group_columns = list(group_columns)
+        self.year_column = year_column
+
+    def fit(self, X, y, sample_weight=None):
+        self.groups_ = [column for column in self.group_columns if column in X]
+        frame = self._frame(X)
+        frame['y'] = np.asarray(y, dtype=np.float64)
+        frame['w'] = 1.0 if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+
+        self.global_trend_ = _weighted_trend(frame)
+        self.trends_ = _weighted_trend(frame, self.groups_) if self.groups_ else None
+        return self
+
+    def predict(self, X):
+        frame = self._frame(X)
+        if self.trends_ is None:
+            return self.global_trend_['intercept'] + self.global_trend_['slope'] * frame['x'].to_numpy()
+        trends = frame[self.groups_].merge(
+            self.trends_, how='left', left_on=self.groups_, right_index=True
+        )
+        intercept = trends['intercept'].fillna(self.global_trend_['intercept']).to_numpy()
+        slope = trends['slope'].fillna(self.global_trend_['slope']).to_numpy()
+        return intercept + slope * frame['x'].to_numpy()
+
+    def _frame(self, X):
+        frame = X[self.groups_].copy()
+        frame['x'] = X[self.year_column].astype(np.float64) if self.year_column in X else 0.0
+        return frame
+
+
+def _weighted_trend(frame, group_columns=None):
+    """Weighted least-squares intercept and slope of y on x, overall or per group"""
+    weighted = frame.assign(wx=frame['w'] * frame['x'], wy=frame['w'] * frame['y'],
+                            wxx=frame['w'] * frame['x'] ** 2, wxy=frame['w'] * frame['x'] * frame['y'])
+    columns = ['w', 'wx', 'wy', 'wxx', 'wxy']
+    sums = weighted.groupby(group_columns)[columns].sum() if group_columns else weighted[columns].sum()
+
+    mean_x = sums['wx'] / sums['w']
+    mean_y = sums['wy'] / sums['w']
+    sxx = sums['wxx'] - sums['w'] * mean_x ** 2
+    sxy = sums['wxy'] - sums['w'] * mean_x * mean_y
+    slope = np.where(sxx > 1e-9, sxy / np.where(sxx > 1e-9, sxx, 1), 0.0)
+    trend = {'intercept': mean_y - slope * mean_x, 'slope': slope}
+    if group_columns:
+        return pd.DataFrame(trend, index=sums.index)
+    return {key: float(value) for key, value in trend.items()}
+
+
+# Candidate models by name. Factories are called once per fold and must be picklable
+# (classes or functools.partial of them) so folds can run in worker processes.
+MODEL_FACTORIES = {
+    'random_forest': partial(RandomForestRegressor, n_estimators=100, random_state=42),
+    # One XGBoost thread per fold; evaluate_models already runs the folds on a process pool
+    'xgboost': partial(xgb.XGBRegressor, **dict(EnhancedCollegePredictorML().model_params(), n_jobs=1)),
+    'trend_branch': partial(TrendRegressor, group_columns=('BRANCH_CODE', 'COMMUNITY_CODE')),
+    'trend_cell': partial(TrendRegressor, group_columns=('COLLEGE_CODE', 'BRANCH_CODE', 'COMMUNITY_CODE')),
+    'effects': EffectsRegressor,
+    'onehot_ridge': partial(OneHotRidgeRegressor, columns=('COLLEGE_CODE', 'BRANCH_CODE', 'COMMUNITY_CODE')),
+}
+
+
+def register_model(name, factory):
+    """Add a candidate model to the harness"""
+    MODEL_FACTORIES[name] = factory
+
+
+def evaluate_models(X, y, models=None, sample_weight=None, cv=5, n_jobs=None, random_state=42):
+    """Cross-validate candidate models on shared folds.
+
+    The folds are built once and every model is fitted once per fold. RMSE, MAE and
+    R2 all come from the same out-of-fold predictions, weighted by sample_weight
+    when given, which is also passed to every fit. (model, fold) tasks run on a
+    pool of n_jobs processes (default: one per CPU). models maps names to factories
+    and defaults to MODEL_FACTORIES.
+
+    Returns a comparison table indexed by model name, with fit and predict timings.
+    The per-fold metrics are in its attrs['folds'].
+    """
+    models = MODEL_FACTORIES if models is None else models
+    n_jobs = n_jobs or os.cpu_count() or 1
+    X = X.reset_index(drop=True)
+    y = np.asarray(y, dtype=np.float64)
+    weights = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    folds = list(KFold(n_splits=cv, shuffle=True, random_state=random_state).split(X))
+
+    tasks = [(name, fold) for name in models for fold in range(len(folds))]
+    arguments = [(models[name], X, y, weights, *folds[fold]) for name, fold in tasks]
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_fit_fold, *zip(*arguments)))
+    else:
+        results = [_fit_fold(*task_arguments) for task_arguments in arguments]
+
+    out_of_fold = {name: np.empty(len(y)) for name in models}
+    fold_rows = []
+    for (name, fold), (predictions, fit_time, predict_time) in zip(tasks, results):
+        test_index = folds[fold][1]
+        out_of_fold[name][test_index] = predictions
+        fold_rows.append({
+            'model': name,
+            'fold': fold,
+            **_regression_metrics(y[test_index], predictions, None if weights is None else weights[test_index]),
+            'fit_time': fit_time,
+            'predict_time': predict_time,
+        })
+    fold_table = pd.DataFrame(fold_rows)
+
+    summary = []
+    for name in models:
+        model_folds = fold_table[fold_table['model'] == name]
+        summary.append({
+            'model': name,
+            **_regression_metrics(y, out_of_fold[name], weights),
+            'rmse_std': model_folds['rmse'].std(),
+            'fit_time': model_folds['fit_time'].mean(),
+            'predict_ms': model_folds['predict_time'].mean() * 1000,
+            'predict_us_per_row': model_folds['predict_time'].sum() / len(y) * 1e6,
+        })
+    comparison = pd.DataFrame(summary).set_index('model')
+    comparison.attrs['folds'] = fold_table
+    return comparison
+
+
+def _fit_fold(factory, X, y, weights, train_index, test_index):
+    """Fit one model on one fold; runs in a worker process"""
+    model = factory()
+    fit_start = time.perf_counter()
+    if weights is None:
+        model.fit(X.iloc[train_index], y[train_index])
+    else:
+        model.fit(X.iloc[train_index], y[train_index], sample_weight=weights[train_index])
+    fit_time = time.perf_counter() - fit_start
+
+    predict_start = time.perf_counter()
+    predictions = np.asarray(model.predict(X.iloc[test_index]), dtype=np.float64)
+    return predictions, fit_time, time.perf_counter() - predict_start
+
+
+def _regression_metrics(y_true, y_pred, sample_weight=None):
+    return {
+        'r2': r2_score(y_true, y_pred, sample_weight=sample_weight),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred, sample_weight=sample_weight))),
+        'mae': mean_absolute_error(y_true, y_pred, sample_weight=sample_weight),
+    }
+
+
+def main():
+    print("\nTNEA Model Comparison (shared 5-fold cross-validation)")
+    print("=" * 50)
+
+    for label, df in [('Max cutoff data', pd.read_csv('cleaned_maxcutoff_data.csv')),
+                      ('Long-format cutoffs, all years', build_long_table(os.getcwd()))]:
+        predictor = EnhancedCollegePredictorML()
+        processed_df = predictor.preprocess_data(df)
+        X = processed_df[predictor.feature_columns]
+        print(f"\n{label} ({len(X)} rows; features: "
+              f"{', '.join(FEATURE_LABELS[column] for column in X.columns)}):")
+        comparison = evaluate_models(X, processed_df['MAX CUTOFF'], sample_weight=processed_df['WEIGHT'])
+        print(comparison.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+
+# Communities the predictor models; yearly files split MBC into sub-columns
+COMMUNITIES = ['OC', 'BC', 'BCM', 'MBC', 'SC', 'SCA', 'ST']
+COMMUNITY_ALIASES = {'MBC_DNC': 'MBC', 'MBCDNC': 'MBC', 'MBCV': 'MBC'}
+
+# Header spellings used by the Vocational_YYYY_Mark_Cutoff.csv files across years
+COLUMN_ALIASES = {
+    'COLLEGE CODE': 'college_code',
+    'COLLEGE NAME': 'college_name',
+    'BRANCH CODE': 'branch_code',
+    'BRANCH': 'branch_code',
+    'BRANCH NAME': 'branch_name',
+}
+
+LONG_COLUMNS = ['year', 'college_code', 'branch_code', 'community', 'cutoff', 'weight']
+
+
+def find_cutoff_files(base_path='.'):
+    """Map year -> path for every Vocational_YYYY_Mark_Cutoff.csv in base_path"""
+    files = {}
+    for file_path in glob.glob(os.path.join(base_path, "Vocational_*_Mark_Cutoff.csv")):
+        # Extracts year from Vocational_YYYY_Mark_Cutoff.csv
+        year = int(os.path.basename(file_path).split('_')[1])
+        files[year] = file_path
+    return dict(sorted(files.items()))
+
+
+def read_year(file_path, year):
+    """Read one yearly cutoff file into standardized wide columns"""
+    df = pd.read_csv(file_path)
+
+    # Headers contain embedded newlines ("College\nCode") and vary in case
+    df.columns = [' '.join(str(column).split()).upper() for column in df.columns]
+    df = df.rename(columns=COLUMN_ALIASES)
+    for column in ['college_code', 'branch_code']:
+        if column not in df.columns:
+            raise KeyError(f"Required column '{column}' not found in {os.path.basename(file_path)}")
+
+    df['year'] = year
+    df['college_code'] = pd.to_numeric(df['college_code'], errors='coerce')
+    df['branch_code'] = df['branch_code'].astype(str).str.strip().str.upper()
+    return df.dropna(subset=['college_code'])
+
+
+def melt_year(df):
+    """Melt one standardized yearly table into (year, college, branch, community, cutoff) rows"""
+    community_columns = [
+        column for column in df.columns
+        if COMMUNITY_ALIASES.get(column, column) in COMMUNITIES
+    ]
+    long_df = df.melt(
+        id_vars=['year', 'college_code', 'branch_code'],
+        value_vars=community_columns,
+        var_name='community',
+        value_name='cutoff'
+    )
+    long_df['community'] = long_df['community'].replace(COMMUNITY_ALIASES)
+    long_df['cutoff'] = pd.to_numeric(long_df['cutoff'], errors='coerce')
+    return long_df.dropna(subset=['cutoff'])
+
+
+def build_long_table(base_path='.', years=None):
+    """Stack every yearly cutoff file into one compact long table.
+
+    One row per distinct (year, college_code, branch_code, community, cutoff).
+    Repeated rows, such as the MBC sub-columns of a year that share a cutoff, are
+    collapsed into a 'weight' count for use as a sample weight. The row count is
+    bounded by the filled cells of the yearly files, so it grows linearly with years.
+    """
+    files = find_cutoff_files(base_path)
+    if years is not None:
+        files = {year: path for year, path in files.items() if year in years}
+    if not files:
+        raise FileNotFoundError(f"No Vocational_YYYY_Mark_Cutoff.csv files found in {base_path}")
+
+    long_df = pd.concat(
+        [melt_year(read_year(path, year)) for year, path in files.items()],
+        ignore_index=True
+    )
+    return compact_long_table(long_df)
+
+
+def compact_long_table(long_df):
+    """Dedupe a long table into sample weights and downcast it to compact dtypes"""
+    keys = ['year', 'college_code', 'branch_code', 'community', 'cutoff']
+    long_df = long_df.groupby(keys, observed=True, sort=True).size().reset_index(name='weight')
+
+    long_df['year'] = long_df['year'].astype(np.int16)
+    long_df['college_code'] = pd.to_numeric(long_df['college_code'], downcast='integer')
+    long_df['branch_code'] = long_df['branch_code'].astype('category')
+    long_df['community'] = pd.Categorical(long_df['community'], categories=COMMUNITIES)
+    long_df['cutoff'] = long_df['cutoff'].astype(np.float32)
+    long_df['weight'] = pd.to_numeric(long_df['weight'], downcast='unsigned')
+    return long_df[LONG_COLUMNS]
+
+
+def build_catalog(base_path='.'):
+    """Latest college and branch names for every (college_code, branch_code) seen in any year"""
+    frames = []
+    for year, path in find_cutoff_files(base_path).items():
+        df = read_year(path, year)
+        frames.append(df[['year', 'college_code', 'branch_code', 'college_name', 'branch_name']])
+    catalog = pd.concat(frames, ignore_index=True).sort_values('year')
+    catalog = catalog.drop_duplicates(subset=['college_code', 'branch_code'], keep='last')
+    for column in ['college_name', 'branch_name']:
+        catalog[column] = catalog[column].astype(str).str.split().str.join(' ')
+    return catalog.drop(columns='year').reset_index(drop=True)
+
+
+def is_long_table(df):
+    """True if df has the columns produced by build_long_table"""
+    return all(column in df.columns for column in LONG_COLUMNS[:-1])
+
+
+def main():
+    print("\nTNEA Long-Format Cutoff Pipeline")
+    print("=" * 50)
+
+    long_df = build_long_table(os.getcwd())
+    print(f"\nRows: {len(long_df)} ({long_df['weight'].sum()} before deduplication)")
+    print(f"Memory: {long_df.memory_usage(deep=True).sum() / 1024:.1f} KiB")
+    print("\nRows per year:")
+    print(long_df.groupby('year').size().to_string())
+    print("\nRows per community:")
+    print(long_df.groupby('community', observed=False).size().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from cadv_new import _quantile_cdf, fingerprint_training_data
+from tnea_vocab import normalize_names
+
+# The pages compute cutoff = maths + physics / 2 + chemistry / 2 from marks entered in
+# 0.5 steps between 0 and 100, so every reachable cutoff is a multiple of 0.25 up to 200
+CUTOFF_STEP = 0.25
+MAX_CUTOFF = 200.0
+# Category choices of the pages; None is "no category"
+CATEGORIES = (None, 'OC', 'BC', 'BCM', 'MBC', 'SC', 'SCA', 'ST')
+ANSWER_TOP_K = 10
+# Rows scored per step of stream_predictions
+STREAM_CHUNK_SIZE = 512
+
+
+def top_k_positions(values, k=None):
+    """Positions of the k largest values, largest first, as a stable descending sort orders them.
+
+    A partition finds the k-th largest value in linear time, so only the values
+    above it and the first ties at it are sorted. NaN values rank last. k=None
+    ranks every value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if k is None or k >= len(values):
+        return np.argsort(-values, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    keys = np.where(np.isnan(values), -np.inf, values)
+    threshold = np.partition(keys, len(keys) - k)[len(keys) - k]
+    above = np.flatnonzero(keys > threshold)
+    # Ties at the threshold are taken in position order, as the stable sort would
+    candidates = np.sort(np.concatenate([above, np.flatnonzero(keys == threshold)[:k - len(above)]]))
+    return candidates[np.argsort(-keys[candidates], kind='stable')]
+
+
+class PredictionIndex:
+    """Row positions sorted by predicted cutoff, overall and within each college and branch.
+
+    When the admission chance only depends on the margin, the lowest predicted
+    cutoffs are the best options, and the rows reaching a minimum chance are those
+    at or below some cutoff. positions() then answers a query with a binary search
+    and a slice of at most k rows. Its cost does not grow with the number of colleges.
+    Rows without a prediction (NaN) are left out.
+    """
+
+    def __init__(self, colleges, branches, predicted_cutoffs):
+        self.colleges = np.asarray(colleges, dtype=object)
+        self.branches = np.asarray(branches, dtype=object)
+        self.predicted_cutoffs = np.asarray(predicted_cutoffs, dtype=np.float64)
+
+        known = np.flatnonzero(~np.isnan(self.predicted_cutoffs))
+        self.order = known[np.argsort(self.predicted_cutoffs[known], kind='stable')]
+        self._sorted_cutoffs = self.predicted_cutoffs[self.order]
+        self._groups = {}
+        for name, values in (('college', self.colleges), ('branch', self.branches)):
+            codes, uniques = pd.factorize(values[self.order])
+            # A stable sort by group keeps every group's rows in cutoff order
+            order = self.order[np.argsort(codes, kind='stable')]
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+            self._groups[name] = (pd.Index(uniques), order, self.predicted_cutoffs[order], offsets)
+
+    def positions(self, max_cutoff=np.inf, k=None, college=None, branch=None):
+        """Rows with a predicted cutoff at or below max_cutoff, lowest first, at most k.
+
+        college and branch restrict the rows to one college and/or branch.
+        """
+        if college is not None:
+            order, cutoffs = self._group('college', college)
+            if branch is not None:
+                in_branch = self.branches[order] == branch
+                order, cutoffs = order[in_branch], cutoffs[in_branch]
+        elif branch is not None:
+            order, cutoffs = self._group('branch', branch)
+        else:
+            order, cutoffs = self.order, self._sorted_cutoffs
+
+        end = np.searchsorted(cutoffs, max_cutoff, side='right')
+        return order[:end if k is None else min(end, k)]
+
+    def _group(self, name, value):
+        """Rows of one college or branch and their predicted cutoffs, in cutoff order"""
+        index, order, cutoffs, offsets = self._groups[name]
+        code = index.get_indexer([value])[0]
+        if code < 0:
+            return order[:0], cutoffs[:0]
+        return order[offsets[code]:offsets[code + 1]], cutoffs[offsets[code]:offsets[code + 1]]
+
+
+def stream_predictions(predictor, df, cutoff_mark, chance=None, chunk_size=STREAM_CHUNK_SIZE, top=10):
+    """Score df in vectorized chunks, yielding results as each chunk is done.
+
+    Each step makes one predict_cutoffs call for chunk_size rows. It yields
+    (rows_done, total_rows, chunk_predictions, top_predictions). top_predictions
+    is the best top rows by admission chance among all rows scored so far, in the
+    order a stable sort of every row would give. chance maps an array of margins
+    to chances. Without it the chances come from predictor.admission_chances.
+    Rows without a prediction are left out.
+    """
+    best = None
+    for start in range(0, len(df), chunk_size):
+        rows = df.iloc[start:start + chunk_size]
+        colleges = rows['COLLEGE NAME'].to_numpy(dtype=object)
+        branches = rows['BRANCH NAME'].to_numpy(dtype=object)
+        predicted_cutoffs = predictor.predict_cutoffs(colleges, branches)
+        margins = cutoff_mark - predicted_cutoffs
+        chances = (predictor.admission_chances(cutoff_mark, colleges, branches) if chance is None
+                   else chance(margins))
+
+        known = ~np.isnan(predicted_cutoffs)
+        predictions = pd.DataFrame({
+            'COLLEGE NAME': colleges[known],
+            'BRANCH NAME': branches[known],
+            'Predicted Cutoff': predicted_cutoffs[known],
+            'Your Cutoff': cutoff_mark,
+            'Margin': margins[known],
+            'Admission Chance': np.asarray(chances, dtype=np.float64)[known],
+        })
+        # The running top list comes first, so ties keep the earlier rows
+        candidates = predictions if best is None else pd.concat([best, predictions], ignore_index=True)
+        best = candidates.iloc[top_k_positions(candidates['Admission Chance'], top)].reset_index(drop=True)
+        yield start + len(rows), len(df), predictions, best
+
+
+class _PairCatalog:
+    """Distinct college/branch pairs with their predicted cutoffs and 80% ranges"""
+
+    def __init__(self, colleges, branches, predicted_cutoffs, lower, upper):
+        self.colleges = colleges
+        self.branches = branches
+        self.predicted_cutoffs = predicted_cutoffs
+        self.lower = lower
+        self.upper = upper
+
+        # Integer codes of the normalized names, so the college and branch filters compare
+        # integers, not strings, and match any spelling of a name
+        self._college_codes, colleges = pd.factorize(normalize_names(self.colleges))
+        self._branch_codes, branches = pd.factorize(normalize_names(self.branches))
+        self._college_index, self._branch_index = pd.Index(colleges), pd.Index(branches)
+
+    def __len__(self):
+        return len(self.colleges)
+
+    def select(self, college=None, branch=None):
+        """Positions of the pairs of one college and/or branch, or of every pair"""
+        mask = np.ones(len(self), dtype=bool)
+        if college is not None:
+            mask &= self._college_codes == self._college_index.get_indexer(normalize_names([college]))[0]
+        if branch is not None:
+            mask &= self._branch_codes == self._branch_index.get_indexer(normalize_names([branch]))[0]
+        return np.flatnonzero(mask)
+
+    def _frame(self, index, cutoff_mark, chances):
+        """Prediction rows in the columns app.display_predictions expects"""
+        return pd.DataFrame({
+            'COLLEGE NAME': self.colleges[index],
+            'BRANCH NAME': self.branches[index],
+            'Predicted Cutoff': self.predicted_cutoffs[index],
+            'Cutoff Low': self.lower[index],
+            'Cutoff High': self.upper[index],
+            'Your Cutoff': float(cutoff_mark),
+            'Margin': cutoff_mark - self.predicted_cutoffs[index],
+            'Admission Chance': chances,
+        })
+
+
+class ScoringEngine(_PairCatalog):
+    """Scores every distinct college/branch pair of a table with array operations.
+
+    The predictor runs once, at construction, over the deduplicated pairs. Pairs
+    count as duplicates when their normalized names agree (tnea_vocab.normalize_names:
+    case, whitespace and PIN code), as they do for the predictor; the first
+    spelling is the one shown. It
+    provides the predicted cutoff, the 80% conformal range and the cutoff quantiles
+    of each pair. score() then evaluates the student's margin, admission chance and
+    category adjustment for all pairs at once. College and branch filters and the
+    top-N cut are array masks and a partial sort.
+    """
+
+    def __init__(self, predictor, df, college_column='College Name', branch_column='Branch Name'):
+        if predictor.quantiles is None:
+            raise ValueError("ScoringEngine needs a predictor trained with cutoff quantiles")
+        keys = pd.DataFrame({'college': normalize_names(df[college_column]),
+                             'branch': normalize_names(df[branch_column])})
+        first = ~keys.duplicated().to_numpy()
+        colleges = df[college_column].to_numpy(dtype=object)[first]
+        branches = df[branch_column].to_numpy(dtype=object)[first]
+
+        predicted_cutoffs = predictor.predict_cutoffs(colleges, branches)
+        quantiles = predictor.predict_quantiles(colleges, branches)
+        intervals = predictor.predict_intervals(colleges, branches, coverage=0.8)
+        lower, upper = (intervals[1], intervals[2]) if intervals is not None else (predicted_cutoffs,) * 2
+
+        # Pairs with no estimate (college and branch both unseen) come back as NaN and are
+        # never scored; a pair with one unseen name gets the other name's mean cutoff
+        known = ~np.isnan(predicted_cutoffs)
+        super().__init__(colleges[known], branches[known], predicted_cutoffs[known], lower[known], upper[known])
+        self.predictor = predictor
+        self.quantiles = quantiles[known]
+        self.levels = np.asarray(predictor.quantiles)
+
+    def chances(self, cutoff_mark, category=None, index=None):
+        """Category-adjusted admission chances (0-100) of the pairs at index, default all"""
+        quantiles = self.quantiles if index is None else self.quantiles[index]
+        marks = np.full(len(quantiles), float(cutoff_mark))
+        chances = 100 * _quantile_cdf(marks, quantiles, self.levels)
+        return self.predictor.adjust_chance_for_category(chances, category)
+
+    def score(self, cutoff_mark, category=None, college=None, branch=None, top=None):
+        """Predictions for every pair, or the pairs of one college and/or branch.
+
+        Rows are sorted by admission chance, highest first, and cut to the top rows
+        when top is given. The columns match app.display_predictions.
+        """
+        index = self.select(college, branch)
+        chances = self.chances(cutoff_mark, category, index)
+
+        order = top_k_positions(chances, top)
+        return self._frame(index[order], cutoff_mark, chances[order])
+
+
+class AnswerTable(_PairCatalog):
+    """Every query the Streamlit pages can ask, answered ahead of time.
+
+    For each reachable cutoff (multiples of step up to max_cutoff) and each of
+    CATEGORIES, the table holds the chance of every pair and the ranked top_k
+    pairs. Chances are quantized to tenths of a percent in uint16. Answering a query
+    is an index into these arrays; no model runs and the unfiltered top list needs
+    no sort. College and branch queries rank only the chances of their own pairs.
+    """
+
+    def __init__(self, colleges, branches, predicted_cutoffs, lower, upper, chances, top,
+                 step=CUTOFF_STEP, fingerprint=None):
+        super().__init__(colleges, branches, predicted_cutoffs, lower, upper)
+        self.chances = chances  # (cutoffs, categories, pairs) in tenths of a percent
+        self.top = top  # (cutoffs, categories, top_k) pair positions, best first
+        self.step = step
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, engine, top_k=ANSWER_TOP_K, step=CUTOFF_STEP, max_cutoff=MAX_CUTOFF, fingerprint=None):
+        """Score every cutoff on the grid and every category with a ScoringEngine"""
+        cutoffs = np.arange(0, max_cutoff + step / 2, step)
+        top_k = min(top_k, len(engine))
+        chances = np.empty((len(cutoffs), len(CATEGORIES), len(engine)), dtype=np.uint16)
+        top = np.empty((len(cutoffs), len(CATEGORIES), top_k), dtype=np.int32)
+
+        for i, cutoff in enumerate(cutoffs):
+            base_chances = np.nan_to_num(engine.chances(cutoff))
+            for j, category in enumerate(CATEGORIES):
+                category_chances = engine.predictor.adjust_chance_for_category(base_chances, category)
+                chances[i, j] = np.round(category_chances * 10)
+                top[i, j] = top_k_positions(category_chances, top_k)
+
+        return cls(engine.colleges, engine.branches, engine.predicted_cutoffs, engine.lower, engine.upper,
+                   chances, top, step=step, fingerprint=fingerprint)
+
+    def score(self, cutoff_mark, category=None, college=None, branch=None, top=None):
+        """Same answers as ScoringEngine.score, read from the table.
+
+        Returns None when the cutoff mark is off the grid or the category unknown,
+        so the caller can fall back to a ScoringEngine.
+        """
+        position = cutoff_mark / self.step
+        row = int(round(position))
+        if abs(position - row) > 1e-6 or not 0 <= row < len(self.chances) or category not in CATEGORIES:
+            return None
+        column = CATEGORIES.index(category)
+        chances = self.chances[row, column]
+
+        if college is None and branch is None and top is not None and top <= self.top.shape[-1]:
+            index = self.top[row, column, :top]
+        else:
+            index = self.select(college, branch)
+            index = index[top_k_positions(chances[index], top)]
+        return self._frame(index, cutoff_mark, chances[index] / 10)
+
+    def save(self, path):
+        np.savez(path, colleges=self.colleges.astype(str), branches=self.branches.astype(str),
+                 predicted_cutoffs=self.predicted_cutoffs, lower=self.lower, upper=self.upper,
+                 chances=self.chances, top=self.top, step=self.step, fingerprint=str(self.fingerprint))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(arrays['colleges'].astype(object), arrays['branches'].astype(object),
+                       arrays['predicted_cutoffs'], arrays['lower'], arrays['upper'],
+                       arrays['chances'], arrays['top'], step=float(arrays['step']),
+                       fingerprint=str(arrays['fingerprint']))
+
+
+def load_or_build_answer_table(predictor, df, artifact_dir):
+    """Reuse the answer table saved next to the model artifact when it was built from
+    the same data, otherwise build it from predictor and save it"""
+    path = os.path.join(artifact_dir, 'answers.npz')
+    fingerprint = fingerprint_training_data(df)
+    try:
+        answers = AnswerTable.load(path)
+        if answers.fingerprint == fingerprint:
+            return answers
+    except (OSError, ValueError, KeyError):
+        pass
+
+    answers = AnswerTable.build(ScoringEngine(predictor, df), fingerprint=fingerprint)
+    try:
+        os.makedirs(artifact_dir, exist_ok=True)
+        answers.save(path)
+    except OSError as e:
+        print(f"Could not save answer table to {path}. Error: {e}")
+    return answers
+
+
+def main():
+    from app import load_and_clean_data
+    from cadv_new import artifact_path, load_or_train_predictor
+
+    print("\nTNEA Precomputed Answer Table")
+    print("=" * 50)
+
+    df = load_and_clean_data("cleaned_vocational_data.csv", "cleaned_maxcutoff_data.csv")
+    artifact_dir = artifact_path('enhanced_predictor_combined')
+    predictor, _ = load_or_train_predictor(df, artifact_dir, serving_mode='table', evaluation='lazy')
+
+    start_time = time.perf_counter()
+    engine = ScoringEngine(predictor, df)
+    answers = AnswerTable.build(engine, fingerprint=fingerprint_training_data(df))
+    answers.save(os.path.join(artifact_dir, 'answers.npz'))
+    build_time = time.perf_counter() - start_time
+    n_cutoffs, n_categories, n_pairs = answers.chances.shape
+    size = answers.chances.nbytes + answers.top.nbytes
+    print(f"\nBuilt {n_cutoffs} cutoffs x {n_categories} categories x {n_pairs} pairs "
+          f"in {build_time:.2f} s ({size / 1e6:.1f} MB)")
+
+    cutoffs = np.arange(100, 200, CUTOFF_STEP)
+    for label, scorer in [('ScoringEngine', engine), ('AnswerTable', answers)]:
+        start_time = time.perf_counter()
+        for cutoff in cutoffs:
+            scorer.score(cutoff, 'BC', top=10)
+        elapsed = time.perf_counter() - start_time
+        print(f"{label:<14} top 10: {elapsed / len(cutoffs) * 1e6:8.1f} us per query")
+
+
+if __name__ == "__main__":
+    main()
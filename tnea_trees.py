@@ -0,0 +1,96 @@
+import json
+import numpy as np
+
+
+class TreeEnsemble:
+    """XGBoost regression trees flattened into NumPy arrays.
+
+    Every array is (n_trees, max_nodes); trees with fewer nodes are padded with
+    leaves. Node 0 of each tree is its root, and leaves have left == -1 and hold
+    their output in value. Prediction walks all trees for a whole batch at once,
+    one tree level per step, so serving needs only NumPy.
+    """
+
+    ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'default_left', 'value')
+
+    def __init__(self, feature, threshold, left, right, default_left, value, base_score, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.base_score = float(base_score)
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Export a trained xgboost Booster with numerical splits"""
+        model = json.loads(booster.save_raw('json'))['learner']
+        trees = model['gradient_booster']['model']['trees']
+        if any(any(tree.get('split_type', [])) for tree in trees):
+            raise ValueError("TreeEnsemble only supports numerical splits; train with training_mode='encoded'")
+
+        max_nodes = max(len(tree['left_children']) for tree in trees)
+        shape = (len(trees), max_nodes)
+        feature = np.zeros(shape, dtype=np.int32)
+        threshold = np.zeros(shape, dtype=np.float32)
+        left = np.full(shape, -1, dtype=np.int32)
+        right = np.full(shape, -1, dtype=np.int32)
+        default_left = np.zeros(shape, dtype=bool)
+        value = np.zeros(shape, dtype=np.float32)
+
+        for i, tree in enumerate(trees):
+            n_nodes = len(tree['left_children'])
+            left[i, :n_nodes] = tree['left_children']
+            right[i, :n_nodes] = tree['right_children']
+            feature[i, :n_nodes] = tree['split_indices']
+            default_left[i, :n_nodes] = tree['default_left']
+            # split_conditions holds the threshold of inner nodes and the output of leaves
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            is_leaf = left[i, :n_nodes] == -1
+            threshold[i, :n_nodes] = np.where(is_leaf, 0, conditions)
+            value[i, :n_nodes] = np.where(is_leaf, conditions, 0)
+
+        # Recent releases store base_score as a bracketed list, e.g. "[1.7875E2]"
+        base_score = float(model['learner_model_param']['base_score'].strip('[]'))
+        return cls(feature, threshold, left, right, default_left, value, base_score, _max_depth(left, right))
+
+    def predict(self, X):
+        """Predict a 2-D array of feature rows; NaN features follow the default branch"""
+        X = np.asarray(X, dtype=np.float32)
+        n_trees = self.feature.shape[0]
+        trees = np.arange(n_trees)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.zeros((len(X), n_trees), dtype=np.int32)
+
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[trees, nodes]]
+            go_left = np.where(np.isnan(x), self.default_left[trees, nodes], x < self.threshold[trees, nodes])
+            children = np.where(go_left, self.left[trees, nodes], self.right[trees, nodes])
+            nodes = np.where(children == -1, nodes, children)
+
+        return self.value[trees, nodes].sum(axis=1, dtype=np.float32) + np.float32(self.base_score)
+
+    def save(self, path):
+        """Write the arrays to a .npz file"""
+        np.savez(path, base_score=self.base_score, max_depth=self.max_depth,
+                 **{name: getattr(self, name) for name in self.ARRAY_NAMES})
+
+    @classmethod
+    def load(cls, path):
+        """Read an ensemble written by save"""
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in cls.ARRAY_NAMES},
+                       base_score=arrays['base_score'], max_depth=arrays['max_depth'])
+
+
+def _max_depth(left, right):
+    """Deepest root-to-leaf path over all trees"""
+    depth = np.zeros(left.shape, dtype=np.int32)
+    # XGBoost numbers children after their parent, so one pass over the nodes sets every depth
+    for node in range(left.shape[1]):
+        trees = np.flatnonzero(left[:, node] != -1)
+        depth[trees, left[trees, node]] = depth[trees, node] + 1
+        depth[trees, right[trees, node]] = depth[trees, node] + 1
+    return depth.max()
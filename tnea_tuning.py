@@ -0,0 +1,239 @@
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import ParameterSampler, cross_val_score
+from cadv_new import ARTIFACT_ROOT, fingerprint_training_data
+
+# Search modes for tune_xgboost: 'halving' races sampled configurations on growing
+# tree counts, 'random' scores sampled configurations once at their full tree count
+SEARCH_MODES = ('halving', 'random')
+
+# One trial store per training dataset, named by the dataset fingerprint
+TUNING_ROOT = os.path.join(ARTIFACT_ROOT, 'tuning')
+
+
+class TuningStore:
+    """Append-only JSON-lines record of scored trials and finished searches.
+
+    Every trial is written as soon as it is scored, so an interrupted search loses
+    at most the trials that were still running.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.trials = {}
+        self.searches = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Line cut short by an interrupted write
+                    if record['type'] == 'trial':
+                        self.trials[record['key']] = record
+                    elif record['type'] == 'search':
+                        self.searches[record['key']] = record
+
+    def record_trial(self, key, params, n_estimators, fold_scores, fit_time):
+        record = {'type': 'trial', 'key': key, 'params': params, 'n_estimators': n_estimators,
+                  'fold_scores': fold_scores, 'fit_time': fit_time}
+        self._append(record)
+        self.trials[key] = record
+        return record
+
+    def record_search(self, key, best_params, trials):
+        record = {'type': 'search', 'key': key, 'best_params': best_params, 'trials': trials}
+        self._append(record)
+        self.searches[key] = record
+        return record
+
+    def _append(self, record):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=_json_default) + '\n')
+
+
+def tune_xgboost(param_grid, X, y, search='halving', n_candidates=81, factor=3, min_estimators=10,
+                 cv=3, max_fits=None, time_budget=None, base_params=None, random_state=42,
+                 n_jobs=None, store_dir=TUNING_ROOT):
+    """Search param_grid for the XGBRegressor with the lowest cross-validated MSE.
+
+    Samples n_candidates configurations from the grid. With search='halving', every
+    rung scores the surviving configurations on a fraction of their n_estimators and
+    promotes the best 1/factor to the next rung, until the last rung trains them in
+    full. max_fits caps the number of XGBoost fits (one per CV fold) and time_budget
+    the wall-clock seconds. The search stops early when either runs out, and the
+    best configuration of the highest rung reached wins.
+
+    Trials run on a pool of n_jobs processes (default: one per CPU) and are recorded
+    in a TuningStore under store_dir, keyed by the fingerprint of X and y. Trials
+    already in the store are reused without counting against max_fits. A finished
+    search with the same settings is returned straight from the store.
+    Pass store_dir=None to disable the store.
+
+    Returns the winning estimator, refitted on all of X and y, and the trial log as a
+    DataFrame with one row per scored (configuration, rung).
+    """
+    if search not in SEARCH_MODES:
+        raise ValueError(f"search must be one of {SEARCH_MODES}, got '{search}'")
+    base_params = base_params or {'objective': 'reg:squarederror', 'random_state': random_state}
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    store = None
+    if store_dir is not None:
+        fingerprint = fingerprint_training_data(pd.DataFrame(X).assign(__target__=np.asarray(y)))
+        store = TuningStore(os.path.join(store_dir, f'{fingerprint}.jsonl'))
+    search_key = _hash([param_grid, search, n_candidates, factor, min_estimators, cv, base_params, random_state])
+
+    start_time = time.time()
+    if store is not None and search_key in store.searches:
+        finished = store.searches[search_key]
+        best_estimator = xgb.XGBRegressor(**base_params, **finished['best_params'])
+        best_estimator.fit(X, y)
+        trial_log = pd.DataFrame(finished['trials'])
+        trial_log.attrs.update({'n_fits': 1, 'search_time': time.time() - start_time, 'cached': True})
+        return best_estimator, trial_log
+
+    candidates = list(ParameterSampler(param_grid, n_iter=min(n_candidates, _grid_size(param_grid)),
+                                       random_state=random_state))
+    n_rungs = 1
+    if search == 'halving':
+        n_rungs = max(1, int(math.log(len(candidates), factor)) + 1)
+
+    # Parallel trials each get one XGBoost thread so workers do not oversubscribe the CPUs
+    worker_params = dict(base_params, n_jobs=1) if n_jobs > 1 else base_params
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+
+    trials = []
+    n_fits = 0
+    survivors = list(range(len(candidates)))
+    best_rung_scores = {}
+    completed = True
+
+    try:
+        for rung in range(n_rungs):
+            # Fraction of each configuration's trees trained at this rung; 1 at the last rung
+            fraction = factor ** (rung - n_rungs + 1)
+            jobs = {}
+            for candidate in survivors:
+                params = candidates[candidate]
+                n_estimators = params.get('n_estimators', 100)
+                if fraction < 1:
+                    n_estimators = max(min_estimators, math.ceil(n_estimators * fraction))
+                trial_params = dict(params, n_estimators=n_estimators)
+                jobs[candidate] = (_hash([trial_params, cv, base_params]), trial_params)
+
+            rung_results = {}
+            for candidate, (key, _) in jobs.items():
+                if store is not None and key in store.trials:
+                    rung_results[candidate] = store.trials[key]
+
+            pending = [candidate for candidate in survivors if candidate not in rung_results]
+            if max_fits is not None:
+                pending = pending[:max(0, (max_fits - n_fits) // cv)]
+            for candidate, fold_scores, fit_time in _score_trials(
+                    executor, {candidate: jobs[candidate][1] for candidate in pending},
+                    worker_params, X, y, cv, time_budget, start_time):
+                key, trial_params = jobs[candidate]
+                record = {'params': trial_params, 'fold_scores': fold_scores, 'fit_time': fit_time}
+                if store is not None:
+                    record = store.record_trial(key, trial_params, trial_params['n_estimators'],
+                                                fold_scores, fit_time)
+                rung_results[candidate] = record
+                n_fits += cv
+
+            rung_scores = {}
+            for candidate in sorted(rung_results):
+                record = rung_results[candidate]
+                scores = np.asarray(record['fold_scores'])
+                rung_scores[candidate] = scores.mean()
+                trials.append({
+                    'candidate': candidate,
+                    'rung': rung,
+                    'n_estimators': record['params']['n_estimators'],
+                    'cv_rmse': float(np.sqrt(-scores.mean())),
+                    'cv_rmse_std': float(np.sqrt(-scores).std()),
+                    'fit_time': record['fit_time'],
+                    'cached': candidate not in pending,
+                    **candidates[candidate],
+                })
+
+            if not rung_scores:
+                completed = False
+                break
+            best_rung_scores = rung_scores
+            if len(rung_scores) < len(survivors):
+                completed = False
+                break  # Budget exhausted part-way through this rung
+
+            n_promoted = max(1, len(survivors) // factor)
+            survivors = sorted(rung_scores, key=rung_scores.get, reverse=True)[:n_promoted]
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if not best_rung_scores:
+        raise RuntimeError("Tuning budget too small to score a single configuration")
+
+    best_candidate = max(best_rung_scores, key=best_rung_scores.get)
+    best_estimator = xgb.XGBRegressor(**base_params, **candidates[best_candidate])
+    best_estimator.fit(X, y)
+
+    trial_log = pd.DataFrame(trials)
+    trial_log['best'] = (trial_log['candidate'] == best_candidate) & (trial_log['rung'] == trial_log['rung'].max())
+    if store is not None and completed:
+        # Only a search that ran to the end is final; a budget-limited one resumes next time
+        store.record_search(search_key, candidates[best_candidate], trial_log.to_dict(orient='records'))
+    trial_log.attrs.update({'n_fits': n_fits + 1, 'search_time': time.time() - start_time, 'cached': False})
+    return best_estimator, trial_log
+
+
+def _score_trials(executor, jobs, base_params, X, y, cv, time_budget, start_time):
+    """Yield (candidate, fold_scores, fit_time) for each job as it finishes, within time_budget"""
+    def out_of_time():
+        return time_budget is not None and time.time() - start_time > time_budget
+
+    if executor is None:
+        for candidate, params in jobs.items():
+            if out_of_time():
+                return
+            yield (candidate, *_score_trial(base_params, params, X, y, cv))
+        return
+
+    futures = {executor.submit(_score_trial, base_params, params, X, y, cv): candidate
+               for candidate, params in jobs.items()}
+    for future in as_completed(futures):
+        yield (futures[future], *future.result())
+        if out_of_time():
+            for remaining in futures:
+                remaining.cancel()
+            return
+
+
+def _score_trial(base_params, params, X, y, cv):
+    """Cross-validate one configuration; runs in a worker process"""
+    fit_start = time.time()
+    model = xgb.XGBRegressor(**base_params, **params)
+    scores = cross_val_score(model, X, y, scoring='neg_mean_squared_error', cv=cv)
+    return scores.tolist(), time.time() - fit_start
+
+
+def _grid_size(param_grid):
+    return int(np.prod([len(values) for values in param_grid.values()]))
+
+
+def _hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=_json_default).encode('utf-8')).hexdigest()[:16]
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# Trailing Indian PIN code, e.g. "Chennai 600 025" or "District\n601206"
+PIN_CODE_PATTERN = r'[\s,.-]*\d{3}\s?\d{3}\s*$'
+
+
+def normalize_names(values):
+    """Normalize college/branch names in bulk so spellings from different files agree.
+
+    Collapses embedded newlines and repeated whitespace, drops a trailing PIN code
+    from the address and upper-cases the result. Missing values become ''.
+    """
+    names = pd.Series(values, dtype=object).fillna('').astype(str)
+    names = names.str.replace(r'\s+', ' ', regex=True).str.strip()
+    names = names.str.replace(PIN_CODE_PATTERN, '', regex=True).str.rstrip(' ,.-')
+    return names.str.upper().to_numpy(dtype=object)
+
+
+class CategoryVocabulary:
+    """Maps normalized category names to dense integer codes.
+
+    Code 0 is reserved for out-of-vocabulary names, so known names get codes
+    1..len(names) and encoding never raises on unseen input.
+    """
+
+    OOV_CODE = 0
+    OOV_LABEL = '<UNKNOWN>'
+
+    def __init__(self, names=()):
+        self._names = []
+        self._codes = {}
+        self._index = pd.Index([], dtype=object)
+        self._add(names)
+
+    @classmethod
+    def fit(cls, values):
+        """Build a vocabulary from raw names, in order of first appearance"""
+        return cls(pd.unique(cls._valid(normalize_names(values))))
+
+    def extend(self, values):
+        """Add unseen raw names after the existing codes; returns the codes of the new names"""
+        first_new_code = len(self._names) + 1
+        normalized = pd.unique(self._valid(normalize_names(values)))
+        self._add([name for name in normalized if name not in self._codes])
+        return np.arange(first_new_code, len(self._names) + 1)
+
+    def encode(self, values):
+        """Encode raw names into codes; unseen or missing names map to OOV_CODE"""
+        normalized = normalize_names(values)
+        return (self._index.get_indexer(normalized) + 1).astype(np.int32)
+
+    def decode(self, codes):
+        """Map codes back to normalized names"""
+        labels = np.array([self.OOV_LABEL] + self._names, dtype=object)
+        return labels[np.asarray(codes)]
+
+    def code_of(self, name):
+        """Code of a single raw name"""
+        return self._codes.get(normalize_names([name])[0], self.OOV_CODE)
+
+    @property
+    def names(self):
+        """Known names, ordered by code"""
+        return list(self._names)
+
+    def __len__(self):
+        """Number of codes, including the reserved out-of-vocabulary code"""
+        return len(self._names) + 1
+
+    def __contains__(self, name):
+        return self.code_of(name) != self.OOV_CODE
+
+    @staticmethod
+    def _valid(names):
+        return names[names != '']
+
+    def _add(self, names):
+        for name in names:
+            self._codes[name] = len(self._names) + 1
+            self._names.append(name)
+        self._index = pd.Index(self._names, dtype=object)
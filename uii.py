@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from cadv_new import EnhancedCollegePredictorML
+from cadv_new import load_or_train_predictor
+from tnea_display import collect_streamed_predictions, show_predictions_table
+from tnea_scoring import stream_predictions, top_k_positions
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -51,103 +53,26 @@ def load_model():
     """Load and train the model"""
     try:
         df = pd.read_csv("Unique_Colleges_Max_Cutoff.csv")
-        predictor = EnhancedCollegePredictorML()
-        metrics = predictor.train_model(df)
+        # Reuses the saved model artifact; only retrains when the data has changed
+        predictor, metrics = load_or_train_predictor(df, serving_mode='trees', evaluation='background')
         return predictor, df, metrics
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
         return None, None, None
 
-def format_admission_chance(chance):
-    """
-    Format admission chance with appropriate styling and meaningful messages
-    
-    Args:
-        chance: Calculated admission chance percentage
-    Returns:
-        Formatted HTML string with appropriate styling
-    """
-    if chance >= 80:
-        return f'<div class="excellent-chance">Excellent Chance - You are above or very close to the cutoff! ({chance:.1f}%)<br/><small>Strong position for admission</small></div>'
-    elif chance >= 60:
-        return f'<div class="good-chance">Good Chance - Within competitive range ({chance:.1f}%)<br/><small>Consider this a serious option</small></div>'
-    elif chance >= 40:
-        return f'<div class="fair-chance">Fair Chance - May need improvement ({chance:.1f}%)<br/><small>Keep as a backup option</small></div>'
-    elif chance >= 20:
-        return f'<div class="low-chance">Low Chance - Significant gap ({chance:.1f}%)<br/><small>Consider alternative choices</small></div>'
-    else:
-        return f'<div class="low-chance">Very Low Chance - Large gap from cutoff ({chance:.1f}%)<br/><small>Focus on other options</small></div>'
-
-
 def predict_all_colleges(predictor, df, cutoff_mark):
-    """Predict cutoffs for all colleges with batched processing"""
-    predictions = []
-    total_rows = len(df)
-    
-    batch_size = 10
-    num_batches = (total_rows + batch_size - 1) // batch_size
-    
-    progress_bar = st.progress(0)
-    
-    for batch_idx in range(num_batches):
-        start_idx = batch_idx * batch_size
-        end_idx = min((batch_idx + 1) * batch_size, total_rows)
-        
-        batch_df = df.iloc[start_idx:end_idx]
-        
-        for _, row in batch_df.iterrows():
-            predicted_cutoff = predictor.predict_cutoff(
-                row['COLLEGE NAME'],
-                row['BRANCH NAME']
-            )
-            
-            if predicted_cutoff is not None:
-                margin = cutoff_mark - predicted_cutoff
-                chance = calculate_admission_chance(margin)
-                
-                predictions.append({
-                    'COLLEGE NAME': row['COLLEGE NAME'],
-                    'BRANCH NAME': row['BRANCH NAME'],
-                    'Predicted Cutoff': predicted_cutoff,
-                    'Your Cutoff': cutoff_mark,
-                    'Margin': margin,
-                    'Admission Chance': chance
-                })
-        
-        progress = min(1.0, (batch_idx + 1) / num_batches)
-        progress_bar.progress(progress)
-    
-    progress_bar.empty()
-    return pd.DataFrame(predictions)
+    """Predict cutoffs for all colleges, streamed in vectorized chunks.
+
+    The progress bar follows the scored rows and the running top 10 is shown
+    while the rest of the catalog is scored. Chances come from the predicted cutoff quantiles.
+    """
+    return collect_streamed_predictions(stream_predictions(predictor, df, cutoff_mark))
 
 def predict_branch_specific(predictor, df, cutoff_mark, branch_name):
     """Predict cutoffs for specific branch"""
     branch_df = df[df['BRANCH NAME'] == branch_name].copy()
     return predict_all_colleges(predictor, branch_df, cutoff_mark)
 
-def calculate_admission_chance(margin):
-    """
-    Calculate admission chance based on margin between student's cutoff and predicted cutoff
-    
-    Args:
-        margin: Student's cutoff - Predicted cutoff
-    Returns:
-        Admission chance percentage
-    """
-    # If margin is positive or within -10 marks
-    if margin >= 0:
-        return 95  # Excellent chance (above cutoff)
-    elif margin >= -10:
-        return 80  # Very good chance (within 10 marks below)
-    elif margin >= -15:
-        return 60  # Good chance (11-15 marks below)
-    elif margin >= -20:
-        return 40  # Average chance (16-20 marks below)
-    elif margin >= -25:
-        return 20  # Low chance (21-25 marks below)
-    else:
-        return 5   # Very poor chance (>25 marks below)
-
 def show_college_branches(predictor, df, college_name, user_cutoff):
     """Show predictions for all branches in a college"""
     college_df = df[df['COLLEGE NAME'] == college_name].copy()
@@ -186,15 +111,7 @@ def show_college_branches(predictor, df, college_name, user_cutoff):
         
         st.plotly_chart(fig, use_container_width=True)
         
-        for _, row in predictions.iterrows():
-            with st.container():
-                cols = st.columns([2, 1, 1])
-                with cols[0]:
-                    st.write(f"**Branch:** {row['BRANCH NAME']}")
-                with cols[1]:
-                    st.write(f"**Predicted Cutoff:** {row['Predicted Cutoff']:.2f}")
-                with cols[2]:
-                    st.markdown(format_admission_chance(row['Admission Chance']), unsafe_allow_html=True)
+        show_predictions_table(predictions, key='college_branches', label="Show branch details")
 
 def display_predictions(predictions):
     """Display top 10 predictions with visualizations"""
@@ -202,7 +119,9 @@ def display_predictions(predictions):
         st.warning("No predictions available.")
         return
 
-    predictions_sorted = predictions.sort_values('Admission Chance', ascending=False).head(10)
+    # Rank the rows once; the chart shows the first 10 and the table pages through all of them
+    ranked = predictions.iloc[top_k_positions(predictions['Admission Chance'])]
+    predictions_sorted = ranked.head(10).reset_index(drop=True)
     
     fig = go.Figure()
     
@@ -227,18 +146,8 @@ def display_predictions(predictions):
     
     st.plotly_chart(fig, use_container_width=True)
     
-    with st.expander("View Detailed Predictions"):
-        for idx, row in predictions_sorted.iterrows():
-            st.markdown(f"""
-            **Rank {idx + 1}:**
-            * College: {row['COLLEGE NAME']}
-            * Branch: {row['BRANCH NAME']}
-            * Predicted Cutoff: {row['Predicted Cutoff']:.2f}
-            * Your Cutoff: {row['Your Cutoff']:.2f}
-            * Margin: {row['Margin']:.2f}
-            """)
-            st.markdown(format_admission_chance(row['Admission Chance']), unsafe_allow_html=True)
-            st.markdown("---")
+    # Every prediction, ranked, in a paged table that is only rendered on request
+    show_predictions_table(ranked, key='ranked_predictions')
 
 def main():
     st.title("🎓 College Admission Predictor")
@@ -253,13 +162,20 @@ def main():
 
     # Display model metrics in expander
     with st.expander("Model Performance Metrics"):
-        cols = st.columns(3)
-        with cols[0]:
-            st.metric("R² Score", f"{metrics['r2']:.4f}")
-        with cols[1]:
-            st.metric("RMSE", f"{metrics['rmse']:.4f}")
-        with cols[2]:
-            st.metric("MAE", f"{metrics['mae']:.4f}")
+        # Evaluation runs in the background after startup; show it once it has finished
+        metrics = predictor.get_metrics(wait=False)
+        if 'evaluation_error' in metrics:
+            st.warning(f"Model evaluation failed: {metrics['evaluation_error']}")
+        elif 'r2' not in metrics:
+            st.info("Model evaluation is not available yet. Reopen this section in a moment.")
+        else:
+            cols = st.columns(3)
+            with cols[0]:
+                st.metric("R² Score", f"{metrics['r2']:.4f}")
+            with cols[1]:
+                st.metric("RMSE", f"{metrics['rmse']:.4f}")
+            with cols[2]:
+                st.metric("MAE", f"{metrics['mae']:.4f}")
 
     # Input marks section
     st.subheader("Enter Your Marks")
@@ -328,31 +244,24 @@ def main():
             get_predictions = st.form_submit_button("Get Predictions")
         
         if get_predictions:
-            progress_text = "Calculating predictions..."
-            my_bar = st.progress(0, text=progress_text)
-            
+            # predict_all_colleges draws its own progress bar as the rows are scored
             try:
                 if filter_mode == "Show top colleges across all branches":
                     with st.spinner("Processing all colleges..."):
                         predictions = predict_all_colleges(predictor, df, st.session_state.cutoff_mark)
-                        my_bar.progress(1.0, text="Predictions complete!")
                         display_predictions(predictions)
                 
                 elif filter_mode == "Show top colleges for specific branch":
                     with st.spinner("Processing selected branch..."):
                         predictions = predict_branch_specific(predictor, df, st.session_state.cutoff_mark, branch_name)
-                        my_bar.progress(1.0, text="Predictions complete!")
                         display_predictions(predictions)
                 
                 else:  # Show all branches for specific college
                     with st.spinner("Processing college branches..."):
                         show_college_branches(predictor, df, college_name, st.session_state.cutoff_mark)
-                        my_bar.progress(1.0, text="Predictions complete!")
             
             except Exception as e:
                 st.error(f"An error occurred while generating predictions: {str(e)}")
-            finally:
-                my_bar.empty()
         
         # Add a button to reset the form
         if st.button("Reset Calculator"):
@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from cadv_new import EnhancedCollegePredictorML
+from cadv_new import load_or_train_predictor
+from tnea_display import show_predictions_table
+from tnea_scoring import PredictionIndex
 import plotly.express as px
 import plotly.graph_objects as go
 import time
@@ -22,30 +24,6 @@ st.markdown("""
         border-radius: 0.5rem;
         margin: 0.5rem 0;
     }
-    .excellent-chance {
-        color: #0f5132;
-        background-color: #d1e7dd;
-        padding: 0.5rem;
-        border-radius: 0.25rem;
-    }
-    .good-chance {
-        color: #084298;
-        background-color: #cfe2ff;
-        padding: 0.5rem;
-        border-radius: 0.25rem;
-    }
-    .fair-chance {
-        color: #664d03;
-        background-color: #fff3cd;
-        padding: 0.5rem;
-        border-radius: 0.25rem;
-    }
-    .low-chance {
-        color: #842029;
-        background-color: #f8d7da;
-        padding: 0.5rem;
-        border-radius: 0.25rem;
-    }
     </style>
 """, unsafe_allow_html=True)
 
@@ -54,8 +32,8 @@ def load_model():
     """Load and train the model"""
     try:
         df = pd.read_csv("Unique_Colleges_Max_Cutoff.csv")
-        predictor = EnhancedCollegePredictorML()
-        metrics = predictor.train_model(df)
+        # Reuses the saved model artifact; only retrains when the data has changed
+        predictor, metrics = load_or_train_predictor(df, serving_mode='trees', evaluation='background')
         return predictor, df, metrics
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
@@ -65,6 +43,13 @@ def display_model_metrics(metrics):
     """Display model metrics with visualizations"""
     st.subheader("Model Performance Metrics")
     
+    if 'evaluation_error' in metrics:
+        st.warning(f"Model evaluation failed: {metrics['evaluation_error']}")
+        return
+    if 'r2' not in metrics:
+        st.info("Model evaluation is still running in the background. Refresh the page in a moment to see it.")
+        return
+    
     # Main metrics
     col1, col2, col3 = st.columns(3)
     
@@ -124,66 +109,58 @@ def display_model_metrics(metrics):
         })
         st.table(params_df)
 
-def format_admission_chance(chance):
-    """Format admission chance with appropriate styling"""
+def chance_label(chance):
+    """Outlook label for an admission chance"""
     if chance >= 80:
-        return f'<div class="excellent-chance">Excellent Chance ({chance:.1f}%)<br><small>Very high probability of admission</small></div>'
+        return "Excellent"
     elif chance >= 60:
-        return f'<div class="good-chance">Good Chance ({chance:.1f}%)<br><small>Strong possibility of admission</small></div>'
+        return "Good"
     elif chance >= 40:
-        return f'<div class="fair-chance">Fair Chance ({chance:.1f}%)<br><small>Moderate possibility of admission</small></div>'
+        return "Fair"
     else:
-        return f'<div class="low-chance">Low Chance ({chance:.1f}%)<br><small>Consider alternative options</small></div>'
+        return "Low"
+
+# (minimum margin, chance) steps of calculate_admission_chance, highest chance first
+CHANCE_STEPS = [(0, 95), (-10, 80), (-20, 60), (-30, 40), (-np.inf, 20)]
 
 def calculate_admission_chance(margin):
-    """Calculate admission chance based on margin"""
-    if margin >= 0:
-        return 95
-    elif margin >= -10:
-        return 80
-    elif margin >= -20:
-        return 60
-    elif margin >= -30:
-        return 40
-    else:
-        return 20
+    """Calculate admission chance based on margin; margin may be an array"""
+    margin = np.asarray(margin, dtype=np.float64)
+    return np.select([margin >= minimum for minimum, _ in CHANCE_STEPS], [chance for _, chance in CHANCE_STEPS])
 
-def predict_colleges(predictor, df, cutoff_mark, **filters):
-    """Predict cutoffs with filters applied"""
-    predictions = []
-    progress_bar = st.progress(0)
-    
-    filtered_df = df.copy()
-    for key, value in filters.items():
-        if value:
-            filtered_df = filtered_df[filtered_df[key] == value]
-    
-    total_rows = len(filtered_df)
-    
-    for idx, row in filtered_df.iterrows():
-        predicted_cutoff = predictor.predict_cutoff(
-            row['COLLEGE NAME'],
-            row['BRANCH NAME']
-        )
-        
-        if predicted_cutoff is not None:
-            margin = cutoff_mark - predicted_cutoff
-            chance = calculate_admission_chance(margin)
-            
-            predictions.append({
-                'COLLEGE NAME': row['COLLEGE NAME'],
-                'BRANCH NAME': row['BRANCH NAME'],
-                'Predicted Cutoff': predicted_cutoff,
-                'Your Cutoff': cutoff_mark,
-                'Margin': margin,
-                'Admission Chance': chance
-            })
-        
-        progress = min(1.0, (idx + 1) / total_rows)
-        progress_bar.progress(progress)
-    
-    progress_bar.empty()
-    return pd.DataFrame(predictions)
+def minimum_margin(min_chance):
+    """Lowest margin whose admission chance is at least min_chance"""
+    margins = [minimum for minimum, chance in CHANCE_STEPS if chance >= min_chance]
+    return min(margins) if margins else np.inf
+
+@st.cache_resource
+def load_prediction_index(_predictor, df):
+    """Predict every row once and sort the rows by predicted cutoff"""
+    predicted_cutoffs = _predictor.predict_cutoffs(df['COLLEGE NAME'], df['BRANCH NAME'])
+    return PredictionIndex(df['COLLEGE NAME'], df['BRANCH NAME'], predicted_cutoffs)
+
+def predict_colleges(predictor, df, cutoff_mark, min_chance=0, **filters):
+    """Predictions with at least min_chance and filters applied, best first.
+
+    The chance only depends on the margin, so these are the rows whose predicted
+    cutoff is at or below cutoff_mark - minimum_margin(min_chance): a binary search
+    in the cached prediction index. filters may select a 'COLLEGE NAME' and/or a
+    'BRANCH NAME'.
+    """
+    index = load_prediction_index(predictor, df)
+    positions = index.positions(cutoff_mark - minimum_margin(min_chance),
+                                college=filters.get('COLLEGE NAME'), branch=filters.get('BRANCH NAME'))
+
+    predicted_cutoffs = index.predicted_cutoffs[positions]
+    margins = cutoff_mark - predicted_cutoffs
+    return pd.DataFrame({
+        'COLLEGE NAME': index.colleges[positions],
+        'BRANCH NAME': index.branches[positions],
+        'Predicted Cutoff': predicted_cutoffs,
+        'Your Cutoff': cutoff_mark,
+        'Margin': margins,
+        'Admission Chance': calculate_admission_chance(margins)
+    })
 
 def display_predictions(predictions):
     """Display predictions with visualizations"""
@@ -191,8 +168,8 @@ def display_predictions(predictions):
         st.warning("No predictions available.")
         return
 
-    # Sort predictions by admission chance
-    predictions_sorted = predictions.sort_values('Admission Chance', ascending=False)
+    # predict_colleges returns the rows best first, so nothing is sorted here
+    predictions_sorted = predictions
     
     # Create visualization
     fig = go.Figure()
@@ -220,17 +197,9 @@ def display_predictions(predictions):
     
     st.plotly_chart(fig, use_container_width=True)
     
-    # Detailed predictions
-    with st.expander("View Detailed Predictions"):
-        for idx, row in predictions_sorted.iterrows():
-            st.markdown(f"""
-            **{idx + 1}. {row['COLLEGE NAME']} - {row['BRANCH NAME']}**
-            * Predicted Cutoff: {row['Predicted Cutoff']:.2f}
-            * Your Cutoff: {row['Your Cutoff']:.2f}
-            * Margin: {row['Margin']:.2f}
-            """)
-            st.markdown(format_admission_chance(row['Admission Chance']), unsafe_allow_html=True)
-            st.markdown("---")
+    # Detailed predictions: one paged table, rendered on request, instead of markdown per row
+    show_predictions_table(predictions_sorted.assign(Label=predictions_sorted['Admission Chance'].map(chance_label)),
+                           key='detailed_predictions', label="View detailed predictions")
 
 def main():
     st.title("🎓 College Admission Predictor")
@@ -243,7 +212,7 @@ def main():
         st.error("Failed to initialize the prediction model.")
         return
     
-    display_model_metrics(metrics)
+    display_model_metrics(predictor.get_metrics(wait=False))
     
     # Input marks
     st.subheader("Enter Your Marks")
@@ -293,14 +262,10 @@ def main():
                     predictor,
                     df,
                     st.session_state.cutoff_mark,
+                    min_chance=min_chance,
                     **filters
                 )
                 
-                # Filter by minimum chance
-                predictions = predictions[
-                    predictions['Admission Chance'] >= min_chance
-                ]
-                
                 display_predictions(predictions)
 
 if __name__ == "__main__":
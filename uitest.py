@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from cadv_new import EnhancedCollegePredictorML
+from cadv_new import load_or_train_predictor
+from tnea_display import collect_streamed_predictions
+from tnea_scoring import stream_predictions
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -47,8 +49,8 @@ def load_model():
     """Load and train the model"""
     try:
         df = pd.read_csv("Unique_Colleges_Max_Cutoff.csv")
-        predictor = EnhancedCollegePredictorML()
-        metrics = predictor.train_model(df)
+        # Reuses the saved model artifact; only retrains when the data has changed
+        predictor, metrics = load_or_train_predictor(df, serving_mode='trees', evaluation='background', fallback=True)
         return predictor, df, metrics
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
@@ -66,45 +68,12 @@ def format_admission_chance(chance):
         return f'<div class="low-chance">Low chance – focus on realistic backups and improvements. ({chance:.1f}%)</div>'
 
 def predict_all_colleges(predictor, df, cutoff_mark):
-    """Predict cutoffs for all colleges with batched processing"""
-    predictions = []
-    total_rows = len(df)
-    
-    batch_size = 10
-    num_batches = (total_rows + batch_size - 1) // batch_size
-    
-    progress_bar = st.progress(0)
-    
-    for batch_idx in range(num_batches):
-        start_idx = batch_idx * batch_size
-        end_idx = min((batch_idx + 1) * batch_size, total_rows)
-        
-        batch_df = df.iloc[start_idx:end_idx]
-        
-        for _, row in batch_df.iterrows():
-            predicted_cutoff = predictor.predict_cutoff(
-                row['COLLEGE NAME'],
-                row['BRANCH NAME']
-            )
-            
-            if predicted_cutoff is not None:
-                margin = cutoff_mark - predicted_cutoff
-                chance = calculate_admission_chance(margin)
-                
-                predictions.append({
-                    'COLLEGE NAME': row['COLLEGE NAME'],
-                    'BRANCH NAME': row['BRANCH NAME'],
-                    'Predicted Cutoff': predicted_cutoff,
-                    'Your Cutoff': cutoff_mark,
-                    'Margin': margin,
-                    'Admission Chance': chance
-                })
-        
-        progress = min(1.0, (batch_idx + 1) / num_batches)
-        progress_bar.progress(progress)
-    
-    progress_bar.empty()
-    return pd.DataFrame(predictions)
+    """Predict cutoffs for all colleges, streamed in vectorized chunks.
+
+    The progress bar follows the scored rows and the running top 10 is shown
+    while the rest of the catalog is scored. Chances are a function of the margin.
+    """
+    return collect_streamed_predictions(stream_predictions(predictor, df, cutoff_mark, chance=calculate_admission_chance))
 
 def predict_branch_specific(predictor, df, cutoff_mark, branch_name):
     """Predict cutoffs for specific branch"""
@@ -112,11 +81,8 @@ def predict_branch_specific(predictor, df, cutoff_mark, branch_name):
     return predict_all_colleges(predictor, branch_df, cutoff_mark)
 
 def calculate_admission_chance(margin):
-    """Calculate admission chance based on margin"""
-    if margin >= 0:
-        return min(100, max(0, (margin + 5) * 10))
-    else:
-        return max(0, min(100, (1 + margin / 20) * 100))
+    """Calculate admission chance based on margin; margin may be an array"""
+    return np.where(margin >= 0, np.clip((margin + 5) * 10, 0, 100), np.clip((1 + margin / 20) * 100, 0, 100))
 
 def show_college_branches(predictor, df, college_name, user_cutoff):
     """Show predictions for all branches in a college"""
@@ -223,13 +189,20 @@ def main():
 
     # Display model metrics in expander
     with st.expander("Model Performance Metrics"):
-        cols = st.columns(3)
-        with cols[0]:
-            st.metric("R² Score", f"{metrics['r2']:.4f}")
-        with cols[1]:
-            st.metric("RMSE", f"{metrics['rmse']:.4f}")
-        with cols[2]:
-            st.metric("MAE", f"{metrics['mae']:.4f}")
+        # Evaluation runs in the background after startup; show it once it has finished
+        metrics = predictor.get_metrics(wait=False)
+        if 'evaluation_error' in metrics:
+            st.warning(f"Model evaluation failed: {metrics['evaluation_error']}")
+        elif 'r2' not in metrics:
+            st.info("Model evaluation is not available yet. Reopen this section in a moment.")
+        else:
+            cols = st.columns(3)
+            with cols[0]:
+                st.metric("R² Score", f"{metrics['r2']:.4f}")
+            with cols[1]:
+                st.metric("RMSE", f"{metrics['rmse']:.4f}")
+            with cols[2]:
+                st.metric("MAE", f"{metrics['mae']:.4f}")
 
     # Input marks section
     st.subheader("Enter Your Marks")
@@ -298,31 +271,24 @@ def main():
             get_predictions = st.form_submit_button("Get Predictions")
         
         if get_predictions:
-            progress_text = "Calculating predictions..."
-            my_bar = st.progress(0, text=progress_text)
-            
+            # predict_all_colleges draws its own progress bar as the rows are scored
             try:
                 if filter_mode == "Show top colleges across all branches":
                     with st.spinner("Processing all colleges..."):
                         predictions = predict_all_colleges(predictor, df, st.session_state.cutoff_mark)
-                        my_bar.progress(1.0, text="Predictions complete!")
                         display_predictions(predictions)
                 
                 elif filter_mode == "Show top colleges for specific branch":
                     with st.spinner("Processing selected branch..."):
                         predictions = predict_branch_specific(predictor, df, st.session_state.cutoff_mark, branch_name)
-                        my_bar.progress(1.0, text="Predictions complete!")
                         display_predictions(predictions)
                 
                 else:  # Show all branches for specific college
                     with st.spinner("Processing college branches..."):
                         show_college_branches(predictor, df, college_name, st.session_state.cutoff_mark)
-                        my_bar.progress(1.0, text="Predictions complete!")
             
             except Exception as e:
                 st.error(f"An error occurred while generating predictions: {str(e)}")
-            finally:
-                my_bar.empty()
         
         # Add a button to reset the form
         if st.button("Reset Calculator"):